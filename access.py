@@ -17,6 +17,14 @@ ADMIN_IDENTITY_ENV = 'ADMIN_IDENTITY'
 ADMIN_ROLE_ENV = 'ADMIN_ROLE'
 SECRET_JWT_ENV = 'SECRET_JWT'
 JWT_ALGORITHM_ENV = 'JWT_ALGORITHM'
+REDIS_HOST_ENV = 'REDIS_HOST'
+REDIS_PORT_ENV = 'REDIS_PORT'
+TOKEN_CACHE_TTL_ENV = 'TOKEN_CACHE_TTL'
+
+# Session token cache of the API (helpers/TokenCache.py): key prefix, revoked value and default TTL.
+TOKEN_CACHE_PREFIX = 'session_token:'
+TOKEN_CACHE_REVOKED = 'null'
+DEFAULT_TOKEN_CACHE_TTL = 300
 
 class Access:
     
@@ -31,6 +39,9 @@ class Access:
         self.admin_role = kwargs.get(ADMIN_ROLE_ENV)
         self.secret_jwt = kwargs.get(SECRET_JWT_ENV)
         self.jwt_algorithm = kwargs.get(JWT_ALGORITHM_ENV)
+        self.redis_host = kwargs.get(REDIS_HOST_ENV)
+        self.redis_port = kwargs.get(REDIS_PORT_ENV)
+        self.token_cache_ttl = int(kwargs.get(TOKEN_CACHE_TTL_ENV) or os.getenv(TOKEN_CACHE_TTL_ENV, DEFAULT_TOKEN_CACHE_TTL))
         self.db_sqlite = db_sqlite
 
         required_fields = [ADMIN_IDENTITY_ENV, ADMIN_ROLE_ENV, SECRET_JWT_ENV, JWT_ALGORITHM_ENV]
@@ -87,14 +98,51 @@ class Access:
         if not id:
             id = jwt.decode(token, key=self.secret_jwt, algorithms=[self.jwt_algorithm]).get('token')
         
+        self.checkTokenCache()
+        
         cursor = db.cursor()
         cursor.execute(f"DELETE FROM session_token WHERE id = '{id}'")
         db.commit()
         
+        self.invalidateTokens([id])
+        
     def deleteAllTokens(self, db):
+        
+        self.checkTokenCache()
+        
+        cursor = db.cursor()
+        cursor.execute(f"SELECT id FROM session_token WHERE user_session_id = (SELECT id FROM user_session WHERE user = '{self.admin_role}')")
+        ids = [row[0] for row in cursor.fetchall()]
+        
         cursor = db.cursor()
         cursor.execute(f"DELETE FROM session_token WHERE user_session_id = (SELECT id FROM user_session WHERE user = '{self.admin_role}')")
         db.commit()
+        
+        self.invalidateTokens(ids)
+        
+    def checkTokenCache(self):
+        """
+        The API caches the valid tokens in Redis: removing them without revoking them there would keep them valid.
+        """
+        
+        if not self.redis_host:
+            raise ValueError(f'Missing "{REDIS_HOST_ENV}" value. It is required to revoke the tokens in the token cache of the API.')
+        
+    def invalidateTokens(self, ids):
+        
+        if not ids:
+            return
+        
+        import redis
+        
+        try:
+            with redis.Redis(host=self.redis_host, port=int(self.redis_port or 6379), db=0) as connection:
+                pipeline = connection.pipeline(transaction=False)
+                for id in ids:
+                    pipeline.set(f'{TOKEN_CACHE_PREFIX}{id}', TOKEN_CACHE_REVOKED, ex=self.token_cache_ttl)
+                pipeline.execute()
+        except redis.RedisError as e:
+            raise ValueError(f'The tokens were removed but could not be revoked in the token cache ({e}). The API may accept them for {self.token_cache_ttl} seconds.')
     
     def list(self, db, name = None):
         cursor = db.cursor()
@@ -161,6 +209,8 @@ def main():
         ADMIN_ROLE = None
         SECRET_JWT = None
         JWT_ALGORITHM = None 
+        REDIS_HOST = None
+        REDIS_PORT = None
         
         if args.env is not False:
             
@@ -176,6 +226,9 @@ def main():
                 print(f'\t{ADMIN_ROLE_ENV}')
                 print(f'\t{SECRET_JWT_ENV}')
                 print(f'\t{JWT_ALGORITHM_ENV}')
+                print(f'\t{REDIS_HOST_ENV} (required to remove tokens)')
+                print(f'\t{REDIS_PORT_ENV} (optional)')
+                print(f'\t{TOKEN_CACHE_TTL_ENV} (optional)')
 
                 exit(0)
             
@@ -191,10 +244,12 @@ def main():
             ADMIN_ROLE = os.getenv(ADMIN_ROLE_ENV)
             SECRET_JWT = os.getenv(SECRET_JWT_ENV)
             JWT_ALGORITHM = os.getenv(JWT_ALGORITHM_ENV)
+            REDIS_HOST = os.getenv(REDIS_HOST_ENV)
+            REDIS_PORT = os.getenv(REDIS_PORT_ENV)
                 
         else:
             try:
-                from globals import ADMIN_IDENTITY, DATABASE_HOST, DATABASE_NAME, DATABASE_PASS, DATABASE_PORT, ADMIN_ROLE, DATABASE_USER, SECRET_JWT, JWT_ALGORITHM
+                from globals import ADMIN_IDENTITY, DATABASE_HOST, DATABASE_NAME, DATABASE_PASS, DATABASE_PORT, ADMIN_ROLE, DATABASE_USER, SECRET_JWT, JWT_ALGORITHM, REDIS_HOST, REDIS_PORT
             except ModuleNotFoundError:
                 if not args.data or len(args.data.keys()) == 0: 
                     print('Error: No environment data found. Use --env <file_name | Default: .env> option.')
@@ -209,7 +264,9 @@ def main():
             ADMIN_IDENTITY_ENV: ADMIN_IDENTITY,
             ADMIN_ROLE_ENV: ADMIN_ROLE,
             SECRET_JWT_ENV: SECRET_JWT,
-            JWT_ALGORITHM_ENV: JWT_ALGORITHM
+            JWT_ALGORITHM_ENV: JWT_ALGORITHM,
+            REDIS_HOST_ENV: REDIS_HOST,
+            REDIS_PORT_ENV: REDIS_PORT
         }
         
         if args.data:
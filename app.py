@@ -14,8 +14,12 @@ from config import Config
 
 from db import db, deleteAndCommit
 from default_config import DefaultConfig
+from helpers.LoggingMiddleware import metrics_middleware
+from helpers.QueryAccounting import query_accounting_middleware
+from helpers.ReferenceData import loadReferenceData
+from helpers.TokenCache import get_session_token
 
-from globals import API_PREFIX, BACKUP_COUNT_LOG, DAILY_HOUR, DAILY_MINUTE, DB_BACKUP_FOLDER, DEBUG, CERT_SSL, FILENAME_LOG, KEY_SSL, LOG_NAME, LOGGING_FORMAT, LOGGING_LEVEL, MAX_BYTES_LOG, ROTATING_LOG_WHEN, TEST_PERFORMANCE, TIMEZONE, log, setApp, setLogger
+from globals import API_PREFIX, BACKUP_COUNT_LOG, DAILY_HOUR, DAILY_MINUTE, DB_BACKUP_FOLDER, DEBUG, DONE_SWEEP_INTERVAL, CERT_SSL, FILENAME_LOG, KEY_SSL, LOG_NAME, LOGGING_FORMAT, LOGGING_LEVEL, MAX_BYTES_LOG, ROTATING_LOG_WHEN, TEST_PERFORMANCE, TIMEZONE, USE_X_SENDFILE, log, setApp, setLogger
 from models.session_token import SessionTokenModel
 
 from resources.local import blp as LocalBlueprint
@@ -98,6 +102,8 @@ def create_app(config: Config = DefaultConfig()):
             
     app = Flask(__name__, template_folder=TEMPLATE_FOLDER)
     CORS(app)
+    metrics_middleware(app)
+    query_accounting_middleware(app)
         
     app.debug = DEBUG
     app.jinja_env.auto_reload = DEBUG
@@ -108,6 +114,8 @@ def create_app(config: Config = DefaultConfig()):
     app.config['OPENAPI_URL_PREFIX'] = config.openapi_url_prefix if DEBUG else None
     app.config['OPENAPI_SWAGGER_UI_PATH'] = config.openapi_swagger_ui_path if DEBUG else None
     app.config['OPENAPI_SWAGGER_UI_URL'] = config.openapi_swagger_ui_url
+    
+    app.config['USE_X_SENDFILE'] = USE_X_SENDFILE
 
     ##BBDD
     log(f'Configuring DB', uuid=UUID)
@@ -136,6 +144,14 @@ def create_app(config: Config = DefaultConfig()):
                     'schedule': crontab(hour=DAILY_HOUR, minute=DAILY_MINUTE),
                     "options": {"queue": "priority"}
                 },
+                'mark-done-bookings': {
+                    'task': 'celery_app.tasks.mark_done_bookings',
+                    'schedule': DONE_SWEEP_INTERVAL * 60,
+                },
+                'purge-closed-days': {
+                    'task': 'celery_app.tasks.purge_closed_days',
+                    'schedule': crontab(hour=DAILY_HOUR, minute=DAILY_MINUTE),
+                },
                 # 'execute-daily-at-specific-time': {
                 #     'task': 'celery_app.tasks.test_celery',
                 #     'schedule': crontab(hour=13, minute=46),  # Reemplaza H con la hora y M con los minutos
@@ -152,6 +168,18 @@ def create_app(config: Config = DefaultConfig()):
     
     Migrate(app, db)
     
+    log(f'Loading reference data', uuid=UUID)
+    
+    with app.app_context():
+        try:
+            loadReferenceData()
+        except SQLAlchemyError as e:
+            log('Could not load the reference data. It will be loaded on first use.', uuid=UUID, level='WARNING', error=e)
+        finally:
+            # The processes forked from this one must not share its connections.
+            db.session.remove()
+            db.engine.dispose()
+    
     api = Api(app)
     
     api.spec.components.security_scheme(
@@ -173,14 +201,14 @@ def create_app(config: Config = DefaultConfig()):
             identity = jwt_payload['sub']
             
             try:
-                session_token = SessionTokenModel.query.get(tokenId)
+                session_token = get_session_token(tokenId, jwt_payload.get('exp'))
             except SQLAlchemyError as e:
                 traceback.print_exc()
                 abort(500, message = str(e) if DEBUG else 'Could not check the token.')
             
             if not session_token: return True
             
-            return not (session_token.jti == jti and session_token.local_id == identity)
+            return not (session_token['jti'] == jti and session_token['local_id'] == identity)
             
         except KeyError:
             return True
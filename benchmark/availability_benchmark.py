@@ -0,0 +1,122 @@
+import argparse
+import json
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from bench_utils import DEFAULT_DATABASE_URI, QueryCounter, create_benchmark_app, timeit
+
+DEFAULT_SIZES = [1, 5, 10, 25, 50, 100]
+DEFAULT_BOOKINGS_PER_WORKER = 8
+DEFAULT_REPEAT = 20
+
+def seed(db, size, bookings_per_worker):
+
+    from globals import CONFIRMED_STATUS
+    from models import BookingModel, LocalModel, StatusModel, WorkGroupModel, WorkerModel
+
+    local = LocalModel(id=uuid.uuid4().hex, name='Benchmark', tlf='000000000', email=f'{uuid.uuid4().hex}@benchmark.local', location='Europe/Madrid', password='-')
+    work_group = WorkGroupModel(name=f'Benchmark {size}', local_id=local.id)
+    db.session.add_all([local, work_group])
+    db.session.flush()
+
+    status = StatusModel.query.filter_by(status=CONFIRMED_STATUS).first()
+
+    day = (datetime.now() + timedelta(days=30)).replace(hour=9, minute=0, second=0, microsecond=0)
+
+    workers = []
+
+    for i in range(size):
+        worker = WorkerModel(name=f'Worker {i}')
+        work_group.workers.append(worker)
+        workers.append(worker)
+
+    db.session.flush()
+
+    # Every worker but the last one is busy on the requested slot, which is
+    # the worst case for a lookup that walks the work group worker by worker.
+    for i, worker in enumerate(workers):
+        for j in range(bookings_per_worker):
+            if j == 0 and i == size - 1:
+                continue
+            datetime_init = day + timedelta(minutes=30 * j)
+            db.session.add(BookingModel(datetime_init=datetime_init, datetime_end=datetime_init + timedelta(minutes=30), client_name='Client', status_id=status.id, worker_id=worker.id, local_id=local.id, work_group_id=work_group.id))
+
+    db.session.commit()
+
+    return local.id, workers, day, day + timedelta(minutes=30)
+
+def legacy_search(local_id, datetime_init, datetime_end, workers, booking_id = None):
+
+    from globals import CONFIRMED_STATUS, PENDING_STATUS
+    from helpers.BookingController import getBookings
+
+    workers = list(workers)
+    random.shuffle(workers)
+
+    for worker in workers:
+        bookings = getBookings(local_id, datetime_init, datetime_end, status=[CONFIRMED_STATUS, PENDING_STATUS], worker_id=worker.id)
+        if bookings and (booking_id is None or len(bookings) > 1 or bookings[0].id != booking_id):
+            continue
+        return worker.id
+
+    return None
+
+def run(database_uri, sizes, bookings_per_worker, repeat):
+
+    from app import db
+    from helpers.BookingController import searchWorkerBookings
+    from helpers.DatetimeHelper import naiveToAware
+
+    random.seed(0)
+
+    app = create_benchmark_app(database_uri)
+
+    results = []
+
+    with app.app_context():
+
+        for size in sizes:
+
+            local_id, workers, datetime_init, datetime_end = seed(db, size, bookings_per_worker)
+            datetime_init, datetime_end = naiveToAware(datetime_init), naiveToAware(datetime_end)
+
+            row = {'work_group_size': size}
+
+            for name, search in (('legacy', legacy_search), ('resolver', searchWorkerBookings)):
+
+                with QueryCounter(db.engine) as counter:
+                    worker_id = search(local_id, datetime_init, datetime_end, workers, None)
+
+                _, latency = timeit(lambda: search(local_id, datetime_init, datetime_end, workers, None), repeat)
+
+                assert worker_id == workers[-1].id, f'{name} picked a busy worker.'
+
+                row[name] = {'queries': counter.count, **latency}
+
+            results.append(row)
+
+            print(f"workers={size:>4} | legacy: {row['legacy']['queries']:>4} queries {row['legacy']['median_ms']:8.2f} ms | resolver: {row['resolver']['queries']:>4} queries {row['resolver']['median_ms']:8.2f} ms")
+
+    return results
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Query count and latency of the worker availability lookup versus work group size.')
+
+    parser.add_argument('--database', default=DEFAULT_DATABASE_URI, type=str, help='Database URI used for the seeded dataset.')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, type=int, nargs='+', help='Work group sizes to measure.')
+    parser.add_argument('--bookings-per-worker', default=DEFAULT_BOOKINGS_PER_WORKER, type=int, help='Bookings seeded for every worker.')
+    parser.add_argument('--repeat', default=DEFAULT_REPEAT, type=int, help='Repetitions per measurement.')
+    parser.add_argument('--output', default=None, type=str, help='Optional JSON file to store the results.')
+
+    args = parser.parse_args()
+
+    results = run(args.database, args.sizes, args.bookings_per_worker, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=4)
+
+if __name__ == '__main__':
+    main()
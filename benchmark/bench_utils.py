@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+
+ROOT_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+if ROOT_FOLDER not in sys.path:
+    sys.path.insert(0, ROOT_FOLDER)
+
+DEFAULT_DATABASE_URI = 'sqlite://'
+
+class QueryCounter:
+
+    def __init__(self, engine) -> None:
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+    def __enter__(self):
+        from sqlalchemy import event
+        event.listen(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *args):
+        from sqlalchemy import event
+        event.remove(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+
+def create_benchmark_app(database_uri = DEFAULT_DATABASE_URI):
+
+    from app import create_app, db
+    from tests.config_test import ConfigTest
+
+    config = ConfigTest(database_uri = database_uri)
+
+    app = create_app(config)
+
+    with app.app_context():
+        db.create_all()
+        config.insertUserSession(db)
+        config.insertStatus(db)
+        config.insertWeekdays(db)
+
+    return app
+
+def timeit(func, repeat):
+
+    times = []
+    result = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+
+    times.sort()
+
+    return result, {
+        'min_ms': times[0] * 1000,
+        'median_ms': times[len(times) // 2] * 1000,
+        'max_ms': times[-1] * 1000,
+    }
@@ -0,0 +1,172 @@
+import argparse
+import json
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from bench_utils import DEFAULT_DATABASE_URI, create_benchmark_app, timeit
+
+DEFAULT_BOOKINGS = 1000000
+DEFAULT_LOCALS = 10
+DEFAULT_REPEAT = 5
+
+BATCH_SIZE = 5000
+
+PREFIX_CASES = ['tlf_prefix']
+
+FIRST_NAMES = ['José', 'María', 'Pedro', 'Lucía', 'Martín', 'Sofía', 'Álvaro', 'Inés', 'Jorge', 'Núria', 'Pablo', 'Elena', 'Raúl', 'Marta', 'Iván', 'Ángela']
+LAST_NAMES = ['García', 'López', 'Martínez', 'Sánchez', 'Gómez', 'Pérez', 'Muñoz', 'Fernández', 'Ruiz', 'Díaz', 'Álvarez', 'Romero', 'Navarro', 'Ibáñez']
+DOMAINS = ['gmail.com', 'hotmail.com', 'yahoo.es', 'outlook.com', 'example.org']
+
+def seed(db, bookings_count, locals_count):
+    """
+    Bookings of the last two years spread over the locals, inserted with the search columns and
+    grams the model would write.
+    """
+
+    from sqlalchemy import insert
+
+    from globals import CONFIRMED_STATUS
+    from helpers.ClientSearch import CLIENT_SEARCH_FIELDS, searchGrams
+    from helpers.ReferenceData import getStatusId
+    from models import BookingModel, BookingSearchGramModel, LocalModel
+
+    random.seed(0)
+
+    locals_ids = [uuid.uuid4().hex for _ in range(locals_count)]
+
+    for local_id in locals_ids:
+        db.session.add(LocalModel(id=local_id, name='Benchmark', tlf='000000000', email=f'{local_id}@benchmark.local', location='Europe/Madrid', password='-'))
+
+    db.session.commit()
+
+    status_id = getStatusId(CONFIRMED_STATUS)
+    first_day = datetime.now() - timedelta(days=730)
+
+    for first_id in range(1, bookings_count + 1, BATCH_SIZE):
+
+        bookings = []
+        grams = []
+
+        for booking_id in range(first_id, min(first_id + BATCH_SIZE, bookings_count + 1)):
+
+            first_name, last_name = random.choice(FIRST_NAMES), random.choice(LAST_NAMES)
+            datetime_init = first_day + timedelta(minutes=15 * random.randrange(730 * 24 * 4))
+
+            booking = {
+                'id': booking_id,
+                'datetime_init': datetime_init,
+                'datetime_end': datetime_init + timedelta(minutes=30),
+                'client_name': f'{first_name} {last_name}',
+                'client_tlf': f'6{random.randrange(10 ** 8):08d}',
+                'client_email': f'{first_name.lower()}.{random.randrange(10 ** 4)}@{random.choice(DOMAINS)}',
+                'status_id': status_id,
+                'local_id': random.choice(locals_ids),
+                'email_confirm': False,
+                'email_confirmed': False,
+                'email_cancelled': False,
+                'email_updated': False,
+            }
+
+            for field, (code, search_column, normalize) in CLIENT_SEARCH_FIELDS.items():
+                booking[search_column] = normalize(booking[field])
+                grams += [{'booking_id': booking_id, 'field': code, 'gram': gram, 'local_id': booking['local_id']} for gram in searchGrams(booking[search_column])]
+
+            bookings.append(booking)
+
+        db.session.execute(insert(BookingModel), bookings)
+        db.session.execute(insert(BookingSearchGramModel), grams)
+        db.session.commit()
+
+    return locals_ids
+
+def legacy_search(local_id, client_filter):
+
+    from sqlalchemy import or_
+
+    from app import db
+    from helpers.BookingController import getBookingsQuery
+    from models import BookingModel
+
+    bookings_query = getBookingsQuery(local_id)
+
+    if client_filter['name']: bookings_query = bookings_query.filter(or_(BookingModel.client_name.ilike(f'%{client_filter["name"]}%'), BookingModel.client_name.ilike(f'%{client_filter["name"].strip().title()}%')))
+    if client_filter['email']: bookings_query = bookings_query.filter(BookingModel.client_email.ilike(f'%{client_filter["email"]}%'))
+    if client_filter['tlf']: bookings_query = bookings_query.filter(BookingModel.client_tlf.ilike(f'%{client_filter["tlf"]}%'))
+
+    return set(db.session.execute(bookings_query.with_entities(BookingModel.id).statement).scalars())
+
+def indexed_search(local_id, client_filter):
+
+    from app import db
+    from helpers.BookingController import getFilteredBookingsQuery
+    from models import BookingModel
+
+    return set(db.session.execute(getFilteredBookingsQuery(local_id, None, None, client_filter=client_filter).with_entities(BookingModel.id).statement).scalars())
+
+def search_cases():
+
+    cases = {
+        'tlf_prefix': {'tlf': '61'},
+        'tlf_4_digits': {'tlf': '4567'},
+        'tlf_full': {'tlf': '612345678'},
+        'name_last_name': {'name': 'Ibáñez'},
+        'name_full': {'name': 'Inés Navarro'},
+        'email_user': {'email': 'pablo.12'},
+        'email_domain': {'email': 'yahoo'},
+    }
+
+    return {name: {'name': None, 'email': None, 'tlf': None, **client_filter} for name, client_filter in cases.items()}
+
+def run(database_uri, bookings_count, locals_count, repeat):
+
+    from app import db
+
+    app = create_benchmark_app(database_uri)
+
+    results = []
+
+    with app.app_context():
+
+        locals_ids = seed(db, bookings_count, locals_count)
+        local_id = locals_ids[0]
+
+        for name, client_filter in search_cases().items():
+
+            legacy, legacy_latency = timeit(lambda: legacy_search(local_id, client_filter), repeat)
+            indexed, indexed_latency = timeit(lambda: indexed_search(local_id, client_filter), repeat)
+
+            if name in PREFIX_CASES:
+                # Values shorter than a gram are searched as a prefix.
+                assert indexed <= legacy, f'{name}: the prefix search finds other bookings.'
+            else:
+                # The normalized columns also match accents and formats the ILIKE misses.
+                assert legacy <= indexed, f'{name}: the search index misses bookings.'
+
+            row = {'case': name, 'client_filter': client_filter, 'legacy': {'rows': len(legacy), **legacy_latency}, 'indexed': {'rows': len(indexed), **indexed_latency}}
+            results.append(row)
+
+            print(f"{name:<16} | legacy: {len(legacy):>7} rows {legacy_latency['median_ms']:9.2f} ms | indexed: {len(indexed):>7} rows {indexed_latency['median_ms']:9.2f} ms")
+
+    return results
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Latency of the client search of the bookings: ILIKE on the raw columns versus the normalized columns and grams.')
+
+    parser.add_argument('--database', default=DEFAULT_DATABASE_URI, type=str, help='Database URI used for the seeded dataset.')
+    parser.add_argument('--bookings', default=DEFAULT_BOOKINGS, type=int, help='Synthetic bookings seeded.')
+    parser.add_argument('--locals', default=DEFAULT_LOCALS, type=int, help='Locals the bookings are spread over.')
+    parser.add_argument('--repeat', default=DEFAULT_REPEAT, type=int, help='Repetitions per measurement.')
+    parser.add_argument('--output', default=None, type=str, help='Optional JSON file to store the results.')
+
+    args = parser.parse_args()
+
+    results = run(args.database, args.bookings, args.locals, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=4)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+from bench_utils import timeit
+
+DEFAULT_SIZES = [4, 16, 64]
+DEFAULT_REPEAT = 2000
+
+LOCAL_ID = 'benchmark'
+
+def build_template(size_kb):
+
+    from globals import KEYWORDS_PAGES
+
+    placeholders = ' '.join(KEYWORDS_PAGES.values())
+    paragraph = f'<p style="font-family: Arial, sans-serif; color: #333333;">{placeholders}</p>\n'
+
+    body = ''
+    while len(body) < size_kb * 1024:
+        body += paragraph
+
+    return f"<html><head><title>Reserva en {KEYWORDS_PAGES['LOCAL_NAME']}</title></head><body>{body}</body></html>"
+
+def build_values():
+
+    from globals import KEYWORDS_PAGES
+
+    return {name: f'value of {name.lower()}' for name in KEYWORDS_PAGES if name != 'BOOKING_TOKEN'}
+
+def legacy_render(path, values):
+
+    from globals import KEYWORDS_PAGES
+
+    with open(path, 'rb') as file:
+        mail_body = file.read().decode('utf-8')
+
+    for name, value in values.items():
+        mail_body = mail_body.replace(KEYWORDS_PAGES[name], value)
+
+    subject = mail_body.split("<title>")[1].split("</title>")[0]
+
+    return (mail_body, subject)
+
+def run(sizes, repeat):
+
+    from helpers.EmailTemplate import get_template, invalidate_template, render_template
+    from helpers.path import generatePagePath
+
+    folder = tempfile.mkdtemp()
+    os.environ['PUBLIC_FOLDER'] = folder
+
+    page = generatePagePath('email_benchmark.html')
+    path = os.path.join(folder, LOCAL_ID, page)
+    os.makedirs(os.path.dirname(path))
+
+    values = build_values()
+
+    results = []
+
+    try:
+        for size in sizes:
+
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(build_template(size))
+
+            invalidate_template(LOCAL_ID)
+
+            legacy, legacy_latency = timeit(lambda: legacy_render(path, values), repeat)
+            compiled, compiled_latency = timeit(lambda: render_template(get_template(LOCAL_ID, page), values), repeat)
+
+            assert legacy == compiled, 'The compiled template renders a different mail.'
+
+            row = {'template_kb': size, 'legacy': legacy_latency, 'compiled': compiled_latency}
+            results.append(row)
+
+            print(f"template={size:>4} KB | legacy: {legacy_latency['median_ms'] * 1000:9.1f} us/mail | compiled: {compiled_latency['median_ms'] * 1000:9.1f} us/mail | x{legacy_latency['median_ms'] / compiled_latency['median_ms']:.1f}")
+    finally:
+        shutil.rmtree(folder)
+
+    return results
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Rendering time per mail of the chained replace versus the compiled template cache.')
+
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, type=int, nargs='+', help='Template sizes in KB.')
+    parser.add_argument('--repeat', default=DEFAULT_REPEAT, type=int, help='Mails rendered per measurement.')
+    parser.add_argument('--output', default=None, type=str, help='Optional JSON file to store the results.')
+
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=4)
+
+if __name__ == '__main__':
+    main()
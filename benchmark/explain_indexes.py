@@ -0,0 +1,193 @@
+import argparse
+import json
+import random
+import uuid
+from datetime import datetime, time, timedelta
+
+from bench_utils import DEFAULT_DATABASE_URI, create_benchmark_app
+
+DEFAULT_WORKERS = 20
+DEFAULT_DAYS = 365
+DEFAULT_BOOKINGS_PER_DAY = 8
+
+INDEXED_TABLES = ['booking', 'closed', 'timetable', 'file', 'work_group_worker']
+
+# Indexes added by the 7c4e9b2a5d13 migration.
+NEW_INDEXES = ['ix_booking_worker_datetime', 'ix_booking_local_datetime', 'ix_booking_status_datetime_end', 'ix_closed_local_datetime',
+               'ix_timetable_local_weekday', 'ix_file_local_path', 'ix_work_group_worker_worker']
+
+def seed(db, workers_count, days, bookings_per_day):
+    """
+    One local with a year of history and a month of upcoming bookings for every worker.
+    """
+
+    from globals import CANCELLED_STATUS, CONFIRMED_STATUS, DONE_STATUS, PENDING_STATUS, WEEK_DAYS
+    from helpers.ReferenceData import getStatusIds, getWeekdayId
+    from models import BookingModel, ClosedModel, LocalModel, TimetableModel, WorkGroupModel, WorkerModel
+    from models.file import FileModel
+
+    random.seed(0)
+
+    local = LocalModel(id=uuid.uuid4().hex, name='Benchmark', tlf='000000000', email=f'{uuid.uuid4().hex}@benchmark.local', location='Europe/Madrid', password='-')
+    work_group = WorkGroupModel(name='Benchmark', local_id=local.id)
+    db.session.add_all([local, work_group])
+    db.session.flush()
+
+    workers = [WorkerModel(name=f'Worker {i}') for i in range(workers_count)]
+    work_group.workers.extend(workers)
+
+    for weekday in WEEK_DAYS:
+        db.session.add(TimetableModel(local_id=local.id, weekday_id=getWeekdayId(weekday), opening_time=time(10), closing_time=time(15)))
+        db.session.add(TimetableModel(local_id=local.id, weekday_id=getWeekdayId(weekday), opening_time=time(16), closing_time=time(20)))
+
+    for i in range(100):
+        db.session.add(FileModel(name=f'image_{i}.png', local_id=local.id, mimetype='image/png', path=f'images/gallery/image_{i}.png'))
+
+    db.session.flush()
+
+    status_ids = getStatusIds()
+    past_status = [status_ids[DONE_STATUS], status_ids[CANCELLED_STATUS]]
+    upcoming_status = [status_ids[CONFIRMED_STATUS], status_ids[PENDING_STATUS]]
+
+    today = datetime.combine(datetime.now().date(), time(10))
+    upcoming = 30
+
+    for day in range(-days, upcoming):
+        date = today + timedelta(days=day)
+
+        if day % 30 == 0:
+            db.session.add(ClosedModel(local_id=local.id, datetime_init=date, datetime_end=date + timedelta(days=1)))
+
+        for worker in workers:
+            for j in range(bookings_per_day):
+                datetime_init = date + timedelta(minutes=30 * j)
+                db.session.add(BookingModel(datetime_init=datetime_init, datetime_end=datetime_init + timedelta(minutes=30), client_name='Client',
+                                            status_id=random.choice(past_status if day < 0 else upcoming_status),
+                                            worker_id=worker.id, local_id=local.id, work_group_id=work_group.id))
+
+    db.session.commit()
+
+    return local, workers, today + timedelta(days=7)
+
+def hot_queries(local, workers, datetime_init):
+    """
+    The statements of the request paths, built by the same helpers when they return one.
+    """
+
+    from sqlalchemy import and_, select
+
+    from globals import CONFIRMED_STATUS, DONE_STATUS, PENDING_STATUS
+    from helpers.BookingController import getBookingsQuery, getStatusFilter
+    from helpers.ReferenceData import getStatusIds, getWeekdayId
+    from models import BookingModel, ClosedModel, TimetableModel, WorkerModel
+    from models.file import FileModel
+    from models.work_group_worker import WorkGroupWorkerModel
+
+    datetime_end = datetime_init + timedelta(hours=1)
+    day_init, day_end = datetime.combine(datetime_init.date(), time.min), datetime.combine(datetime_init.date() + timedelta(days=1), time.min)
+    datetime_now = datetime.now()
+    worker_ids = [worker.id for worker in workers]
+
+    overlapping = select(BookingModel.worker_id).where(BookingModel.datetime_end > datetime_init,
+                                                       BookingModel.datetime_init < datetime_end,
+                                                       BookingModel.status_id.in_(getStatusIds(CONFIRMED_STATUS, PENDING_STATUS)))
+
+    return {
+        'available_workers': select(WorkerModel.id).where(WorkerModel.id.in_(worker_ids), ~overlapping.where(BookingModel.worker_id == WorkerModel.id).exists()),
+        'busy_workers_for_update': overlapping.where(BookingModel.worker_id.in_(worker_ids)),
+        'busy_intervals': select(BookingModel.worker_id, BookingModel.datetime_init, BookingModel.datetime_end)
+                          .where(BookingModel.worker_id.in_(worker_ids), BookingModel.datetime_end > day_init, BookingModel.datetime_init < day_end,
+                                 BookingModel.status_id.in_(getStatusIds(CONFIRMED_STATUS, PENDING_STATUS))),
+        'bookings_range': getBookingsQuery(local.id, day_init, day_end).statement,
+        'bookings_upcoming_status': getBookingsQuery(local.id, datetime_now).filter(getStatusFilter([CONFIRMED_STATUS, PENDING_STATUS], datetime_now)).statement,
+        'bookings_worker': getBookingsQuery(local.id, day_init, day_end).filter(BookingModel.worker_id == worker_ids[0]).statement,
+        'done_sweep': select(BookingModel.id).where(and_(BookingModel.local_id.in_([local.id]), BookingModel.datetime_end < datetime_now,
+                                                         BookingModel.status_id.in_(getStatusIds(PENDING_STATUS, CONFIRMED_STATUS)))),
+        'done_status': select(BookingModel.id).where(BookingModel.status_id == getStatusIds()[DONE_STATUS], BookingModel.datetime_end > day_init),
+        'closed_range': select(ClosedModel.datetime_init, ClosedModel.datetime_end)
+                        .where(ClosedModel.local_id == local.id, ClosedModel.datetime_end > day_init, ClosedModel.datetime_init < day_end)
+                        .order_by(ClosedModel.datetime_init),
+        'timetable_weekday': select(TimetableModel).filter_by(local_id=local.id, weekday_id=getWeekdayId('MO')).order_by(TimetableModel.opening_time),
+        'public_file': select(FileModel).filter_by(local_id=local.id, path='images/gallery/image_50.png').limit(1),
+        'worker_work_groups': select(WorkGroupWorkerModel.work_group_id).where(WorkGroupWorkerModel.worker_id == worker_ids[0]),
+    }
+
+def explain(db, statement):
+
+    dialect = db.engine.dialect
+
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect.name == 'sqlite' else 'EXPLAIN '
+
+    with db.engine.connect() as connection:
+        result = connection.exec_driver_sql(prefix + sql)
+        columns = list(result.keys())
+        return [dict(zip(columns, row)) for row in result]
+
+def model_indexes(db):
+    return [index for table in INDEXED_TABLES for index in db.metadata.tables[table].indexes if index.name in NEW_INDEXES]
+
+def print_plan(name, stage, plan):
+
+    print(f"{name} [{stage}]")
+
+    for row in plan:
+        print('    ' + ' | '.join(f"{value}" for key, value in row.items() if key not in ('id', 'parent', 'notused')))
+
+def run(database_uri, workers_count, days, bookings_per_day):
+
+    from app import db
+
+    app = create_benchmark_app(database_uri)
+
+    results = {}
+
+    with app.app_context():
+
+        local, workers, datetime_init = seed(db, workers_count, days, bookings_per_day)
+        queries = hot_queries(local, workers, datetime_init)
+        indexes = model_indexes(db)
+
+        for index in indexes:
+            index.drop(bind=db.engine)
+
+        for name, statement in queries.items():
+            results[name] = {'before': explain(db, statement)}
+
+        for index in indexes:
+            index.create(bind=db.engine)
+
+        if db.engine.dialect.name == 'sqlite':
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql('ANALYZE')
+
+        for name, statement in queries.items():
+            results[name]['after'] = explain(db, statement)
+
+            print_plan(name, 'before', results[name]['before'])
+            print_plan(name, 'after', results[name]['after'])
+            print()
+
+    return results
+
+def main():
+
+    parser = argparse.ArgumentParser(description='EXPLAIN of the booking hot queries before and after the composite indexes, on a seeded dataset.')
+
+    parser.add_argument('--database', default=DEFAULT_DATABASE_URI, type=str, help='Database URI used for the seeded dataset.')
+    parser.add_argument('--workers', default=DEFAULT_WORKERS, type=int, help='Workers of the seeded local.')
+    parser.add_argument('--days', default=DEFAULT_DAYS, type=int, help='Days of past bookings seeded.')
+    parser.add_argument('--bookings-per-day', default=DEFAULT_BOOKINGS_PER_DAY, type=int, help='Bookings seeded per worker and day.')
+    parser.add_argument('--output', default=None, type=str, help='Optional JSON file to store the plans.')
+
+    args = parser.parse_args()
+
+    results = run(args.database, args.workers, args.days, args.bookings_per_day)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=4, default=str)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+import argparse
+import contextlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+from bench_utils import timeit
+
+DEFAULT_LINES = [2, 5, 10]
+DEFAULT_LEVELS = ['DEBUG', 'INFO', 'WARNING']
+DEFAULT_REPEAT = 2000
+
+BOOKING = {'datetime_init': '2030-01-01T10:00:00', 'services_ids': [1, 2], 'client_name': 'Client', 'client_tlf': '612345678', 'client_email': 'client@test.com', 'comment': 'x' * 200}
+
+def create_logger(path):
+
+    logger = logging.getLogger('booking_app_benchmark')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter('[%(asctime)s] [%(levelname)s] - %(message)s'))
+    logger.addHandler(handler)
+
+    return logger, handler
+
+def legacy_request(cache, logger, uuid, lines):
+    """
+    A request logged as before: every line printed and buffered, one new thread per flush.
+    """
+
+    def write(logs):
+        for line in logs:
+            logger.info(line['message'])
+
+    for i in range(lines):
+        message = f"[{uuid}]: line {i}"
+        print(f"[INFO] - {message}")
+        cache.setdefault(uuid, []).append({'level': 'INFO', 'message': message})
+
+    thread = threading.Thread(target=write, args=(cache.pop(uuid),))
+    thread.start()
+
+    return thread
+
+def run(lines, repeat):
+
+    import globals
+    from globals import flush_logs, get_log_metrics, getLogger, log, setLogger
+
+    folder = tempfile.mkdtemp()
+    logger, handler = create_logger(os.path.join(folder, 'benchmark.log'))
+
+    previous_logger, previous_stdout = getLogger(), globals.LOG_STDOUT
+    setLogger(logger)
+    globals.LOG_STDOUT = False
+
+    results = []
+
+    try:
+        with open(os.devnull, 'w') as devnull:
+            for size in lines:
+
+                threads = []
+                cache = {}
+                counter = iter(range(repeat * 2))
+
+                def legacy():
+                    with contextlib.redirect_stdout(devnull):
+                        threads.append(legacy_request(cache, logger, f"legacy-{next(counter)}", size))
+
+                def queued():
+                    uuid = f"queued-{next(counter)}"
+                    for i in range(size - 1):
+                        log(f"line {i}", uuid=uuid)
+                    log(f"line {size - 1}", uuid=uuid, save_cache=True)
+
+                _, legacy_latency = timeit(legacy, repeat)
+                for thread in threads: thread.join()
+
+                _, queued_latency = timeit(queued, repeat)
+                flush_logs()
+
+                row = {'lines': size, 'legacy': legacy_latency, 'queued': queued_latency}
+                results.append(row)
+
+                print(f"lines={size:>3} | thread per flush: {legacy_latency['median_ms'] * 1000:8.1f} us/request | single writer: {queued_latency['median_ms'] * 1000:8.1f} us/request | x{legacy_latency['median_ms'] / queued_latency['median_ms']:.1f}")
+
+        print(f"log metrics: {get_log_metrics()}")
+    finally:
+        setLogger(previous_logger)
+        globals.LOG_STDOUT = previous_stdout
+        logger.removeHandler(handler)
+        handler.close()
+        shutil.rmtree(folder)
+
+    return results
+
+def run_levels(levels, repeat):
+    """
+    Logging cost of a booking request as log_route and the booking resource log it, per LOGGING_LEVEL.
+    """
+
+    import globals
+    from flask import Flask, Response
+    from globals import LOGGING_LEVELS, flush_logs, getLogger, log, setLogger
+
+    folder = tempfile.mkdtemp()
+    logger, handler = create_logger(os.path.join(folder, 'benchmark.log'))
+
+    previous_logger, previous_stdout, previous_level = getLogger(), globals.LOG_STDOUT, globals.LOGGING_LEVEL
+    setLogger(logger)
+    globals.LOG_STDOUT = False
+
+    app = Flask(__name__)
+    body = json.dumps({'booking': BOOKING, 'session_token': 'token'})
+    counter = iter(range(repeat * len(levels)))
+
+    def request():
+        uuid = f"level-{next(counter)}"
+        with app.test_request_context('/api/v1/booking/local/1', method='POST', json=BOOKING, headers={'Authorization': 'Bearer token'}) as context:
+            log("Request received", uuid=uuid, request=context.request)
+            log("Creating a new booking for local '%s'.", 'Local', uuid=uuid)
+            for i in range(3):
+                log("Booking lock '%s' acquired.", f"booking_lock:1:worker:{i}", uuid=uuid, level='DEBUG')
+            log("Commiting booking for local '%s'.", 'Local', uuid=uuid)
+            log("Response generated", uuid=uuid, request=context.request, response=Response(body, mimetype='application/json'), save_cache=True)
+
+    def baseline():
+        with app.test_request_context('/api/v1/booking/local/1', method='POST', json=BOOKING, headers={'Authorization': 'Bearer token'}):
+            pass
+
+    results = []
+
+    try:
+        _, baseline_latency = timeit(baseline, repeat)
+
+        for level in levels:
+            globals.LOGGING_LEVEL = LOGGING_LEVELS[level]
+
+            _, latency = timeit(request, repeat)
+            flush_logs()
+
+            cost = latency['median_ms'] - baseline_latency['median_ms']
+            results.append({'level': level, 'latency': latency, 'logging_ms': cost})
+
+            print(f"level={level:>7} | {latency['median_ms'] * 1000:8.1f} us/request | logging: {cost * 1000:8.1f} us/request")
+    finally:
+        setLogger(previous_logger)
+        globals.LOG_STDOUT, globals.LOGGING_LEVEL = previous_stdout, previous_level
+        logger.removeHandler(handler)
+        handler.close()
+        shutil.rmtree(folder)
+
+    return results
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Logging time spent by the request thread: thread per flush versus the single log writer, and per LOGGING_LEVEL.')
+
+    parser.add_argument('--lines', default=DEFAULT_LINES, type=int, nargs='+', help='Lines logged per request.')
+    parser.add_argument('--levels', default=DEFAULT_LEVELS, type=str, nargs='+', help='LOGGING_LEVEL values to measure a booking request with.')
+    parser.add_argument('--repeat', default=DEFAULT_REPEAT, type=int, help='Requests per measurement.')
+    parser.add_argument('--output', default=None, type=str, help='Optional JSON file to store the results.')
+
+    args = parser.parse_args()
+
+    results = {'writer': run(args.lines, args.repeat), 'levels': run_levels(args.levels, args.repeat)}
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=4)
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,12 @@
 from celery import Celery, Task
+from celery.signals import worker_process_init, worker_process_shutdown
+
+from helpers.ReferenceData import reloadReferenceData
+from helpers.SmtpPool import close_smtp_pools
+
+@worker_process_shutdown.connect
+def close_worker_connections(**kwargs):
+    close_smtp_pools()
 
 def make_celery(app):
     class ContextTask(Task):
@@ -18,6 +26,11 @@ def make_celery(app):
         broker_connection_retry_on_startup=True
     )
     
+    @worker_process_init.connect(weak=False)
+    def load_worker_reference_data(**kwargs):
+        with app.app_context():
+            reloadReferenceData()
+    
     celery.set_default()
     app.extensions['celery'] = celery
             
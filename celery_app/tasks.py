@@ -8,7 +8,8 @@ from dotenv import load_dotenv
 import sqlalchemy
 from db import addAndCommit, rollback
 from helpers.Backup import backup_all
-from helpers.EmailController import send_cancelled_booking_mail, send_confirmed_booking_mail, send_updated_booking_mail
+from helpers.closed import purgeClosedDays
+from helpers.EmailController import send_cancelled_booking_mail, send_confirm_booking_mail, send_confirmed_booking_mail, send_updated_booking_mail
 from helpers.error.BookingError.BookingNotFoundException import BookingNotFoundException
 from helpers.error.LocalError.LocalNotFoundException import LocalNotFoundException
 from helpers.security import generateTokens, generateUUID
@@ -16,7 +17,7 @@ from models.booking import BookingModel
 from globals import CANCELLED_STATUS, CONFIRMED_STATUS, FILENAME_LOG, PENDING_STATUS, RETRY_SEND_EMAIL, USER_ROLE, EmailType, is_email_test_mode, log
 from models.local import LocalModel
 from models.session_token import SessionTokenModel
-from helpers.BookingController import calculateExpireBookingToken, cancelBooking
+from helpers.BookingController import calculateExpireBookingToken, cancelBooking, confirmBooking, markDoneBookings
      
 @shared_task(queue='default')   
 def check_booking_status(booking_id):
@@ -46,7 +47,8 @@ def check_booking_status(booking_id):
         send_mail_task.delay(booking.local_id, booking_id, int(EmailType.CANCELLED_EMAIL))   
     
 def set_email_sent(booking, email_type: int, email_sent, commit = True):
-    if email_type == int(EmailType.CONFIRMED_EMAIL): booking.email_confirmed = email_sent
+    if email_type == int(EmailType.CONFIRM_EMAIL): booking.email_confirm = email_sent
+    elif email_type == int(EmailType.CONFIRMED_EMAIL): booking.email_confirmed = email_sent
     elif email_type == int(EmailType.CANCELLED_EMAIL): booking.email_cancelled = email_sent
     elif email_type == int(EmailType.UPDATED_EMAIL): booking.email_updated = email_sent
     else: raise Exception(f"Unknown email_type '{email_type}'.")
@@ -54,6 +56,21 @@ def set_email_sent(booking, email_type: int, email_sent, commit = True):
     if commit: addAndCommit(booking)
     
     return booking
+
+def confirm_without_email(local_id, booking, _uuid = None):
+    
+    if booking.status.status != PENDING_STATUS:
+        log(f"Booking '{booking.id}' is not pending. Status: {booking.status.status}", uuid=_uuid)
+        return False
+    
+    log(f"Confirm email not sent. Confirming booking '{booking.id}'.", uuid=_uuid, level="WARNING", save_cache=True)
+    
+    confirmBooking(booking)
+    
+    if is_email_test_mode(): send_mail_task(local_id, booking.id, int(EmailType.CONFIRMED_EMAIL))
+    else: send_mail_task.delay(local_id, booking.id, int(EmailType.CONFIRMED_EMAIL), _uuid = _uuid)
+    
+    return False
         
 @shared_task(bind=True, queue='priority', max_retries=3, default_retry_delay=60 * RETRY_SEND_EMAIL)
 def send_mail_task(self, local_id, booking_id, email_type: int, _uuid = None):
@@ -83,7 +100,9 @@ def send_mail_task(self, local_id, booking_id, email_type: int, _uuid = None):
     
     token = generateTokens(booking_id, local_id, refresh_token=True, expire_refresh=exp, user_role=USER_ROLE)
                 
-    if email_type == int(EmailType.CONFIRMED_EMAIL):
+    if email_type == int(EmailType.CONFIRM_EMAIL):
+        send_mail = send_confirm_booking_mail
+    elif email_type == int(EmailType.CONFIRMED_EMAIL):
         send_mail = send_confirmed_booking_mail
     elif email_type == int(EmailType.CANCELLED_EMAIL):
         send_mail = send_cancelled_booking_mail
@@ -99,6 +118,11 @@ def send_mail_task(self, local_id, booking_id, email_type: int, _uuid = None):
         if not success:
             
             set_email_sent(booking, email_type, False)
+            
+            # The client has a few minutes to confirm, so a retry would arrive
+            # too late: the booking is confirmed without the email instead.
+            if email_type == int(EmailType.CONFIRM_EMAIL):
+                return confirm_without_email(local_id, booking, _uuid = _uuid)
                         
             if is_email_test_mode(): return
                         
@@ -111,19 +135,61 @@ def send_mail_task(self, local_id, booking_id, email_type: int, _uuid = None):
             rollback()
             raise e
         
+        return True
+        
     except Exception as exc:
+        if email_type == int(EmailType.CONFIRM_EMAIL):
+            log("Error sending confirm email.", uuid=_uuid, error=exc, level="ERROR", save_cache=True)
+            rollback()
+            return confirm_without_email(local_id, BookingModel.query.get(booking_id), _uuid = _uuid)
+        
         #self.default_retry_delay
         log(f"Error sending email. Retrying in {self.default_retry_delay} seconds.", uuid=_uuid, error=exc, level="ERROR", save_cache=True)
         self.retry(exc=exc)
         
+@shared_task(queue='default')
+def send_mails_batch_task(local_id, booking_ids, email_type: int, _uuid = None):
+    """
+    Sends the emails of several bookings from one task, so they share the SMTP connection.
+    The emails that fail are queued one by one to be retried.
+    """
+    
+    log(f"Sending {len(booking_ids)} emails. Email Type: {email_type}", uuid=_uuid)
+    
+    sent = 0
+    
+    for booking_id in booking_ids:
+        try:
+            if send_mail_task(local_id, booking_id, email_type, _uuid = _uuid): sent += 1
+        except Exception as e:
+            log(f"Error sending email of booking '{booking_id}'. Queued to be retried.", uuid=_uuid, error=e, level="ERROR", save_cache=True)
+            rollback()
+            if not is_email_test_mode(): send_mail_task.delay(local_id, booking_id, email_type, _uuid = _uuid)
+    
+    log(f"{sent} of {len(booking_ids)} emails sent.", uuid=_uuid)
+    
+    return sent
+        
+@shared_task(queue='default')
+def mark_done_bookings():
+    uuid = generateUUID()
+    
+    return markDoneBookings(_uuid=uuid)
+
+@shared_task(queue='default')
+def purge_closed_days():
+    uuid = generateUUID()
+    
+    return purgeClosedDays(_uuid=uuid)
+
 #execue at especific time
 @shared_task(queue='default')
 def daily_worker():
     uuid = generateUUID()
-    log('Daily worker executed at:', time.strftime('%X'), uuid=uuid)
+    log('Daily worker executed at: %s', time.strftime('%X'), uuid=uuid)
     
     backup_all(_uuid_log=uuid)
     
-    log('Daily worker finished at:', time.strftime('%X'), uuid=uuid, save_cache=True)
+    log('Daily worker finished at: %s', time.strftime('%X'), uuid=uuid, save_cache=True)
     
     #TODO: Add more tasks. Crear vistas en la base datos y eliminar reservas antiguas. Optimizar la base de datos.
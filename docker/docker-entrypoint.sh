@@ -18,6 +18,17 @@ envsubst '$SSL_CERT_FILE $SSL_KEY_FILE $SERVER_NAME' < /app/apache-flask.conf.te
 a2enmod ssl
 a2enmod rewrite
 a2enmod wsgi
+a2enmod xsendfile
+
+# Vaciar las métricas de la ejecución anterior (varios procesos WSGI)
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+    chown apiuser:apiuser "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
+# Aplicar las migraciones pendientes de la base de datos
+flask db upgrade
 
 if [ "$FLASK_ENV" = "production" ]; then
     # Iniciar Apache en primer plano
@@ -1,9 +1,13 @@
+import atexit
+from collections import OrderedDict
 from datetime import datetime
 from enum import Enum
 import json
 from logging.handlers import TimedRotatingFileHandler
+import queue
 import socket
 import threading
+import time
 import traceback
 import uuid
 from dotenv import load_dotenv
@@ -31,6 +35,11 @@ DEFAULT_DAILY_MINUTE = 0
 
 DEFAULT_REDIS_HOST = 'localhost'
 DEFAULT_REDIS_PORT = 6379
+DEFAULT_REDIS_MAX_CONNECTIONS = 50
+DEFAULT_REDIS_SOCKET_TIMEOUT = 5
+DEFAULT_REDIS_CONNECT_TIMEOUT = 2
+DEFAULT_REDIS_HEALTH_CHECK_INTERVAL = 30
+DEFAULT_REDIS_RETRIES = 2
 
 DEFAULT_ADMIN_IDENTITY = '744656b1e8a24f998685134efabe2f3f'
 DEFAULT_JWT_ALGORITHM = 'HS256'
@@ -110,6 +119,42 @@ DEFAULT_RETRY_SEND_EMAIL = 120
 
 DEFAULT_MAX_TIMEOUT_WAIT_BOOKING = 5
 
+DEFAULT_LOCK_POLL_INTERVAL = 1
+
+DEFAULT_AVAILABILITY_INTERVAL = 15
+DEFAULT_MAX_AVAILABILITY_DAYS = 31
+
+DEFAULT_MAX_BULK_BOOKINGS = 500
+DEFAULT_BULK_BOOKING_LOCK_EXPIRE = 60
+
+DEFAULT_MAX_BOOKINGS_PAGE_SIZE = 500
+DEFAULT_BOOKINGS_STREAM_CHUNK = 200
+
+DEFAULT_DONE_SWEEP_INTERVAL = 15
+DEFAULT_DONE_SWEEP_BATCH_SIZE = 1000
+
+DEFAULT_SMTP_POOL_SIZE = 2
+DEFAULT_SMTP_POOL_IDLE_TIMEOUT = 240
+DEFAULT_SMTP_POOL_NOOP_INTERVAL = 15
+DEFAULT_SMTP_TIMEOUT = 30
+
+DEFAULT_TOKEN_CACHE_SIZE = 10000
+DEFAULT_TOKEN_CACHE_LOCAL_TTL = 5
+DEFAULT_TOKEN_CACHE_NEGATIVE_TTL = 60
+DEFAULT_TOKEN_CACHE_TTL = 300
+
+DEFAULT_SCHEDULE_CACHE_TTL = 3600
+
+DEFAULT_RESPONSE_CACHE_TTL = 3600
+DEFAULT_RESPONSE_CACHE_MAX_AGE = 0
+
+DEFAULT_FILE_CACHE_SIZE = 10000
+DEFAULT_FILE_CACHE_TTL = 300
+DEFAULT_FILES_MAX_AGE = 0
+DEFAULT_HASHED_FILES_MAX_AGE = 31536000
+
+DEFAULT_QUERY_REPEAT_THRESHOLD = 10
+
 #---- LOGGING CONFIG --------------
 
 LOGGING_LEVELS = {
@@ -127,6 +172,14 @@ DEFAULT_BACKUP_COUNT_LOG = 3
 DEFAULT_LOGGING_LEVEL = 'INFO'
 DEFAULT_LOGGING_FORMAT = "[%(asctime)s] [%(levelname)s] - %(message)s"
 DEFAULT_LOG_NAME = 'booking_app'
+DEFAULT_LOG_QUEUE_SIZE = 10000
+DEFAULT_LOG_CACHE_SIZE = 10000
+DEFAULT_LOG_CACHE_TTL = 300
+DEFAULT_LOG_CACHE_LINES = 1000
+DEFAULT_LOG_FLUSH_TIMEOUT = 5
+DEFAULT_LOG_BODY_MAX_LENGTH = 4096
+DEFAULT_LOG_REDACT_FIELDS = 'authorization,password,password_generated,access_token,refresh_token,session_token'
+LOG_REDACTED = '***'
 
 DEFAULT_DB_BACKUP_FOLDER = 'private/db/backup.sql'
 
@@ -178,6 +231,11 @@ DAILY_MINUTE = int(os.getenv('DAILY_MINUTE', DEFAULT_DAILY_MINUTE))
 
 REDIS_HOST = os.getenv('REDIS_HOST', DEFAULT_REDIS_HOST)
 REDIS_PORT = os.getenv('REDIS_PORT', DEFAULT_REDIS_PORT)
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', DEFAULT_REDIS_MAX_CONNECTIONS))
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', DEFAULT_REDIS_SOCKET_TIMEOUT))
+REDIS_CONNECT_TIMEOUT = float(os.getenv('REDIS_CONNECT_TIMEOUT', DEFAULT_REDIS_CONNECT_TIMEOUT))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', DEFAULT_REDIS_HEALTH_CHECK_INTERVAL))
+REDIS_RETRIES = int(os.getenv('REDIS_RETRIES', DEFAULT_REDIS_RETRIES))
 
 SECRET_JWT = os.getenv('SECRET_JWT', DEFAULT_SECRET_JWT)
 CRYPTO_KEY = os.getenv('CRYPTO_KEY', DEFAULT_CRYPTO_JWT)
@@ -236,6 +294,44 @@ ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
 RETRY_SEND_EMAIL = int(os.getenv('RETRY_SEND_EMAIL', DEFAULT_RETRY_SEND_EMAIL))
 
 MAX_TIMEOUT_WAIT_BOOKING = int(os.getenv('MAX_TIMEOUT_WAIT_BOOKING', DEFAULT_MAX_TIMEOUT_WAIT_BOOKING))
+LOCK_POLL_INTERVAL = float(os.getenv('LOCK_POLL_INTERVAL', DEFAULT_LOCK_POLL_INTERVAL))
+
+AVAILABILITY_INTERVAL = int(os.getenv('AVAILABILITY_INTERVAL', DEFAULT_AVAILABILITY_INTERVAL))
+MAX_AVAILABILITY_DAYS = int(os.getenv('MAX_AVAILABILITY_DAYS', DEFAULT_MAX_AVAILABILITY_DAYS))
+
+MAX_BULK_BOOKINGS = int(os.getenv('MAX_BULK_BOOKINGS', DEFAULT_MAX_BULK_BOOKINGS))
+BULK_BOOKING_LOCK_EXPIRE = int(os.getenv('BULK_BOOKING_LOCK_EXPIRE', DEFAULT_BULK_BOOKING_LOCK_EXPIRE))
+
+MAX_BOOKINGS_PAGE_SIZE = int(os.getenv('MAX_BOOKINGS_PAGE_SIZE', DEFAULT_MAX_BOOKINGS_PAGE_SIZE))
+BOOKINGS_STREAM_CHUNK = int(os.getenv('BOOKINGS_STREAM_CHUNK', DEFAULT_BOOKINGS_STREAM_CHUNK))
+
+DONE_SWEEP_INTERVAL = int(os.getenv('DONE_SWEEP_INTERVAL', DEFAULT_DONE_SWEEP_INTERVAL))
+DONE_SWEEP_BATCH_SIZE = int(os.getenv('DONE_SWEEP_BATCH_SIZE', DEFAULT_DONE_SWEEP_BATCH_SIZE))
+
+SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', DEFAULT_SMTP_POOL_SIZE))
+SMTP_POOL_IDLE_TIMEOUT = float(os.getenv('SMTP_POOL_IDLE_TIMEOUT', DEFAULT_SMTP_POOL_IDLE_TIMEOUT))
+SMTP_POOL_NOOP_INTERVAL = float(os.getenv('SMTP_POOL_NOOP_INTERVAL', DEFAULT_SMTP_POOL_NOOP_INTERVAL))
+SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', DEFAULT_SMTP_TIMEOUT))
+
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', DEFAULT_TOKEN_CACHE_SIZE))
+TOKEN_CACHE_LOCAL_TTL = float(os.getenv('TOKEN_CACHE_LOCAL_TTL', DEFAULT_TOKEN_CACHE_LOCAL_TTL))
+TOKEN_CACHE_NEGATIVE_TTL = int(os.getenv('TOKEN_CACHE_NEGATIVE_TTL', DEFAULT_TOKEN_CACHE_NEGATIVE_TTL))
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', DEFAULT_TOKEN_CACHE_TTL))
+
+SCHEDULE_CACHE_TTL = int(os.getenv('SCHEDULE_CACHE_TTL', DEFAULT_SCHEDULE_CACHE_TTL))
+
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', DEFAULT_RESPONSE_CACHE_TTL))
+RESPONSE_CACHE_MAX_AGE = int(os.getenv('RESPONSE_CACHE_MAX_AGE', DEFAULT_RESPONSE_CACHE_MAX_AGE))
+
+FILE_CACHE_SIZE = int(os.getenv('FILE_CACHE_SIZE', DEFAULT_FILE_CACHE_SIZE))
+FILE_CACHE_TTL = int(os.getenv('FILE_CACHE_TTL', DEFAULT_FILE_CACHE_TTL))
+FILES_MAX_AGE = int(os.getenv('FILES_MAX_AGE', DEFAULT_FILES_MAX_AGE))
+HASHED_FILES_MAX_AGE = int(os.getenv('HASHED_FILES_MAX_AGE', DEFAULT_HASHED_FILES_MAX_AGE))
+USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', 'False') == '1' or os.getenv('USE_X_SENDFILE', 'False') == 'True'
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR', None)
+
+QUERY_REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', DEFAULT_QUERY_REPEAT_THRESHOLD))
 
 CERT_SSL = os.getenv('CERT_SSL', None)
 KEY_SSL = os.getenv('KEY_SSL', None)
@@ -269,6 +365,17 @@ DB_BACKUP_FOLDER = os.getenv('DB_BACKUP_FOLDER', DEFAULT_DB_BACKUP_FOLDER)
 _LOGGING_LEVEL = os.getenv('LOGGING_LEVEL', DEFAULT_LOGGING_LEVEL)
 LOGGING_LEVEL = LOGGING_LEVELS[_LOGGING_LEVEL] if _LOGGING_LEVEL in LOGGING_LEVELS else LOGGING_LEVELS[DEFAULT_LOGGING_LEVEL]
 
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', DEFAULT_LOG_QUEUE_SIZE))
+LOG_CACHE_SIZE = int(os.getenv('LOG_CACHE_SIZE', DEFAULT_LOG_CACHE_SIZE))
+LOG_CACHE_TTL = int(os.getenv('LOG_CACHE_TTL', DEFAULT_LOG_CACHE_TTL))
+LOG_CACHE_LINES = int(os.getenv('LOG_CACHE_LINES', DEFAULT_LOG_CACHE_LINES))
+LOG_FLUSH_TIMEOUT = int(os.getenv('LOG_FLUSH_TIMEOUT', DEFAULT_LOG_FLUSH_TIMEOUT))
+LOG_BODY_MAX_LENGTH = int(os.getenv('LOG_BODY_MAX_LENGTH', DEFAULT_LOG_BODY_MAX_LENGTH))
+LOG_REDACT_FIELDS = set(field.strip().lower() for field in os.getenv('LOG_REDACT_FIELDS', DEFAULT_LOG_REDACT_FIELDS).split(',') if field.strip())
+
+_LOG_STDOUT = os.getenv('LOG_STDOUT', str(DEBUG))
+LOG_STDOUT = _LOG_STDOUT == 'True' or _LOG_STDOUT == '1'
+
 #---------------------------------
 
 #---- API BACKUP CONFIG ------------
@@ -355,7 +462,138 @@ def getLogger():
     global logger
     return logger
 
-cache_log = {}
+# Lines of the requests (uuid) not written yet, oldest first: {uuid: {'expires', 'logs'}}.
+cache_log = OrderedDict()
+cache_log_mutex = threading.Lock()
+
+log_queue = None
+log_writer = None
+log_writer_pid = None
+log_writer_mutex = threading.Lock()
+
+log_metrics = {
+    'lines': 0,
+    'written': 0,
+    'evicted': 0,
+    'dropped': 0,
+}
+
+def count_log(metric, value = 1):
+    with cache_log_mutex:
+        log_metrics[metric] += value
+
+    count_log_lines(**{metric: value})
+
+def count_log_lines(**values):
+    # helpers.Metrics imports globals, so it is only imported once the first line is logged.
+    from helpers.Metrics import count_log_lines as count_lines
+
+    for event, value in values.items():
+        if value: count_lines(event, value)
+
+def log_writer_loop(logs_queue):
+    while True:
+        logs = logs_queue.get()
+
+        try:
+            if logs is None:
+                return
+
+            log_parallel(logs)
+            count_log('written', len(logs))
+        except Exception as e:
+            print(f"Error logging: {e}")
+            traceback.print_exc()
+        finally:
+            logs_queue.task_done()
+
+def get_log_queue():
+    """
+    Queue of the log writer of this process, the only thread that writes the log file. It is
+    started on first use and again in every forked process (Celery and mod_wsgi workers).
+    """
+
+    global log_queue, log_writer, log_writer_pid
+
+    if log_writer_pid == os.getpid() and log_writer.is_alive():
+        return log_queue
+
+    with log_writer_mutex:
+        if log_writer_pid != os.getpid() or not log_writer.is_alive():
+            log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+            log_writer = threading.Thread(target=log_writer_loop, args=(log_queue,), name='log-writer', daemon=True)
+            log_writer.start()
+            log_writer_pid = os.getpid()
+
+    return log_queue
+
+def enqueue_logs(logs):
+    if not logs: return
+
+    try:
+        get_log_queue().put_nowait(logs)
+    except queue.Full:
+        count_log('dropped', len(logs))
+
+def evict_log_buffers(now):
+    """
+    Pops the buffers older than LOG_CACHE_TTL and the oldest ones beyond LOG_CACHE_SIZE, so
+    requests that are never flushed (early aborts, Celery logs without save_cache) are still
+    written and do not grow the cache. Must be called with cache_log_mutex held.
+    """
+
+    evicted = []
+
+    while cache_log:
+        buffer = next(iter(cache_log.values()))
+
+        if buffer['expires'] > now and len(cache_log) < LOG_CACHE_SIZE:
+            break
+
+        cache_log.popitem(last=False)
+        evicted.append(buffer['logs'])
+
+    return evicted
+
+def flush_logs():
+    """
+    Waits until the writer has written every queued log.
+    """
+
+    get_log_queue().join()
+
+def get_log_metrics():
+    with cache_log_mutex:
+        metrics = dict(log_metrics)
+        metrics['buffered'] = len(cache_log)
+
+    metrics['queued'] = log_queue.qsize() if log_queue else 0
+
+    return metrics
+
+def stop_log_writer(timeout = LOG_FLUSH_TIMEOUT):
+    """
+    Writes the buffered logs and stops the writer of this process, waiting at most `timeout` seconds.
+    """
+
+    with cache_log_mutex:
+        pending = [buffer['logs'] for buffer in cache_log.values()]
+        cache_log.clear()
+
+    if log_writer_pid != os.getpid() or not log_writer.is_alive():
+        for logs in pending: log_parallel(logs)
+        return
+
+    for logs in pending: enqueue_logs(logs)
+
+    try:
+        log_queue.put(None, timeout=timeout)
+    except queue.Full:
+        return
+
+    log_writer.join(timeout)
+
+atexit.register(stop_log_writer)
 
 def log_parallel(logs:dict):
     logger = getLogger()
@@ -390,9 +628,56 @@ def log_parallel(logs:dict):
 
     
 
-def log(message, level='INFO', uuid=uuid.uuid4().hex, request:Request = None, response:Response = None, error:Exception=None, save_cache=False):
+def is_log_enabled(level):
+    """
+    Whether a message of `level` is written with the configured LOGGING_LEVEL. Guards the
+    messages that are expensive to build or sit on hot loops.
+    """
+
+    return LOGGING_LEVELS.get(level.upper(), logging.INFO) >= LOGGING_LEVEL
+
+def redact(value):
+    if isinstance(value, dict):
+        return {key: LOG_REDACTED if isinstance(key, str) and key.lower() in LOG_REDACT_FIELDS else redact(item) for key, item in value.items()}
+
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+
+    return value
+
+def dump_log_data(data):
+    """
+    Serializes the request or response data of a log line, with the LOG_REDACT_FIELDS hidden
+    and cut to LOG_BODY_MAX_LENGTH characters.
+    """
+
+    data = json.dumps(redact(data), default=str)
+
+    if LOG_BODY_MAX_LENGTH and len(data) > LOG_BODY_MAX_LENGTH:
+        data = f"{data[:LOG_BODY_MAX_LENGTH]}... ({len(data) - LOG_BODY_MAX_LENGTH} more characters)"
+
+    return data
+
+def flush_log_buffer(uuid):
+    with cache_log_mutex:
+        buffer = cache_log.pop(uuid, None)
+
+    if buffer: enqueue_logs(buffer['logs'])
+
+def log(message, *args, level='INFO', uuid=uuid.uuid4().hex, request:Request = None, response:Response = None, error:Exception=None, save_cache=False):
+    """
+    Logs `message % args` for the request `uuid`. Below LOGGING_LEVEL nothing is formatted or
+    serialized; the buffered lines of the request are still written on save_cache.
+    """
         
     try:
+        if not is_log_enabled(level):
+            if save_cache and uuid: flush_log_buffer(uuid)
+            return uuid
+        
+        if args:
+            message = message % args
+        
         if request and response:
             response_data = {
                 'uuid': uuid,
@@ -401,10 +686,11 @@ def log(message, level='INFO', uuid=uuid.uuid4().hex, request:Request = None, re
                     'Content-Type': request.content_type,
                     'Host': request.host,
                 },
-                'data': response.json if response.is_json else response.get_data(as_text=True)
+                # A streamed body can only be read once, by the client.
+                'data': '<streamed>' if response.is_streamed or response.direct_passthrough else response.get_json(silent=True) if response.is_json else response.get_data(as_text=True)
             }
             
-            message = f'RESPONSE | < [{request.remote_addr}] - \'[{request.method}] {request.path}\' => {response.status_code} - {message}:\n\tDATA : {json.dumps(response_data)} >'
+            message = f'RESPONSE | < [{request.remote_addr}] - \'[{request.method}] {request.path}\' => {response.status_code} - {message}:\n\tDATA : {dump_log_data(response_data)} >'
 
         elif request:
             
@@ -414,10 +700,10 @@ def log(message, level='INFO', uuid=uuid.uuid4().hex, request:Request = None, re
                     'Content-Type': request.content_type,
                     'Host': request.host,
                 },    
-                'json': request.json if request.is_json else {},
-                'form': request.form,
-                'files': request.files,
-                'args': request.args
+                'json': request.get_json(silent=True) if request.is_json else {},
+                'form': request.form.to_dict(),
+                'files': {name: file.filename for name, file in request.files.items()},
+                'args': request.args.to_dict()
             }
             
             json_data = {
@@ -425,31 +711,48 @@ def log(message, level='INFO', uuid=uuid.uuid4().hex, request:Request = None, re
                 'data': data_info
             }
             
-            message = f'REQUEST | < [{request.remote_addr}] - \'[{request.method}] {request.path}\' - {message}:\n\tDATA : {json.dumps(json_data)} >'
+            message = f'REQUEST | < [{request.remote_addr}] - \'[{request.method}] {request.path}\' - {message}:\n\tDATA : {dump_log_data(json_data)} >'
 
-        time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        log_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
         if uuid:
             message = f"[{uuid}]: {message}"
             
-            print(f"[{time}] [{level}] - {message}")
+        if LOG_STDOUT:
+            print(f"[{log_time}] [{level}] - {message}")
             
-            log_uuid = {"level": level, "message": message, "error": str(error) if error else None, "time": datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        log_uuid = {"level": level, "message": message, "error": str(error) if error else None, "time": log_time}
+        
+        if not uuid:
+            count_log('lines')
+            enqueue_logs([log_uuid])
+            return uuid
+        
+        flush = None
+        
+        with cache_log_mutex:
+            buffer = cache_log.get(uuid)
             
-            if uuid not in cache_log:
-                cache_log[uuid] = [log_uuid]
+            if buffer is None:
+                evicted = evict_log_buffers(time.monotonic())
+                buffer = cache_log[uuid] = {'expires': time.monotonic() + LOG_CACHE_TTL, 'logs': []}
             else:
-                cache_log[uuid].append(log_uuid)
+                evicted = []
+                
+            buffer['logs'].append(log_uuid)
+            log_metrics['lines'] += 1
             
-            if not save_cache: return uuid
-                    
-        logs = cache_log.get(uuid, [])
-        
-        thread = threading.Thread(target=log_parallel, args=(logs,))
+            if save_cache or len(buffer['logs']) >= LOG_CACHE_LINES:
+                flush = cache_log.pop(uuid)['logs']
+                
+            log_metrics['evicted'] += len(evicted)
         
-        thread.start()
+        count_log_lines(lines=1, evicted=len(evicted))
         
-        cache_log.pop(uuid, None)
+        for logs in evicted:
+            enqueue_logs(logs)
+            
+        enqueue_logs(flush)
     
     except Exception as e:
         print(f"Error logging: {e}")
@@ -458,6 +761,8 @@ def log(message, level='INFO', uuid=uuid.uuid4().hex, request:Request = None, re
     return uuid
 
 
+EMAIL_STATUS_PENDING = 'pending'
+
 class EmailType():
     CONFIRM_EMAIL = 0
     CONFIRMED_EMAIL = 1
@@ -0,0 +1,177 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from db import db
+from globals import AVAILABILITY_INTERVAL, CONFIRMED_STATUS, MAX_AVAILABILITY_DAYS, PENDING_STATUS, WEEK_DAYS
+from helpers.DatetimeHelper import now
+from helpers.error.BookingError.WrongServiceWorkGroupException import WrongServiceWorkGroupException
+from helpers.error.BookingError.WrongWorkerWorkGroupException import WrongWorkerWorkGroupException
+from helpers.error.DataError.DateRangeException import DateRangeException
+from helpers.error.LocalError.LocalNotFoundException import LocalNotFoundException
+from helpers.error.ServiceError.ServiceNotFoundException import ServiceNotFoundException
+from helpers.ReferenceData import getStatusIds
+from helpers.ScheduleCache import get_schedule
+from models.booking import BookingModel
+from models.local import LocalModel
+from models.service import ServiceModel
+from models.work_group import WorkGroupModel
+from models.work_group_worker import WorkGroupWorkerModel
+from models.worker import WorkerModel
+
+def subtractIntervals(windows, busy):
+    """
+    Removes the `busy` intervals from the `windows` intervals. Both lists must be
+    sorted by start; they are walked once, the same way a merge is.
+    """
+
+    free = []
+    i = 0
+
+    for init, end in windows:
+
+        while i < len(busy) and busy[i][1] <= init:
+            i += 1
+
+        current = init
+        j = i
+
+        while j < len(busy) and busy[j][0] < end:
+            if busy[j][0] > current:
+                free.append((current, busy[j][0]))
+            current = max(current, busy[j][1])
+            j += 1
+
+        if current < end:
+            free.append((current, end))
+
+    return free
+
+def loadSchedule(local_id, datetime_init, datetime_end):
+
+    schedule = get_schedule(local_id)
+
+    return {'timetable': schedule['timetable'], 'closed': [c for c in schedule['closed'] if c[1] > datetime_init and c[0] < datetime_end]}
+
+def loadBusyIntervals(worker_ids, datetime_init, datetime_end, exclude_booking_ids = None, for_update = False):
+
+    busy = {worker_id: [] for worker_id in worker_ids}
+
+    if not busy:
+        return busy
+
+    query = (select(BookingModel.worker_id, BookingModel.datetime_init, BookingModel.datetime_end)
+             .where(BookingModel.worker_id.in_(worker_ids),
+                    BookingModel.datetime_end > datetime_init,
+                    BookingModel.datetime_init < datetime_end,
+                    BookingModel.status_id.in_(getStatusIds(CONFIRMED_STATUS, PENDING_STATUS)))
+             .order_by(BookingModel.datetime_init))
+
+    if exclude_booking_ids:
+        query = query.where(BookingModel.id.notin_(exclude_booking_ids))
+
+    if for_update:
+        # Locking read: under REPEATABLE READ it sees rows committed by the previous lock holder.
+        query = query.with_for_update()
+
+    for worker_id, init, end in db.session.execute(query):
+        busy[worker_id].append((init, end))
+
+    return busy
+
+def openWindows(schedule, day):
+    """
+    Opening intervals of `day` minus the closed days, as sorted (init, end) datetimes.
+    """
+
+    windows = [(datetime.combine(day, opening_time), datetime.combine(day, closing_time)) for opening_time, closing_time in schedule['timetable'].get(WEEK_DAYS[day.weekday()], [])]
+
+    return subtractIntervals(windows, schedule['closed'])
+
+def isBookable(schedule, busy, datetime_init, datetime_end):
+    """
+    Checks that [datetime_init, datetime_end) fits inside one open window and does not overlap `busy`.
+    """
+
+    for init, end in subtractIntervals(openWindows(schedule, datetime_init.date()), busy):
+        if init <= datetime_init and datetime_end <= end:
+            return True
+
+    return False
+
+def getAvailability(local_id, services_ids, datetime_init, datetime_end, worker_id = None, interval = AVAILABILITY_INTERVAL):
+
+    local = LocalModel.query.get(local_id)
+
+    if not local:
+        raise LocalNotFoundException(id = local_id)
+
+    if datetime_init >= datetime_end or interval <= 0:
+        raise DateRangeException()
+
+    if (datetime_end - datetime_init).days >= MAX_AVAILABILITY_DAYS:
+        raise DateRangeException(f'The date range can not be longer than {MAX_AVAILABILITY_DAYS} days.')
+
+    services_ids = set(services_ids)
+
+    services = ServiceModel.query.join(WorkGroupModel).filter(ServiceModel.id.in_(services_ids), WorkGroupModel.local_id == local_id).all()
+
+    missing = services_ids - set(service.id for service in services)
+
+    if not services or missing:
+        raise ServiceNotFoundException(id = min(missing) if missing else 0)
+
+    work_group_id = services[0].work_group_id
+
+    if any(service.work_group_id != work_group_id for service in services):
+        raise WrongServiceWorkGroupException()
+
+    duration = timedelta(minutes=sum(service.duration for service in services))
+    step = timedelta(minutes=interval)
+
+    workers_query = WorkerModel.query.join(WorkGroupWorkerModel, WorkGroupWorkerModel.worker_id == WorkerModel.id).filter(WorkGroupWorkerModel.work_group_id == work_group_id)
+
+    if worker_id:
+        workers_query = workers_query.filter(WorkerModel.id == worker_id)
+
+    workers = workers_query.order_by(WorkerModel.id).all()
+
+    if worker_id and not workers:
+        raise WrongWorkerWorkGroupException()
+
+    schedule = loadSchedule(local_id, datetime_init, datetime_end)
+    busy = loadBusyIntervals([worker.id for worker in workers], datetime_init, datetime_end)
+
+    min_init = max(datetime_init, now(local.location).replace(tzinfo=None))
+
+    slots = {worker.id: [] for worker in workers}
+
+    day = datetime_init.date()
+
+    while day <= datetime_end.date():
+
+        for opening_time, closing_time in schedule['timetable'].get(WEEK_DAYS[day.weekday()], []):
+
+            anchor = datetime.combine(day, opening_time)
+            window = subtractIntervals([(max(anchor, min_init), min(datetime.combine(day, closing_time), datetime_end))], schedule['closed'])
+
+            for worker in workers:
+                for init, end in subtractIntervals(window, busy[worker.id]):
+                    # Start times are offered on a grid anchored at the opening time.
+                    start = anchor + -(-(init - anchor) // step) * step
+                    while start + duration <= end:
+                        slots[worker.id].append(start)
+                        start += step
+
+        day += timedelta(days=1)
+
+    workers_slots = [{'worker': worker, 'slots': slots[worker.id]} for worker in workers]
+    all_slots = sorted(set(slot for worker_slots in slots.values() for slot in worker_slots))
+
+    return {
+        'duration': int(duration.total_seconds() // 60),
+        'interval': interval,
+        'workers': workers_slots,
+        'slots': all_slots,
+        'total': len(all_slots)
+    }
@@ -39,7 +39,7 @@ def backup_logs(_uuid_log = None):
     yesterday = datetime.datetime.now() - datetime.timedelta(days=1)
     log_file = f'{FILENAME_LOG}.{yesterday.strftime("%Y-%m-%d")}'
     
-    log('Log file:', log_file, uuid=_uuid_log)
+    log('Log file: %s', log_file, uuid=_uuid_log)
     log('Backuping log file', uuid=_uuid_log)
     upload_file(log_file, LOG_BACKUP_ENDPOINT, _uuid_log = _uuid_log)
 
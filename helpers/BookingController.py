@@ -1,19 +1,21 @@
 
 
-from operator import or_
+import base64
+import json
 import random
 from sqlite3 import OperationalError
 import time
 
-import redis
-from db import addAndCommit, addAndFlush, beginSession, deleteAndCommit, new_session, rollback
-from globals import CANCELLED_STATUS, CONFIRMED_STATUS, DONE_STATUS, MAX_TIMEOUT_WAIT_BOOKING, PENDING_STATUS, USER_ROLE, WEEK_DAYS, is_redis_test_mode, log
-from helpers.Database import create_redis_connection, delete_key_value_cache, get_key_value_cache, register_key_value_cache
+from db import db, addAndCommit, addAndFlush, beginSession, deleteAndCommit, new_session, rollback
+from globals import BOOKINGS_STREAM_CHUNK, CANCELLED_STATUS, CONFIRMED_STATUS, DONE_STATUS, DONE_SWEEP_BATCH_SIZE, MAX_TIMEOUT_WAIT_BOOKING, PENDING_STATUS, USER_ROLE, WEEK_DAYS, is_log_enabled, is_redis_test_mode, log
+from helpers.Database import acquire_lock, release_lock
 from helpers.DatetimeHelper import DATETIME_NOW, naiveToAware, now
+from helpers.ClientSearch import CLIENT_FILTER_FIELDS, CLIENT_SEARCH_FIELDS, SEARCH_GRAM_SIZE, searchGrams
+from helpers.ReferenceData import getStatusId, getStatusIds, getWeekdayId
+from helpers.ScheduleCache import get_schedule, is_closed, is_open
 from helpers.TimetableController import getTimetable
-from helpers.closed import getClosedDays
 from helpers.error.ClosedDaysError.ClosedDayException import ClosedDayException
-from sqlalchemy import and_
+from sqlalchemy import and_, false, func, or_, select, update
 from sqlalchemy.exc import SQLAlchemyError
 from helpers.error.BookingError.AlredyBookingException import AlredyBookingExceptionException
 from helpers.error.BookingError.BookingNotFoundError import BookingNotFoundException
@@ -30,16 +32,14 @@ from helpers.error.SecurityError.InvalidTokenException import InvalidTokenExcept
 from helpers.error.SecurityError.NoTokenProvidedException import NoTokenProvidedException
 from helpers.error.SecurityError.TokenNotFound import TokenNotFoundException
 from helpers.error.ServiceError.ServiceNotFoundException import ServiceNotFoundException
-from helpers.error.StatusError.StatusNotFoundException import StatusNotFoundException
-from helpers.error.WeekdayError.WeekdayNotFoundException import WeekdayNotFoundException
 from helpers.error.WorkerError.WorkerNotFoundException import WorkerNotFoundException
 from helpers.security import decodeToken, generateUUID
 from models.booking import BookingModel
+from models.booking_search_gram import BookingSearchGramModel
 from models.local import LocalModel
 from models.service import ServiceModel
+from models.service_booking import ServiceBookingModel
 from models.session_token import SessionTokenModel
-from models.status import StatusModel
-from models.weekday import WeekdayModel
 from models.work_group import WorkGroupModel
 
 from datetime import datetime, timedelta
@@ -47,11 +47,8 @@ from datetime import datetime, timedelta
 from models.worker import WorkerModel
 
 def getBookingsQuery(local_id, datetime_init = None, datetime_end = None):
-    work_group = WorkGroupModel.query.filter_by(local_id=local_id).all()
-    workers = [wg.workers.all() for wg in work_group]
-    worker_ids = set([worker.id for worker_list in workers for worker in worker_list])
     
-    query = BookingModel.query.filter(BookingModel.worker_id.in_(worker_ids))
+    query = BookingModel.query.filter(BookingModel.local_id == local_id)
     
     if datetime_init and datetime_end:
         query = query.filter(and_(BookingModel.datetime_end > datetime_init, 
@@ -61,62 +58,203 @@ def getBookingsQuery(local_id, datetime_init = None, datetime_end = None):
     
     return query
 
-def getBookings(local_id, datetime_init, datetime_end, status = None, worker_id = None, service_id = None, work_group_id = None, client_filter = None, _uuid = None):
+def getClientSearchFilter(local_id, field, value):
+    """
+    Bookings whose client field contains `value`, compared on the normalized search column.
+    Values shorter than a gram are searched as a prefix of the column, longer ones through the
+    grams of the local: the bookings that have all of them, checked against the column.
+    """
+    
+    code, search_column, normalize = CLIENT_SEARCH_FIELDS[field]
+    
+    column = getattr(BookingModel, search_column)
+    value = normalize(value)
+    
+    if not value:
+        return false()
+    
+    if len(value) < SEARCH_GRAM_SIZE:
+        return column.startswith(value, autoescape=True)
+    
+    grams = searchGrams(value)
+    
+    matching = (select(BookingSearchGramModel.booking_id)
+                .where(BookingSearchGramModel.local_id == local_id, BookingSearchGramModel.field == code, BookingSearchGramModel.gram.in_(grams))
+                .group_by(BookingSearchGramModel.booking_id)
+                .having(func.count() == len(grams)))
+    
+    return and_(BookingModel.id.in_(matching), column.contains(value, autoescape=True))
 
-    local = LocalModel.query.get(local_id)
+def getStatusFilter(status, datetime_now):
+    """
+    Filters by the effective status of the bookings: pending or confirmed bookings
+    that already ended are done, even if the sweeper has not updated them yet.
+    """
+    
+    status_ids = getStatusIds()
+    active_ids = getStatusIds(PENDING_STATUS, CONFIRMED_STATUS)
+    
+    is_past = BookingModel.datetime_end < datetime_now
+    
+    conditions = []
+    
+    for s in set(status):
+        if s not in status_ids:
+            continue
+        
+        if s == DONE_STATUS:
+            conditions.append(BookingModel.status_id == status_ids[s])
+            conditions.append(and_(is_past, BookingModel.status_id.in_(active_ids)))
+        elif s in (PENDING_STATUS, CONFIRMED_STATUS):
+            conditions.append(and_(~is_past, BookingModel.status_id == status_ids[s]))
+        else:
+            conditions.append(BookingModel.status_id == status_ids[s])
+            
+    return or_(*conditions) if conditions else false()
+
+def getFilteredBookingsQuery(local_id, datetime_init, datetime_end, status = None, worker_id = None, service_id = None, work_group_id = None, client_filter = None):
+    """
+    Bookings of the local with the given filters. Every filter is a condition of the same
+    statement, so any combination of them is read with one query after the one of the local.
+    """
+
+    local = db.session.get(LocalModel, local_id)
     
     if not local:
         raise LocalNotFoundException(id = local_id)
     
+    datetime_now = now(local.location)
+    
     if datetime_init == DATETIME_NOW:
-        datetime_init = now(local.location)
+        datetime_init = datetime_now
     
     bookings_query = getBookingsQuery(local_id, datetime_init=datetime_init, datetime_end=datetime_end)
 
-    status_ids = [StatusModel.query.filter(StatusModel.status == s).first().id for s in status] if status else None
-
-    if status_ids:
-        bookings_query = bookings_query.filter(BookingModel.status_id.in_(status_ids))
+    if status:
+        bookings_query = bookings_query.filter(getStatusFilter(status, datetime_now.replace(tzinfo=None)))
         
     if worker_id:
         bookings_query = bookings_query.filter(BookingModel.worker_id == worker_id)
         
     if service_id:
-        bookings_query = bookings_query.filter(BookingModel.services.any(ServiceModel.id == service_id))
+        bookings_query = bookings_query.filter(BookingModel.id.in_(select(ServiceBookingModel.booking_id).where(ServiceBookingModel.service_id == service_id)))
         
     if client_filter:
-        if client_filter['name']: bookings_query = bookings_query.filter(or_(BookingModel.client_name.ilike(f'%{client_filter["name"]}%'), BookingModel.client_name.ilike(f'%{client_filter["name"].strip().title()}%')))
-        if client_filter['email']: bookings_query = bookings_query.filter(BookingModel.client_email.ilike(f'%{client_filter["email"]}%'))
-        if client_filter['tlf']: bookings_query = bookings_query.filter(BookingModel.client_tlf.ilike(f'%{client_filter["tlf"]}%'))
+        for key, field in CLIENT_FILTER_FIELDS.items():
+            if client_filter.get(key): bookings_query = bookings_query.filter(getClientSearchFilter(local_id, field, client_filter[key]))
         
     if work_group_id:
-        return [booking for booking in bookings_query.all() if booking.work_group_id == work_group_id]
+        bookings_query = bookings_query.filter(BookingModel.work_group_id == int(work_group_id))
+
+    return bookings_query
+
+def getBookings(local_id, datetime_init, datetime_end, status = None, worker_id = None, service_id = None, work_group_id = None, client_filter = None, _uuid = None):
+    return getFilteredBookingsQuery(local_id, datetime_init, datetime_end, status=status, worker_id=worker_id, service_id=service_id, work_group_id=work_group_id, client_filter=client_filter).all()
+
+def encodeBookingsCursor(booking):
+    cursor = json.dumps([booking.datetime_init.isoformat(), booking.id])
+    return base64.urlsafe_b64encode(cursor.encode()).decode().rstrip('=')
+
+def decodeBookingsCursor(cursor):
+    try:
+        datetime_init, booking_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return datetime.fromisoformat(datetime_init), int(booking_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor.')
+
+def afterBookingsCursor(bookings_query, cursor = None):
+    """
+    Keyset on (datetime_init, id): the bookings after the cursor, in that order.
+    """
+    
+    if cursor:
+        datetime_init, booking_id = decodeBookingsCursor(cursor)
+        bookings_query = bookings_query.filter(or_(BookingModel.datetime_init > datetime_init,
+                                                   and_(BookingModel.datetime_init == datetime_init, BookingModel.id > booking_id)))
+    
+    return bookings_query.order_by(BookingModel.datetime_init, BookingModel.id)
 
-    bookings = list(bookings_query.with_for_update().all())
+def getBookingsPage(bookings_query, limit, cursor = None):
+    """
+    Returns the next `limit` bookings after the cursor and the cursor of the following page, or None if it is the last one.
+    """
     
-    done_status = StatusModel.query.filter_by(status=DONE_STATUS).first()
+    bookings = afterBookingsCursor(bookings_query, cursor).limit(limit + 1).all()
     
-    remove_bookings = []
+    if len(bookings) <= limit:
+        return bookings, None
     
-    for booking in bookings:
-        if naiveToAware(booking.datetime_end) < now(local.location) and booking.status != done_status:
-            
-            log(f"Setting done status booking '{booking.id}'", uuid=_uuid)
+    bookings = bookings[:limit]
+    
+    return bookings, encodeBookingsCursor(bookings[-1])
+
+def iterBookingsPages(bookings_query, page_size = BOOKINGS_STREAM_CHUNK, cursor = None):
+    """
+    Yields the bookings in pages of `page_size`. Every page is one keyset query, so no cursor stays
+    open while the bookings are serialized, and the loaded bookings are released after each page.
+    """
+    
+    while True:
+        bookings, cursor = getBookingsPage(bookings_query, page_size, cursor)
+        
+        yield bookings
+        
+        for booking in bookings:
+            db.session.expunge(booking)
+        
+        if not cursor:
+            return
+
+def markDoneBookings(batch_size = DONE_SWEEP_BATCH_SIZE, _uuid = None):
+    """
+    Persists the done status of the pending and confirmed bookings that already ended.
+    Runs one UPDATE per range of `batch_size` booking ids and local timezone.
+    """
+    
+    time_init = time.monotonic()
+    
+    done_status_id = getStatusId(DONE_STATUS)
+    active_ids = getStatusIds(PENDING_STATUS, CONFIRMED_STATUS)
+    
+    rows = 0
+    batches = 0
+    
+    for location in db.session.execute(select(LocalModel.location).distinct()).scalars().all():
+        
+        locals_ids = select(LocalModel.id).where(LocalModel.location == location)
+        
+        ended = and_(BookingModel.local_id.in_(locals_ids),
+                     BookingModel.datetime_end < now(location).replace(tzinfo=None),
+                     BookingModel.status_id.in_(active_ids))
+        
+        min_id, max_id = db.session.execute(select(func.min(BookingModel.id), func.max(BookingModel.id)).where(ended)).one()
+        
+        if min_id is None:
+            continue
+        
+        for first_id in range(min_id, max_id + 1, batch_size):
             
-            booking.status = done_status
             try:
-                addAndCommit(booking)
+                result = db.session.execute(
+                    update(BookingModel)
+                    .where(ended, BookingModel.id >= first_id, BookingModel.id < first_id + batch_size)
+                    .values(status_id=done_status_id, datetime_updated=datetime.utcnow())
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
             except SQLAlchemyError as e:
                 rollback()
+                log("Error marking done bookings", uuid=_uuid, level="ERROR", error=e)
                 raise e
             
-            if status_ids and done_status.id not in status_ids:
-                remove_bookings.append(booking)
-                
-    for booking in remove_bookings:
-        bookings.remove(booking)
+            rows += result.rowcount
+            batches += 1
+            
+    duration = time.monotonic() - time_init
     
-    return bookings
+    log("Done bookings: %s updated in %s batches (%.3fs)", rows, batches, duration, uuid=_uuid)
+    
+    return {'rows': rows, 'batches': batches, 'duration': duration}
 
 def getBookingBySession(token):
     
@@ -162,19 +300,38 @@ def getBookingBySession(token):
     
     return booking
 
-def searchWorkerBookings(local_id, datetime_init, datetime_end, workers, booking_id):
-    workers = list(workers)
+def getAvailableWorkers(datetime_init, datetime_end, worker_ids, booking_id = None, for_update = False):
     
-    random.shuffle(workers)
+    worker_ids = list(worker_ids)
     
-    for worker in workers:
-        bookings = getBookings(local_id, datetime_init, datetime_end, status=[CONFIRMED_STATUS, PENDING_STATUS], worker_id=worker.id)
-        if bookings and (booking_id is None or len(bookings) > 1 or bookings[0].id != booking_id):
-            continue
+    if not worker_ids:
+        return []
+    
+    overlapping = select(BookingModel.worker_id).where(BookingModel.datetime_end > datetime_init,
+                                                       BookingModel.datetime_init < datetime_end,
+                                                       BookingModel.status_id.in_(getStatusIds(CONFIRMED_STATUS, PENDING_STATUS)))
+    
+    if booking_id is not None:
+        overlapping = overlapping.where(BookingModel.id != booking_id)
         
-        return worker.id
+    if for_update:
+        # Locking read: under REPEATABLE READ it sees rows committed by the previous lock holder.
+        busy = set(db.session.execute(overlapping.where(BookingModel.worker_id.in_(worker_ids)).with_for_update()).scalars())
+        return [worker_id for worker_id in worker_ids if worker_id not in busy]
     
-    return None
+    query = select(WorkerModel.id).where(WorkerModel.id.in_(worker_ids), ~overlapping.where(BookingModel.worker_id == WorkerModel.id).exists())
+    
+    return [worker_id for worker_id in db.session.execute(query).scalars()]
+
+def searchWorkerBookings(local_id, datetime_init, datetime_end, workers, booking_id):
+    available = getAvailableWorkers(datetime_init, datetime_end, [worker.id for worker in workers], booking_id)
+    
+    return random.choice(available) if available else None
+
+def updateServiceBookingsWorkGroup(service_id, work_group_id):
+    bookings_ids = select(ServiceBookingModel.booking_id).where(ServiceBookingModel.service_id == service_id)
+    
+    return BookingModel.query.filter(BookingModel.id.in_(bookings_ids)).update({BookingModel.work_group_id: work_group_id}, synchronize_session=False)
 
 def deserializeBooking(booking):
     return {
@@ -189,81 +346,50 @@ def deserializeBooking(booking):
         'status': booking.status.status
     }
 
-def perform_atomic_booking(redis_connection, local_id, date, exp = MAX_TIMEOUT_WAIT_BOOKING, uuid = None):
+def bookingLockKey(local_id, date, worker_id = None, work_group_id = None):
+    scope = f"worker:{worker_id}" if worker_id is not None else f"work_group:{work_group_id}"
+    return f"booking_lock:{local_id}:{scope}:{date}"
+
+def tryRegisterBooking(local_id, date, worker_id = None, work_group_id = None, max_timeout=0, exp=MAX_TIMEOUT_WAIT_BOOKING, uuid=None):
+    """
+    Booking lock (key, token) or None if it is still taken after `max_timeout` seconds.
+    """
     
-    with redis_connection.pipeline() as pipe:
+    key = bookingLockKey(local_id, date, worker_id=worker_id, work_group_id=work_group_id)
+    token = generateUUID()
+    
+    if is_log_enabled('DEBUG'):
+        log("Waiting for booking lock '%s'.", key, uuid=uuid, level='DEBUG')
+    
+    if not acquire_lock(key, token, exp=exp, timeout=max_timeout):
+        return None
+    
+    if is_log_enabled('DEBUG'):
+        log("Booking lock '%s' acquired.", key, uuid=uuid, level='DEBUG')
+    
+    return key, token
 
-        try:
-            pipe.watch(local_id)
-            current_value = pipe.get(local_id)
-            current_value = current_value.decode('utf-8') if current_value else ""
-            
-            log(f"Current value: {current_value}", uuid=uuid)
-            
-            if str(date) in current_value:
-                pipe.unwatch()
-                log(f"Date {date} already booked.", uuid=uuid)
-                return False
-            
-            log(f"Registering booking for local {local_id} on date {date}.", uuid=uuid)
-            new_value = f"{current_value}|{str(date)}" if current_value else str(date)
-            pipe.multi()
-            pipe.setex(local_id, exp, new_value)
-            pipe.execute()
-            pipe.unwatch()
-            log(f"Registered booking for local {local_id} on date {date}.", uuid=uuid)
-            return True
-        except redis.WatchError:
-            pipe.unwatch()
-            return False
-
-def waitAndRegisterBooking(local_id, date, max_timeout=MAX_TIMEOUT_WAIT_BOOKING, uuid=None, sleep_time=0.1):
-    if is_redis_test_mode(): return
-    redis_connection = create_redis_connection()
-    uuid = uuid or generateUUID()
-    log(f"Waiting for booking for local {local_id} on date {date}.", uuid=uuid)
-    time_init = datetime.now()
-
-    while (datetime.now() - time_init).seconds < max_timeout:
-        success = perform_atomic_booking(redis_connection, local_id, date, uuid=uuid)
-        if success:
-            log(f"Local {local_id} registered booking for date {date}.", uuid=uuid)
-            return uuid
-        log(f"Local {local_id} is overloaded. Retrying in {sleep_time} seconds.", uuid=uuid)
-        time.sleep(sleep_time)
-
-    raise LocalOverloadedException(message=f"Local {local_id} is overloaded. Please try again later.")
-    
-def unregisterBooking(local_id, date, uuid = None):
-                
-    log(f'Unregistering booking for local {local_id} on date {date}.', uuid=uuid)
-        
-    value = get_key_value_cache(local_id)
+def waitAndRegisterBooking(local_id, date, worker_id = None, work_group_id = None, max_timeout=MAX_TIMEOUT_WAIT_BOOKING, exp=MAX_TIMEOUT_WAIT_BOOKING, uuid=None):
     
-    log(f'get_key_value_cache: {value}', uuid=uuid)
+    lock = tryRegisterBooking(local_id, date, worker_id=worker_id, work_group_id=work_group_id, max_timeout=max_timeout, exp=exp, uuid=uuid)
     
-    if not value:
-        return value
+    if not lock:
+        log("Booking lock '%s' not acquired after %s seconds.", bookingLockKey(local_id, date, worker_id=worker_id, work_group_id=work_group_id), max_timeout, uuid=uuid, level='WARNING')
+        raise LocalOverloadedException(message=f"Local {local_id} is overloaded. Please try again later.")
     
-    try:
-        value = str(value.decode('utf-8'))
-    except AttributeError:
-        value = str(value)
+    return lock
     
-    dates = value.split('|')
+def unregisterBooking(key, token, uuid = None):
     
-    if str(date) in dates:
-        dates.remove(str(date))
-        
-        log(f'Dates: {dates}', uuid=uuid)
-        
-        value = '|'.join(dates)
-        
-        log(f'Registering booking for local {local_id} on date {date}. Value: {value}', uuid=uuid)
-        
-        register_key_value_cache(local_id, value)
+    released = release_lock(key, token)
+    
+    if released:
+        if is_log_enabled('DEBUG'):
+            log("Booking lock '%s' released.", key, uuid=uuid, level='DEBUG')
+    else:
+        log("Booking lock '%s' expired before being released.", key, uuid=uuid, level='WARNING')
         
-    return value
+    return released
 
 def createOrUpdateBooking(new_booking, local_id: int = None, bookingModel: BookingModel = None, commit = True, local:LocalModel = None, force = False, _uuid = None):
     
@@ -300,16 +426,16 @@ def createOrUpdateBooking(new_booking, local_id: int = None, bookingModel: Booki
             
     date = datetime_init.date()
     
-    uuid = None
+    uuid = _uuid or generateUUID()
+    
+    locks = []
+    
+    def unregisterLocks():
+        while locks:
+            unregisterBooking(*locks.pop(), uuid=uuid)
     
     try:
         
-        # client_name = new_booking['client_name']
-        
-        uuid = waitAndRegisterBooking(local_id, date, uuid=_uuid)
-        
-        
-                    
         for service_id in new_booking['services_ids']:
             service = ServiceModel.query.get(service_id)
             if not service or service.work_group.local_id != local_id:
@@ -330,15 +456,12 @@ def createOrUpdateBooking(new_booking, local_id: int = None, bookingModel: Booki
             
         new_booking['datetime_end'] = datetime_end
                 
-        week_day = WeekdayModel.query.filter_by(weekday=WEEK_DAYS[datetime_init.weekday()]).first()
-        
-        if not week_day:
-            raise WeekdayNotFoundException()
+        schedule = get_schedule(local_id)
         
-        if not force and not getTimetable(local_id, week_day.id, datetime_init=datetime_init, datetime_end=datetime_end):
+        if not force and not is_open(schedule, datetime_init, datetime_end):
             raise LocalUnavailableException()
         
-        if not force and getClosedDays(local_id, datetime_init, datetime_end):
+        if not force and is_closed(schedule, datetime_init, datetime_end):
             raise ClosedDayException()
         
         if worker_id:
@@ -349,39 +472,84 @@ def createOrUpdateBooking(new_booking, local_id: int = None, bookingModel: Booki
             if not force and services[0].work_group_id not in [wg.id for wg in worker.work_groups.all()]:
                 raise WrongWorkerWorkGroupException()
             
+            locks.append(waitAndRegisterBooking(local_id, date, worker_id=worker_id, uuid=uuid))
             
             if not force:
                 
-                bookings = getBookings(local_id, datetime_init, datetime_end, status=[CONFIRMED_STATUS, PENDING_STATUS], worker_id=worker_id)
-                    
-                if bookings and (bookingModel is None or len(bookings) > 1 or bookings[0].id != bookingModel.id):
+                if not getAvailableWorkers(datetime_init, datetime_end, [worker_id], bookingModel.id if bookingModel else None, for_update=True):
                     raise WorkerUnavailableException()
                 
         else: 
+            
+            work_group_id = services[0].work_group_id
+            
+            locks.append(waitAndRegisterBooking(local_id, date, work_group_id=work_group_id, uuid=uuid))
                     
-            workers = list(services[0].work_group.workers.all())
+            workers = [worker.id for worker in services[0].work_group.workers.all()]
             
-            worker_id = searchWorkerBookings(local_id, datetime_init, datetime_end, workers, bookingModel.id if bookingModel else None)
+            candidates = getAvailableWorkers(datetime_init, datetime_end, workers, bookingModel.id if bookingModel else None)
+            
+            random.shuffle(candidates)
+            
+            worker_id = None
+            busy = []
+            
+            # Candidates locked by other bookings are skipped, and only waited for (sharing
+            # MAX_TIMEOUT_WAIT_BOOKING) once every free one turned out to be unavailable.
+            for candidate in candidates:
+                
+                lock = tryRegisterBooking(local_id, date, worker_id=candidate, uuid=uuid)
+                
+                if not lock:
+                    busy.append(candidate)
+                    continue
+                
+                # A booking with an explicit worker only holds the worker lock, so check again once it is ours.
+                if getAvailableWorkers(datetime_init, datetime_end, [candidate], bookingModel.id if bookingModel else None, for_update=True):
+                    locks.append(lock)
+                    worker_id = candidate
+                    break
+                
+                unregisterBooking(*lock, uuid=uuid)
+            
+            deadline = time.monotonic() + MAX_TIMEOUT_WAIT_BOOKING
+            overloaded = False
+            
+            for candidate in busy if not worker_id else []:
+                
+                lock = tryRegisterBooking(local_id, date, worker_id=candidate, max_timeout=max(0, deadline - time.monotonic()), uuid=uuid)
+                
+                if not lock:
+                    overloaded = True
+                    continue
+                
+                if getAvailableWorkers(datetime_init, datetime_end, [candidate], bookingModel.id if bookingModel else None, for_update=True):
+                    locks.append(lock)
+                    worker_id = candidate
+                    break
+                
+                unregisterBooking(*lock, uuid=uuid)
             
             if not worker_id:
-                if not force:
+                if overloaded:
+                    log("Every candidate worker of work group '%s' is locked by other bookings.", work_group_id, uuid=uuid, level='WARNING')
+                    raise LocalOverloadedException(message=f"Local {local_id} is overloaded. Please try again later.")
+                
+                if not force or not workers:
                     raise AlredyBookingExceptionException()
-                            
-                workers = list(workers)
                 
-                random.shuffle(workers)
+                worker_id = random.choice(workers)
                 
-                worker_id = workers[0].id
+                locks.append(waitAndRegisterBooking(local_id, date, worker_id=worker_id, uuid=uuid))
         
         new_status = new_booking.pop('status') if 'status' in new_booking else (PENDING_STATUS if bookingModel is None else bookingModel.status.status)
         
-        status = StatusModel.query.filter_by(status=new_status).first()
+        status_id = getStatusId(new_status)
         
-        if not status:
-            raise StatusNotFoundException()
-        
-        new_booking['status_id'] = status.id
+        new_booking['status_id'] = status_id
         new_booking['worker_id'] = worker_id
+        new_booking['work_group_id'] = services[0].work_group_id
+        new_booking['local_id'] = local_id
         
         booking = bookingModel or BookingModel(**new_booking)
         booking.services = services
@@ -392,13 +560,13 @@ def createOrUpdateBooking(new_booking, local_id: int = None, bookingModel: Booki
             
             if bookingModel:
             
-                if bookingModel.status_id != status.id:
+                if bookingModel.status_id != status_id:
                     do_commit = False
-                    if status.status == CONFIRMED_STATUS:
+                    if new_status == CONFIRMED_STATUS:
                         confirmBooking(booking, session = session, commit=do_commit)
-                    elif status.status == CANCELLED_STATUS:
+                    elif new_status == CANCELLED_STATUS:
                         cancelBooking(booking, session = session, commit=do_commit)
-                    elif status.status == PENDING_STATUS:
+                    elif new_status == PENDING_STATUS:
                         pendingBooking(booking, session = session, commit=do_commit)
                 
                 for key, value in new_booking.items():
@@ -419,24 +587,12 @@ def createOrUpdateBooking(new_booking, local_id: int = None, bookingModel: Booki
             raise e
         
         if commit:
-            unregisterBooking(local_id, date, uuid=uuid)
-        
-        def once(func):
-            func.__called__ = False
-            def wrapper(*args, **kwargs):
-                if not func.__called__:
-                    func.__called__ = True
-                    return func(*args, **kwargs)
-            return wrapper
-        
-        unregister_once_callback = once(lambda: unregisterBooking(local_id, date, uuid=uuid))
+            unregisterLocks()
         
-        return booking, unregister_once_callback
-    except LocalOverloadedException as e:
-        raise e
+        return booking, unregisterLocks
     except Exception as e:
         
-        unregisterBooking(local_id, date, uuid=uuid)
+        unregisterLocks()
         
         raise e
 
@@ -464,8 +620,8 @@ def checkTimetableBookings(local_id):
     bookings = getBookings(local_id, datetime_init = DATETIME_NOW, datetime_end = None, status = [CONFIRMED_STATUS, PENDING_STATUS])
     
     for booking in bookings:
-        week_day = WeekdayModel.query.filter_by(weekday=WEEK_DAYS[booking.datetime_init.weekday()]).first()
-        if not getTimetable(local_id, week_day.id, datetime_init=booking.datetime_init, datetime_end=booking.datetime_end):
+        week_day_id = getWeekdayId(WEEK_DAYS[booking.datetime_init.weekday()])
+        if not getTimetable(local_id, week_day_id, datetime_init=booking.datetime_init, datetime_end=booking.datetime_end):
             raise BookingsConflictException(f'There is a booking [{booking.id}] that overlaps with the timetable.')
     
     return True
@@ -481,12 +637,7 @@ def pendingBooking(booking: BookingModel, comment = None, session = None, commit
 
 def changeBookingStatus(booking, status_name, comment = None, session = None, commit = True) -> BookingModel:
     try:
-        status = StatusModel.query.filter_by(status=status_name).first().id
-        
-        if not status:
-            raise StatusNotFoundException(f"Status '{status_name}' was not found")
-        
-        booking.status_id = status
+        booking.status_id = getStatusId(status_name)
         if comment: booking.comment = comment
         addAndCommit(booking, session = session) if commit else addAndFlush(booking, session = session)
         return booking
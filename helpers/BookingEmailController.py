@@ -8,7 +8,7 @@ from db import deleteAndCommit, rollback
 
 from globals import TIMEOUT_CONFIRM_BOOKING, DEBUG, USER_ROLE, EmailType, is_email_test_mode, log
 
-from celery_app.tasks import check_booking_status, send_mail_task, set_email_sent
+from celery_app.tasks import check_booking_status, send_mail_task, send_mails_batch_task, set_email_sent
 from helpers.BookingController import calculateExpireBookingToken
 from helpers.EmailController import send_cancelled_booking_mail, send_confirmed_booking_mail, send_updated_booking_mail
 from helpers.security import generateTokens
@@ -45,12 +45,22 @@ def start_waiter_booking_status(booking_id, timeout=None):
 
     return timeout
 
+
+def send_confirm_mail_async(local_id, booking_id, _uuid = None):
+    if is_email_test_mode(): return send_mail_task(local_id, booking_id, int(EmailType.CONFIRM_EMAIL))
+    log("Sending confirm email async...", uuid=_uuid)
+    return send_mail_task.delay(local_id, booking_id, int(EmailType.CONFIRM_EMAIL), _uuid = _uuid)
     
 def send_confirmed_mail_async(local_id, booking_id, _uuid = None):
     if is_email_test_mode(): return send_mail_task(local_id, booking_id, int(EmailType.CONFIRMED_EMAIL))
     log("Sending confirmed email async...", uuid=_uuid)
     return send_mail_task.delay(local_id, booking_id, int(EmailType.CONFIRMED_EMAIL), _uuid = _uuid)   
     
+def send_confirmed_mails_batch_async(local_id, booking_ids, _uuid = None):
+    if is_email_test_mode(): return send_mails_batch_task(local_id, booking_ids, int(EmailType.CONFIRMED_EMAIL))
+    log(f"Sending {len(booking_ids)} confirmed emails async...", uuid=_uuid)
+    return send_mails_batch_task.delay(local_id, booking_ids, int(EmailType.CONFIRMED_EMAIL), _uuid = _uuid)
+    
 def send_cancelled_mail_async(local_id, booking_id, _uuid = None):
     if is_email_test_mode(): return send_mail_task(local_id, booking_id, int(EmailType.CANCELLED_EMAIL))
     log("Sending cancelled email async...", uuid=_uuid)
@@ -0,0 +1,214 @@
+from bisect import insort
+from datetime import datetime, time, timedelta
+import random
+
+from sqlalchemy import select
+
+from db import db, addAndCommit
+from globals import BULK_BOOKING_LOCK_EXPIRE, CONFIRMED_STATUS, WEEK_DAYS, log
+from helpers.AvailabilityController import isBookable, loadBusyIntervals, loadSchedule, openWindows, subtractIntervals
+from helpers.BookingController import unregisterBooking, waitAndRegisterBooking
+from helpers.DatetimeHelper import naiveToAware, now
+from helpers.ReferenceData import getStatusId
+from helpers.error.BookingError.AlredyBookingException import AlredyBookingExceptionException
+from helpers.error.BookingError.LocalUnavailableException import LocalUnavailableException
+from helpers.error.BookingError.WorkerUnavailable import WorkerUnavailableException
+from helpers.error.BookingError.WrongServiceWorkGroupException import WrongServiceWorkGroupException
+from helpers.error.BookingError.WrongWorkerWorkGroupException import WrongWorkerWorkGroupException
+from helpers.error.ClosedDaysError.ClosedDayException import ClosedDayException
+from helpers.error.DataError.PastDateException import PastDateException
+from helpers.error.ServiceError.ServiceNotFoundException import ServiceNotFoundException
+from helpers.error.WorkerError.WorkerNotFoundException import WorkerNotFoundException
+from helpers.security import generateUUID
+from models.booking import BookingModel
+from models.service import ServiceModel
+from models.work_group import WorkGroupModel
+from models.work_group_worker import WorkGroupWorkerModel
+
+# Errors of a single item: the rest of the batch goes on.
+BULK_ITEM_ERRORS = (ServiceNotFoundException, WorkerNotFoundException, WrongServiceWorkGroupException, WrongWorkerWorkGroupException,
+                    PastDateException, LocalUnavailableException, ClosedDayException, WorkerUnavailableException, AlredyBookingExceptionException, ValueError)
+
+def prepareBooking(local, booking_data, services, work_groups_workers, force = False):
+    """
+    Checks the fields of one item that do not depend on the bookings of the local.
+    """
+
+    booking_services = []
+
+    for service_id in sorted(set(booking_data['services_ids'])):
+        if service_id not in services:
+            raise ServiceNotFoundException(id = service_id)
+        booking_services.append(services[service_id])
+
+    if not booking_services:
+        raise ServiceNotFoundException(id = 0)
+
+    work_group_id = booking_services[0].work_group_id
+
+    if any(service.work_group_id != work_group_id for service in booking_services):
+        raise WrongServiceWorkGroupException()
+
+    datetime_init = booking_data['datetime_init'].replace(tzinfo=None)
+
+    if not force and naiveToAware(datetime_init) < now(local.location):
+        raise PastDateException()
+
+    worker_id = booking_data.get('worker_id')
+    local_workers = set(worker for workers in work_groups_workers.values() for worker in workers)
+
+    if worker_id is not None:
+        if worker_id not in local_workers:
+            raise WorkerNotFoundException(id = worker_id)
+
+        if not force and worker_id not in work_groups_workers.get(work_group_id, []):
+            raise WrongWorkerWorkGroupException()
+
+    return {
+        'data': booking_data,
+        'services': booking_services,
+        'work_group_id': work_group_id,
+        'worker_id': worker_id,
+        'candidates': [worker_id] if worker_id is not None else work_groups_workers.get(work_group_id, []),
+        'datetime_init': datetime_init,
+        'datetime_end': datetime_init + timedelta(minutes=sum(service.duration for service in booking_services)),
+    }
+
+def assignWorker(schedule, busy, item, force = False):
+    """
+    Worker of the item checked against the snapshot, the same way createOrUpdateBooking does.
+    """
+
+    datetime_init, datetime_end = item['datetime_init'], item['datetime_end']
+
+    if force:
+        if item['worker_id'] is not None:
+            return item['worker_id']
+
+        if not item['candidates']:
+            raise AlredyBookingExceptionException()
+
+        free = [worker for worker in item['candidates'] if subtractIntervals([(datetime_init, datetime_end)], busy[worker]) == [(datetime_init, datetime_end)]]
+
+        return random.choice(free or item['candidates'])
+
+    day = datetime_init.date()
+    timetable = [(datetime.combine(day, opening_time), datetime.combine(day, closing_time)) for opening_time, closing_time in schedule['timetable'].get(WEEK_DAYS[day.weekday()], [])]
+
+    if not any(init <= datetime_init and datetime_end <= end for init, end in timetable):
+        raise LocalUnavailableException()
+
+    if not any(init <= datetime_init and datetime_end <= end for init, end in openWindows(schedule, day)):
+        raise ClosedDayException()
+
+    candidates = [worker for worker in item['candidates'] if isBookable(schedule, busy[worker], datetime_init, datetime_end)]
+
+    if not candidates:
+        raise WorkerUnavailableException() if item['worker_id'] is not None else AlredyBookingExceptionException()
+
+    return random.choice(candidates)
+
+def createBookings(local, bookings_data, force = False, atomic = False, _uuid = None):
+    """
+    Creates the confirmed bookings of `bookings_data` in one transaction.
+
+    Every date of the batch is locked once for each worker that may take one of its bookings,
+    and the bookings are checked against one snapshot of the timetable, the closed days and the
+    bookings of those workers, which also holds the bookings accepted earlier in the batch.
+    With `atomic` nothing is created if any booking is not valid.
+
+    Returns one result per item, in the same order: {'index', 'booking'} or {'index', 'error'}.
+    """
+
+    uuid = _uuid or generateUUID()
+
+    results = [{'index': i} for i in range(len(bookings_data))]
+
+    services = {service.id: service for service in ServiceModel.query.join(WorkGroupModel).filter(WorkGroupModel.local_id == local.id).all()}
+
+    work_groups_workers = {}
+
+    for work_group_id, worker_id in db.session.execute(
+        select(WorkGroupWorkerModel.work_group_id, WorkGroupWorkerModel.worker_id)
+        .join(WorkGroupModel, WorkGroupModel.id == WorkGroupWorkerModel.work_group_id)
+        .where(WorkGroupModel.local_id == local.id)
+        .order_by(WorkGroupWorkerModel.worker_id)
+    ):
+        work_groups_workers.setdefault(work_group_id, []).append(worker_id)
+
+    items = []
+
+    for result, booking_data in zip(results, bookings_data):
+        try:
+            items.append((result, prepareBooking(local, booking_data, services, work_groups_workers, force)))
+        except BULK_ITEM_ERRORS as e:
+            result['error'] = e
+
+    if not items or (atomic and len(items) < len(results)):
+        return results
+
+    # Sorted, so two batches on the same workers can not wait for each other.
+    keys = sorted(set((item['datetime_init'].date(), worker_id) for _, item in items for worker_id in item['candidates']))
+
+    locks = []
+
+    try:
+        for date, worker_id in keys:
+            locks.append(waitAndRegisterBooking(local.id, date, worker_id=worker_id, exp=BULK_BOOKING_LOCK_EXPIRE, uuid=uuid))
+
+        log(f"Bulk booking: {len(locks)} locks acquired for {len(items)} bookings.", uuid=uuid)
+
+        datetime_init = datetime.combine(min(item['datetime_init'] for _, item in items).date(), time.min)
+        datetime_end = datetime.combine(max(item['datetime_end'] for _, item in items).date() + timedelta(days=1), time.min)
+
+        schedule = loadSchedule(local.id, datetime_init, datetime_end)
+        busy = loadBusyIntervals(sorted(set(worker_id for _, item in items for worker_id in item['candidates'])), datetime_init, datetime_end, for_update=True)
+
+        status_id = getStatusId(CONFIRMED_STATUS)
+
+        bookings = []
+
+        for result, item in items:
+
+            try:
+                worker_id = assignWorker(schedule, busy, item, force)
+            except BULK_ITEM_ERRORS as e:
+                result['error'] = e
+                continue
+
+            insort(busy[worker_id], (item['datetime_init'], item['datetime_end']))
+
+            booking_data = item['data']
+
+            booking = BookingModel(
+                datetime_init = item['datetime_init'],
+                datetime_end = item['datetime_end'],
+                client_name = booking_data['client_name'].strip().title(),
+                client_tlf = booking_data['client_tlf'],
+                client_email = booking_data['client_email'],
+                comment = booking_data.get('comment'),
+                status_id = status_id,
+                worker_id = worker_id,
+                work_group_id = item['work_group_id'],
+                local_id = local.id,
+                uuid_log = uuid,
+            )
+            booking.services = item['services']
+
+            result['booking'] = booking
+            bookings.append(booking)
+
+        if atomic and len(bookings) < len(results):
+            for result in results:
+                result.pop('booking', None)
+            return results
+
+        if bookings:
+            addAndCommit(*bookings)
+
+        log(f"Bulk booking: {len(bookings)} of {len(results)} bookings created.", uuid=uuid)
+
+        return results
+    finally:
+        while locks:
+            unregisterBooking(*locks.pop(), uuid=uuid)
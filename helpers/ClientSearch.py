@@ -0,0 +1,43 @@
+import re
+import unicodedata
+
+SEARCH_GRAM_SIZE = 3
+
+def foldText(value):
+    """
+    Lower case without accents: 'José Ñúñez' => 'jose nunez'.
+    """
+    decomposed = unicodedata.normalize('NFKD', value)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+def normalizeName(value):
+    return ' '.join(foldText(value).split()) if value else None
+
+def normalizeEmail(value):
+    return value.strip().lower() if value else None
+
+def normalizeTlf(value):
+    return re.sub(r'\D', '', value) if value else None
+
+# Client field => (code of its grams, search column, normalizer).
+CLIENT_SEARCH_FIELDS = {
+    'client_name': ('n', 'client_name_search', normalizeName),
+    'client_email': ('e', 'client_email_search', normalizeEmail),
+    'client_tlf': ('t', 'client_tlf_search', normalizeTlf),
+}
+
+# Keys of the client_filter of getBookings.
+CLIENT_FILTER_FIELDS = {
+    'name': 'client_name',
+    'email': 'client_email',
+    'tlf': 'client_tlf',
+}
+
+def searchGrams(value):
+    """
+    Distinct substrings of SEARCH_GRAM_SIZE characters of a normalized value.
+    """
+    if not value:
+        return set()
+
+    return set(value[i:i + SEARCH_GRAM_SIZE] for i in range(len(value) - SEARCH_GRAM_SIZE + 1))
@@ -1,11 +1,16 @@
-from datetime import time
+import threading
+import time
 import subprocess
 import os
 import mysql.connector
 from mysql.connector.cursor import MySQLCursor
 import redis
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+from redis.retry import Retry
 
-from globals import MAX_TIMEOUT_WAIT_BOOKING, REDIS_HOST, REDIS_PORT, is_redis_test_mode, log
+from globals import LOCK_POLL_INTERVAL, MAX_TIMEOUT_WAIT_BOOKING, REDIS_CONNECT_TIMEOUT, REDIS_HEALTH_CHECK_INTERVAL, REDIS_HOST, REDIS_MAX_CONNECTIONS, REDIS_PORT, REDIS_RETRIES, REDIS_SOCKET_TIMEOUT, is_redis_test_mode, log
+from helpers.Metrics import count_lock_event, observe_lock_wait
 
 class DatabaseConnection():
     
@@ -22,6 +27,45 @@ class DatabaseConnection():
 cache_memory = {}
 cache_expiry_time = {}
 
+version_mutex = threading.Lock()
+
+memory_locks = {}
+memory_locks_condition = threading.Condition()
+
+lock_metrics = {
+    'acquired': 0,
+    'contended': 0,
+    'timeouts': 0,
+    'busy': 0,
+    'released': 0,
+    'lost': 0,
+    'wait_time': 0.0,
+    'max_wait_time': 0.0,
+}
+lock_metrics_mutex = threading.Lock()
+
+# One pool (and client) per process: a forked mod_wsgi daemon or Celery worker must not share the sockets of its parent.
+redis_pool = None
+redis_client = None
+redis_pool_pid = None
+redis_pool_mutex = threading.Lock()
+
+redis_pool_metrics = {
+    'pools': 0,
+    'forks': 0,
+}
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    redis.call('del', KEYS[1])
+    redis.call('del', KEYS[2])
+    redis.call('rpush', KEYS[2], '1')
+    redis.call('expire', KEYS[2], ARGV[2])
+    return 1
+end
+return 0
+"""
+
 def export_database(db: DatabaseConnection, output_file, _uuid_log = None):
     os.environ['MYSQL_PWD'] = db.password
     
@@ -87,33 +131,126 @@ def remove_database(db: DatabaseConnection):
     
     cursor.execute(f"DROP DATABASE {db.name};")
 
-def create_redis_connection(host = REDIS_HOST, port = REDIS_PORT) -> redis.Redis:
+def reset_redis_pool():
+    """
+    Forgets the pool of the parent after a fork. Its connections are not closed: they belong to the parent.
+    """
+    
+    global redis_pool, redis_client, redis_pool_pid
+    
+    if redis_pool is not None:
+        redis_pool_metrics['forks'] += 1
+    
+    redis_pool, redis_client, redis_pool_pid = None, None, None
+    
+def after_fork_redis_pool():
+    global redis_pool_mutex
+    
+    # Another thread of the parent may have held it when the process forked.
+    redis_pool_mutex = threading.Lock()
+    reset_redis_pool()
+    
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=after_fork_redis_pool)
+
+def get_redis_pool() -> redis.BlockingConnectionPool:
+    """
+    Connection pool of this process, created on first use. A request waits up to
+    REDIS_SOCKET_TIMEOUT for a free connection when all REDIS_MAX_CONNECTIONS are busy.
+    """
+    
+    global redis_pool, redis_client, redis_pool_pid
+    
+    pid = os.getpid()
+    
+    if redis_pool is not None and redis_pool_pid == pid:
+        return redis_pool
+    
+    with redis_pool_mutex:
+        if redis_pool is None or redis_pool_pid != pid:
+            if redis_pool is not None:
+                reset_redis_pool()
+            
+            redis_pool = redis.BlockingConnectionPool(
+                host=REDIS_HOST,
+                port=int(REDIS_PORT),
+                db=0,
+                max_connections=REDIS_MAX_CONNECTIONS,
+                timeout=REDIS_SOCKET_TIMEOUT,
+                socket_timeout=REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+                socket_keepalive=True,
+                health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+                retry_on_timeout=True,
+                retry=Retry(ExponentialBackoff(), REDIS_RETRIES),
+                retry_on_error=[RedisConnectionError, RedisTimeoutError],
+            )
+            redis_client = redis.Redis(connection_pool=redis_pool)
+            redis_pool_pid = pid
+            redis_pool_metrics['pools'] += 1
+            
+        return redis_pool
+
+def create_redis_connection() -> redis.Redis:
+    """
+    Client of the process-wide pool, None in redis test mode.
+    """
     
     if is_redis_test_mode():
-        print("Redis test mode activated.")
         return None
     
-    return redis.Redis(host=host, port=port, db=0)
+    get_redis_pool()
+    
+    return redis_client
+
+def get_redis_pool_metrics():
+    """
+    Connections of the pool of this process. `in_use` at max_connections means the requests wait for Redis.
+    """
+    
+    metrics = {'pid': os.getpid(), 'max_connections': REDIS_MAX_CONNECTIONS, 'created': 0, 'in_use': 0, 'idle': 0, **redis_pool_metrics}
+    
+    with redis_pool_mutex:
+        pool = redis_pool if redis_pool_pid == os.getpid() else None
+        
+        if pool is not None:
+            # Free slots of the pool hold None until a connection is created for them.
+            idle = sum(1 for connection in list(pool.pool.queue) if connection is not None)
+            created = len(pool._connections)
+            metrics.update(created=created, idle=idle, in_use=created - idle)
+    
+    return metrics
 
-def register_key_value_cache(key, value, exp = MAX_TIMEOUT_WAIT_BOOKING, redis_connection = create_redis_connection(), pipeline = None):
+def register_key_value_cache(key, value, exp = MAX_TIMEOUT_WAIT_BOOKING, redis_connection = None, pipeline = None, nx = False):
+    """
+    Stores `value` in `key` for `exp` seconds. With `nx` an existing value is kept and False is
+    returned. With `pipeline` the command is queued and sent by its caller.
+    """
     
     if is_redis_test_mode():
+        if nx and get_key_value_cache(key) is not None:
+            return False
         cache_memory[key] = value
         cache_expiry_time[key] = time.time() + exp
-        return
+        return True
     
     if pipeline:
-        pipeline.multi()
-        pipeline.setex(key, exp, value)
-        pipeline.execute()
+        if nx:
+            pipeline.set(key, value, ex=exp, nx=True)
+        else:
+            pipeline.setex(key, exp, value)
         return
     
-    with redis_connection.pipeline() as pipe:
-        pipe.multi()            
-        pipe.setex(key, exp, value)
-        pipe.execute()
+    redis_connection = redis_connection or create_redis_connection()
+    
+    if nx:
+        return bool(redis_connection.set(key, value, ex=exp, nx=True))
+    
+    redis_connection.setex(key, exp, value)
+    
+    return True
         
-def get_key_value_cache(key, redis_connection = create_redis_connection(), pipeline = None):
+def get_key_value_cache(key, redis_connection = None, pipeline = None):
     
     if is_redis_test_mode():
         
@@ -129,13 +266,11 @@ def get_key_value_cache(key, redis_connection = create_redis_connection(), pipel
         pipeline.get(key)
         return
     
-    with redis_connection.pipeline() as pipe:
-        pipe.multi()
-        pipe.get(key)
-        result = pipe.execute()
-        return result[0] if result else None
+    redis_connection = redis_connection or create_redis_connection()
     
-def delete_key_value_cache(key, redis_connection = create_redis_connection(), pipeline = None):
+    return redis_connection.get(key)
+    
+def delete_key_value_cache(key, redis_connection = None, pipeline = None):
     
     if is_redis_test_mode():
         cache_memory.pop(key, None)
@@ -146,7 +281,130 @@ def delete_key_value_cache(key, redis_connection = create_redis_connection(), pi
         pipeline.delete(key)
         return
     
-    with redis_connection.pipeline() as pipe:
-        pipe.multi()
-        pipe.delete(key)
-        pipe.execute()
\ No newline at end of file
+    redis_connection = redis_connection or create_redis_connection()
+    redis_connection.delete(key)
+
+def get_version(key, redis_connection = None):
+    """
+    Current value of the version counter `key`, 0 if it was never bumped.
+    """
+    
+    if is_redis_test_mode():
+        with version_mutex:
+            return cache_memory.get(key, 0)
+    
+    redis_connection = redis_connection or create_redis_connection()
+    value = redis_connection.get(key)
+    
+    return int(value) if value else 0
+
+def bump_version(key, redis_connection = None):
+    """
+    Increments the version counter `key` and returns the new value.
+    """
+    
+    if is_redis_test_mode():
+        with version_mutex:
+            cache_memory[key] = cache_memory.get(key, 0) + 1
+            return cache_memory[key]
+    
+    redis_connection = redis_connection or create_redis_connection()
+    
+    return int(redis_connection.incr(key))
+
+def lock_release_key(key):
+    return f"{key}:released"
+
+def update_lock_metrics(**values):
+    with lock_metrics_mutex:
+        for name, value in values.items():
+            if name == 'max_wait_time':
+                lock_metrics[name] = max(lock_metrics[name], value)
+            else:
+                lock_metrics[name] += value
+    
+    for name, value in values.items():
+        if name == 'wait_time':
+            observe_lock_wait(value)
+        elif name != 'max_wait_time' and value:
+            count_lock_event(name, value)
+
+def get_lock_metrics():
+    with lock_metrics_mutex:
+        return dict(lock_metrics)
+
+def reset_lock_metrics():
+    with lock_metrics_mutex:
+        for name in lock_metrics:
+            lock_metrics[name] = 0 if isinstance(lock_metrics[name], int) else 0.0
+
+def try_acquire_memory_lock(key, token, exp):
+    lock = memory_locks.get(key)
+    
+    if lock and lock[1] > time.monotonic():
+        return False, lock[1] - time.monotonic()
+    
+    memory_locks[key] = (token, time.monotonic() + exp)
+    return True, 0
+
+def acquire_lock(key, token, exp = MAX_TIMEOUT_WAIT_BOOKING, timeout = MAX_TIMEOUT_WAIT_BOOKING, redis_connection = None):
+    """
+    Takes the lock `key` for `token`, blocking up to `timeout` seconds.
+    Waiters sleep until the holder releases the key (or its TTL expires)
+    instead of polling. Returns True when the lock is owned by `token`.
+    With timeout 0 a taken lock counts as `busy` instead of a timeout.
+    """
+    
+    time_init = time.monotonic()
+    deadline = time_init + timeout
+    contended = False
+    acquired = False
+    
+    if is_redis_test_mode():
+        with memory_locks_condition:
+            while True:
+                acquired, expires_in = try_acquire_memory_lock(key, token, exp)
+                remaining = deadline - time.monotonic()
+                if acquired or remaining <= 0:
+                    break
+                contended = True
+                memory_locks_condition.wait(min(remaining, expires_in))
+    else:
+        redis_connection = redis_connection or create_redis_connection()
+        
+        while True:
+            acquired = bool(redis_connection.set(key, token, nx=True, px=int(exp * 1000)))
+            remaining = deadline - time.monotonic()
+            if acquired or remaining <= 0:
+                break
+            contended = True
+            redis_connection.blpop([lock_release_key(key)], timeout=min(remaining, LOCK_POLL_INTERVAL))
+    
+    wait_time = time.monotonic() - time_init
+    
+    busy = not acquired and timeout <= 0
+    
+    update_lock_metrics(acquired=int(acquired), timeouts=int(not acquired and not busy), busy=int(busy), contended=int(contended or busy), wait_time=wait_time, max_wait_time=wait_time)
+    
+    return acquired
+
+def release_lock(key, token, exp = MAX_TIMEOUT_WAIT_BOOKING, redis_connection = None):
+    """
+    Releases `key` only if it is still owned by `token` and wakes up one waiter.
+    Returns False when the lock had already expired or was taken by someone else.
+    """
+    
+    if is_redis_test_mode():
+        with memory_locks_condition:
+            lock = memory_locks.get(key)
+            released = bool(lock and lock[0] == token)
+            if released:
+                memory_locks.pop(key)
+                memory_locks_condition.notify_all()
+    else:
+        redis_connection = redis_connection or create_redis_connection()
+        released = bool(redis_connection.eval(RELEASE_LOCK_SCRIPT, 2, key, lock_release_key(key), token, int(exp)))
+    
+    update_lock_metrics(released=int(released), lost=int(not released))
+    
+    return released
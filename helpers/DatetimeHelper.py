@@ -17,5 +17,11 @@ def naiveToAware(datetime, timezone=DEFAULT_LOCATION_TIME):
     timezone = pytz.timezone(timezone)
     return timezone.localize(datetime)
 
+def awareToNaive(dt, timezone=DEFAULT_LOCATION_TIME):
+    """
+    Naive datetime in `timezone`, as the datetimes are stored. Naive datetimes are returned as they are.
+    """
+    return dt.astimezone(pytz.timezone(timezone)).replace(tzinfo=None) if isAware(dt) else dt
+
 def isAware(dt):
     return dt.tzinfo is not None and dt.tzinfo.utcoffset(dt) is not None
\ No newline at end of file
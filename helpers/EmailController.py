@@ -3,13 +3,14 @@ import datetime
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 import os
-import smtplib
 import socket
 import time
 import traceback
 from db import addAndCommit, rollback
 from globals import DEFAULT_LOCATION_TIME, EMAIL_CANCELLED_PAGE, EMAIL_CONFIRMATION_PAGE, EMAIL_CONFIRMED_PAGE, EMAIL_UPDATED_PAGE, KEYWORDS_PAGES, DEBUG, EmailType, get_fqdn_cache, log
 from helpers.DatetimeHelper import naiveToAware, now
+from helpers.EmailTemplate import get_template, render_template
+from helpers.SmtpPool import get_smtp_pool
 from helpers.path import generatePagePath
 from helpers.security import decrypt_str
 from models.booking import BookingModel
@@ -17,7 +18,6 @@ from models.local import LocalModel
 from models.local_settings import LocalSettingsModel
 from models.session_token import SessionTokenModel
 from models.smtp_settings import SmtpSettingsModel
-from resources.public_files import generateFileResponse
 from dateutil.relativedelta import relativedelta
 
 from dotenv import load_dotenv
@@ -48,13 +48,8 @@ def send_mail(smtp_mail, smtp_user, smtp_passwd, smtp_host, smtp_port, to, subje
     # print("Email test mode not activated.")
 
     try:
-                
-        server = smtplib.SMTP(smtp_host, smtp_port)
-        server.starttls()
-            
-        server.login(smtp_user, smtp_passwd)
-        server.sendmail(smtp_mail, to, email.as_string())
-        server.quit()
+        
+        get_smtp_pool(smtp_host, smtp_port, smtp_user, smtp_passwd).sendmail(smtp_mail, to, email.as_string())
         log(f"Mail sent to {to}.", uuid=_uuid)
         return True
     except Exception as e:
@@ -165,33 +160,29 @@ def render_page(local: LocalModel, local_settings: LocalSettingsModel, book:Book
     uuid_log = book.uuid_log
     
     try:
-        response = generateFileResponse(local.id, generatePagePath(page))
-                
-        mail_body = (
-                    response.get_data().decode('utf-8')
-                    .replace(KEYWORDS_PAGES['CONFIRMATION_LINK'], confirmation_link)
-                    .replace(KEYWORDS_PAGES['CANCEL_LINK'], cancel_link)
-                    .replace(KEYWORDS_PAGES['UPDATE_LINK'], update_link)
-                    .replace(KEYWORDS_PAGES['CLIENT_NAME'], client_name)
-                    .replace(KEYWORDS_PAGES['LOCAL_NAME'], local_name)
-                    .replace(KEYWORDS_PAGES['DATE'], date)
-                    .replace(KEYWORDS_PAGES['TIME'], time)
-                    .replace(KEYWORDS_PAGES['SERVICE'], service)
-                    .replace(KEYWORDS_PAGES['COST'], cost)
-                    .replace(KEYWORDS_PAGES['WORKER'], worker)
-                    .replace(KEYWORDS_PAGES['ADDRESS-MAPS'], address_maps)
-                    .replace(KEYWORDS_PAGES['ADDRESS'], address)
-                    .replace(KEYWORDS_PAGES['PHONE_CONTACT'], phone_contact)
-                    .replace(KEYWORDS_PAGES['EMAIL_CONTACT'], email_contact)
-                    .replace(KEYWORDS_PAGES['TIMEOUT_CONFIRM_BOOKING'], str(timeout_confirm_booking))
-                    .replace(KEYWORDS_PAGES['WEBSITE'], website)
-                    .replace(KEYWORDS_PAGES['WHATSAPP_LINK'], whatsapp_link)
-                    .replace(KEYWORDS_PAGES['COMMENT'], comment)
-                    .replace(KEYWORDS_PAGES['UUID_LOG'], uuid_log)
-                    )
-        subject = mail_body.split("<title>")[1].split("</title>")[0]
+        template = get_template(local.id, generatePagePath(page))
         
-        return (mail_body, subject)
+        return render_template(template, {
+            'CONFIRMATION_LINK': confirmation_link,
+            'CANCEL_LINK': cancel_link,
+            'UPDATE_LINK': update_link,
+            'CLIENT_NAME': client_name,
+            'LOCAL_NAME': local_name,
+            'DATE': date,
+            'TIME': time,
+            'SERVICE': service,
+            'COST': cost,
+            'WORKER': worker,
+            'ADDRESS-MAPS': address_maps,
+            'ADDRESS': address,
+            'PHONE_CONTACT': phone_contact,
+            'EMAIL_CONTACT': email_contact,
+            'TIMEOUT_CONFIRM_BOOKING': str(timeout_confirm_booking),
+            'WEBSITE': website,
+            'WHATSAPP_LINK': whatsapp_link,
+            'COMMENT': comment,
+            'UUID_LOG': uuid_log
+        })
         
     except:
         if DEBUG:
@@ -201,6 +192,9 @@ def render_page(local: LocalModel, local_settings: LocalSettingsModel, book:Book
         traceback.print_exc()
         return False
 
+def is_confirm_email_enabled(local_settings) -> bool:
+    return bool(local_settings and local_settings.booking_timeout and local_settings.booking_timeout != -1)
+
 def send_mail_booking(local: LocalModel, book:BookingModel, booking_token, page, email_type: EmailType, _uuid = None) -> bool:
     
     log(f"Sending mail. Email type: {email_type}. Local: {local.name}", uuid=_uuid)
@@ -212,7 +206,7 @@ def send_mail_booking(local: LocalModel, book:BookingModel, booking_token, page,
         log(f"Error. Local settings not found. Local: {local.name}", uuid=_uuid, level="WARNING")
         return False
     
-    if email_type == EmailType.CONFIRM_EMAIL and (not local_settings.booking_timeout or local_settings.booking_timeout == -1): #TODO check
+    if email_type == EmailType.CONFIRM_EMAIL and not is_confirm_email_enabled(local_settings): #TODO check
         log(f"Error. Timeout not found. Local: {local.name}", uuid=_uuid, level="WARNING")    
         return False
     
@@ -0,0 +1,110 @@
+import os
+import re
+import threading
+
+from globals import KEYWORDS_PAGES
+from helpers.Metrics import count_cache_event
+from helpers.path import getFilePath
+
+TITLE_PATTERN = re.compile(r'<title>(.*?)</title>', re.DOTALL)
+
+email_templates = {}
+email_templates_mutex = threading.Lock()
+
+template_metrics = {
+    'hits': 0,
+    'misses': 0,
+}
+
+def count(metric, value = 1):
+    with email_templates_mutex:
+        template_metrics[metric] += value
+
+    count_cache_event('email_template', metric, value)
+
+def keywords_pattern(keywords = KEYWORDS_PAGES):
+    # Longest placeholders first, so none of them is matched as the prefix of another.
+    placeholders = sorted(keywords.values(), key=len, reverse=True)
+    return re.compile('(' + '|'.join(re.escape(placeholder) for placeholder in placeholders) + ')')
+
+KEYWORDS_PATTERN = keywords_pattern()
+KEYWORDS_NAMES = {placeholder: name for name, placeholder in KEYWORDS_PAGES.items()}
+
+def compile_text(text):
+    """
+    Splits `text` into literals (even positions) and placeholder names (odd positions).
+    """
+
+    parts = KEYWORDS_PATTERN.split(text)
+
+    for i in range(1, len(parts), 2):
+        parts[i] = KEYWORDS_NAMES[parts[i]]
+
+    return parts
+
+def render_text(parts, values):
+    rendered = parts[:]
+
+    for i in range(1, len(rendered), 2):
+        name = rendered[i]
+        rendered[i] = values[name] if name in values else KEYWORDS_PAGES[name]
+
+    return ''.join(rendered)
+
+def compile_template(html):
+
+    title = TITLE_PATTERN.search(html)
+
+    if not title:
+        raise ValueError('The template has no <title>.')
+
+    return {
+        'body': compile_text(html),
+        'subject': compile_text(title.group(1)),
+    }
+
+def render_template(template, values):
+    """
+    Renders a compiled template in a single pass. `values` is keyed by the names of KEYWORDS_PAGES.
+    """
+    return render_text(template['body'], values), render_text(template['subject'], values)
+
+def get_template(local_id, page_path):
+    """
+    Compiled template of the page of the local. It is compiled again when the file changes on disk.
+    """
+
+    path = getFilePath(local_id, page_path)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    key = (local_id, page_path)
+
+    with email_templates_mutex:
+        cached = email_templates.get(key)
+
+    if cached and cached['version'] == version:
+        count('hits')
+        return cached['template']
+
+    count('misses')
+
+    with open(path, 'r', encoding='utf-8') as file:
+        template = compile_template(file.read())
+
+    with email_templates_mutex:
+        email_templates[key] = {'version': version, 'template': template}
+
+    return template
+
+def invalidate_template(local_id, page_path = None):
+    with email_templates_mutex:
+        for key in [key for key in email_templates if key[0] == local_id and (page_path is None or key[1] == page_path)]:
+            email_templates.pop(key)
+
+def get_template_cache_metrics():
+    with email_templates_mutex:
+        metrics = dict(template_metrics)
+        metrics['size'] = len(email_templates)
+
+    return metrics
@@ -0,0 +1,151 @@
+from collections import OrderedDict
+import hashlib
+import os
+import re
+import threading
+import time
+
+from sqlalchemy import select
+
+from db import db
+from globals import FILE_CACHE_SIZE, FILE_CACHE_TTL
+from helpers.Metrics import count_cache_event
+from models.file import FileModel
+
+# Names with a hash of the content before the extension, e.g. logo.3f9a0c1d.png or logo-3f9a0c1d.png.
+HASHED_NAME_PATTERN = re.compile(r'[.-]([0-9a-fA-F]{8,})\.[A-Za-z0-9]+$')
+HASH_ALGORITHMS = ('md5', 'sha1', 'sha256')
+
+local_files = OrderedDict()
+file_digests = OrderedDict()
+local_files_mutex = threading.Lock()
+
+file_cache_metrics = {
+    'hits': 0,
+    'misses': 0,
+    'invalidations': 0,
+}
+
+def count(metric, value = 1):
+    with local_files_mutex:
+        file_cache_metrics[metric] += value
+
+    count_cache_event('file', metric, value)
+
+def load_file(local_id, path):
+    row = db.session.execute(
+        select(FileModel.name, FileModel.mimetype, FileModel.path)
+        .where(FileModel.local_id == local_id, FileModel.path == path)
+        .limit(1)
+    ).first()
+
+    return {'name': row.name, 'mimetype': row.mimetype, 'path': row.path} if row else None
+
+def get_file(local_id, path):
+    """
+    Returns {'name', 'mimetype', 'path'} of the public file, or None if it does not exist.
+
+    Known files are kept in the LRU of the process for FILE_CACHE_TTL seconds, so serving a file
+    does not query the database. Unknown paths are not cached, a new upload is visible at once.
+    A file deleted by another process is still found here until it expires, but then its content
+    is missing from disk and the request gets a 404 anyway.
+    """
+
+    key = (local_id, path)
+
+    with local_files_mutex:
+        cached = local_files.get(key)
+
+        hit = cached is not None and cached[1] > time.monotonic()
+
+        if hit:
+            local_files.move_to_end(key)
+
+    if hit:
+        count('hits')
+        return cached[0]
+
+    file = load_file(local_id, path)
+    count('misses')
+
+    if file is None:
+        return None
+
+    with local_files_mutex:
+        local_files[key] = (file, time.monotonic() + FILE_CACHE_TTL)
+        local_files.move_to_end(key)
+
+        while len(local_files) > FILE_CACHE_SIZE:
+            local_files.popitem(last=False)
+
+    return file
+
+def invalidate_file(local_id, path = None):
+    """
+    Drops the file `path` of the local, or all of them, from the cache. Must be called after
+    uploading or deleting a file.
+    """
+
+    with local_files_mutex:
+        for key in [key for key in local_files if key[0] == local_id and (path is None or key[1] == path)]:
+            local_files.pop(key)
+
+        for key in [key for key in file_digests if key[0] == local_id and (path is None or key[1] == path)]:
+            file_digests.pop(key)
+
+    count('invalidations')
+
+def file_digest(file_path):
+    digests = [hashlib.new(algorithm, usedforsecurity=False) for algorithm in HASH_ALGORITHMS]
+
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            for digest in digests:
+                digest.update(chunk)
+
+    return tuple(digest.hexdigest() for digest in digests)
+
+def is_content_hashed(local_id, file, file_path):
+    """
+    True if the name of the file carries a hash of its content (md5, sha1 or sha256, in hex) before
+    the extension. The names come from the users, so the hash is checked against the file on disk:
+    IMG-20231005.jpg looks hashed but is not. The digests are kept while the size and mtime of the
+    file do not change.
+    """
+
+    match = HASHED_NAME_PATTERN.search(file['name'])
+
+    if match is None:
+        return False
+
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return False
+
+    key = (local_id, file['path'])
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    with local_files_mutex:
+        cached = file_digests.get(key)
+
+    if cached is None or cached[0] != version:
+        cached = (version, file_digest(file_path))
+
+        with local_files_mutex:
+            file_digests[key] = cached
+            file_digests.move_to_end(key)
+
+            while len(file_digests) > FILE_CACHE_SIZE:
+                file_digests.popitem(last=False)
+
+    name_hash = match.group(1).lower()
+
+    return any(digest.startswith(name_hash) for digest in cached[1])
+
+def get_file_cache_metrics():
+    with local_files_mutex:
+        metrics = dict(file_cache_metrics)
+        metrics['size'] = len(local_files)
+
+    return metrics
@@ -1,10 +1,12 @@
 import functools
 import json
+import time
 import traceback
-from flask import Request, Response, request
+from flask import Request, Response, g, request
 import werkzeug
 
 from globals import log
+from helpers.Metrics import observe_request
 from helpers.security import generateUUID
 from db import db
 
@@ -40,4 +42,23 @@ def log_route(f):
 
         return response
 
-    return decorated_function
\ No newline at end of file
+    return decorated_function
+
+def metrics_middleware(app):
+    """
+    Records the latency of every request per (blueprint, endpoint, method, status), including
+    aborts and errors, which also go through after_request.
+    """
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def observe(response):
+        start = g.pop('request_start', None)
+
+        if start is not None:
+            observe_request(request.blueprint, request.endpoint, request.method, response.status_code, time.perf_counter() - start)
+
+        return response
@@ -0,0 +1,161 @@
+import os
+
+from globals import PROMETHEUS_MULTIPROC_DIR
+
+# prometheus_client picks the multiprocess storage when it is imported, after globals loads the .env.
+if PROMETHEUS_MULTIPROC_DIR: os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+
+# Seconds. Booking writes wait up to MAX_TIMEOUT_WAIT_BOOKING for their lock.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LOCK_WAIT_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+BOOKING_BLUEPRINT = 'booking'
+BOOKING_WRITE_METHODS = ('POST', 'PUT', 'PATCH')
+
+UNKNOWN_LABEL = 'unknown'
+
+request_latency = Histogram(
+    'booking_api_request_duration_seconds',
+    'Latency of the API requests.',
+    ['blueprint', 'endpoint', 'method', 'status'],
+    buckets=LATENCY_BUCKETS,
+)
+
+booking_outcomes = Counter(
+    'booking_api_booking_outcomes_total',
+    'Responses of the requests that create or modify bookings (201 created, 409 conflict, 503 overloaded, ...).',
+    ['endpoint', 'method', 'status'],
+)
+
+# Events of every process, added up under PROMETHEUS_MULTIPROC_DIR. The helpers also keep them in their get_*_metrics() dicts.
+
+cache_events = Counter(
+    'booking_api_cache_events_total',
+    'Lookups, invalidations and Redis errors of the caches (token, schedule, response, file, email_template) by event.',
+    ['cache', 'event'],
+)
+
+lock_events = Counter(
+    'booking_api_booking_lock_events_total',
+    'Booking locks acquired, contended, busy (skipped), timed out, released and lost (expired before the release).',
+    ['event'],
+)
+
+lock_wait = Histogram(
+    'booking_api_booking_lock_wait_seconds',
+    'Time waited for a booking lock, acquired or not.',
+    buckets=LOCK_WAIT_BUCKETS,
+)
+
+smtp_events = Counter(
+    'booking_api_smtp_pool_events_total',
+    'SMTP connections reused (hits), opened (misses), reconnected and discarded, and mails sent or failed.',
+    ['host', 'event'],
+)
+
+log_lines = Counter(
+    'booking_api_log_lines_total',
+    'Log lines buffered (lines), written, evicted with their request buffer and dropped because the log queue was full.',
+    ['event'],
+)
+
+def count_cache_event(cache, event, value = 1):
+    cache_events.labels(cache, event).inc(value)
+
+def count_lock_event(event, value = 1):
+    lock_events.labels(event).inc(value)
+
+def observe_lock_wait(wait_time):
+    lock_wait.observe(wait_time)
+
+def count_smtp_event(host, event, value = 1):
+    smtp_events.labels(host, event).inc(value)
+
+def count_log_lines(event, value = 1):
+    log_lines.labels(event).inc(value)
+
+def gauge(name, documentation, labels, values):
+    family = GaugeMetricFamily(name, documentation, labels=labels)
+
+    for label_values, value in values:
+        family.add_metric(label_values, value)
+
+    return family
+
+class ProcessCollector:
+    """
+    State of the process that serves /metrics (pools, cache sizes, pending logs), read when it is scraped.
+    """
+
+    def collect(self):
+        # Imported here: these helpers count their events through this module.
+        from globals import get_log_metrics
+        from helpers.Database import get_redis_pool_metrics
+        from helpers.EmailTemplate import get_template_cache_metrics
+        from helpers.FileCache import get_file_cache_metrics
+        from helpers.ScheduleCache import get_schedule_cache_metrics
+        from helpers.SmtpPool import get_smtp_idle_connections
+        from helpers.TokenCache import get_token_cache_metrics
+
+        pid = str(os.getpid())
+        redis_pool = get_redis_pool_metrics()
+        logs = get_log_metrics()
+
+        yield gauge('booking_api_redis_pool_connections', 'Connections of the Redis pool by state.', ['pid', 'state'], [
+            ([pid, 'in_use'], redis_pool['in_use']),
+            ([pid, 'idle'], redis_pool['idle']),
+        ])
+        yield gauge('booking_api_redis_pool_max_connections', 'Size of the Redis pool.', ['pid'], [([pid], redis_pool['max_connections'])])
+
+        yield gauge('booking_api_cache_entries', 'Entries of the in-process caches.', ['pid', 'cache'], [
+            ([pid, 'token'], get_token_cache_metrics()['size']),
+            ([pid, 'schedule'], get_schedule_cache_metrics()['size']),
+            ([pid, 'file'], get_file_cache_metrics()['size']),
+            ([pid, 'email_template'], get_template_cache_metrics()['size']),
+        ])
+
+        yield gauge('booking_api_smtp_pool_idle_connections', 'Idle connections of the SMTP pools by host.', ['pid', 'host'],
+            [([pid, host], idle) for host, idle in get_smtp_idle_connections().items()])
+
+        yield gauge('booking_api_log_pending', 'Requests with buffered log lines (buffered) and batches waiting for the log writer (queued).', ['pid', 'state'], [
+            ([pid, 'buffered'], logs['buffered']),
+            ([pid, 'queued'], logs['queued']),
+        ])
+
+process_collector = ProcessCollector()
+
+if not PROMETHEUS_MULTIPROC_DIR: REGISTRY.register(process_collector)
+
+def is_multiprocess():
+    """
+    With PROMETHEUS_MULTIPROC_DIR every process (mod_wsgi daemons, gunicorn workers) writes its
+    samples to that directory and /metrics adds up the files of all of them. The directory must
+    be emptied before the server starts.
+    """
+
+    return bool(PROMETHEUS_MULTIPROC_DIR)
+
+def observe_request(blueprint, endpoint, method, status, duration):
+    blueprint, endpoint, status = blueprint or UNKNOWN_LABEL, endpoint or UNKNOWN_LABEL, str(status)
+
+    request_latency.labels(blueprint, endpoint, method, status).observe(duration)
+
+    if blueprint == BOOKING_BLUEPRINT and method in BOOKING_WRITE_METHODS:
+        booking_outcomes.labels(endpoint, method, status).inc()
+
+def generate_metrics():
+    """
+    Returns (body, content type) of the metrics in the Prometheus text format.
+    """
+
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(process_collector)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,114 @@
+from collections import Counter
+from contextlib import contextmanager
+import contextvars
+import time
+
+from flask import g
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from globals import QUERY_REPEAT_THRESHOLD, log
+
+QUERY_COUNT_HEADER = 'X-Query-Count'
+QUERY_TIME_HEADER = 'X-Query-Time'
+QUERY_REPEATED_HEADER = 'X-Query-Repeated'
+
+current_queries = contextvars.ContextVar('current_queries', default=())
+
+class QueryStats:
+    """
+    Statements sent to the database and the time spent on them.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+        self.statements = []
+
+    def add(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.statements.append(statement)
+
+    def repeated(self, threshold):
+        """
+        Statements that ran more than `threshold` times, usually a lazy load per row (N+1).
+        """
+
+        return {statement: times for statement, times in Counter(self.statements).items() if times > threshold}
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # The start time lives on the execution context, so a failed statement takes it with it.
+    if current_queries.get() and context is not None:
+        context.query_start = time.perf_counter()
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, 'query_start', None)
+    duration = time.perf_counter() - start if start is not None else 0.0
+
+    for stats in current_queries.get():
+        stats.add(statement, duration)
+
+def listen_queries():
+    if not event.contains(Engine, 'before_cursor_execute', before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+
+@contextmanager
+def record_queries():
+    """
+    Accounts the statements run by this thread (or task) inside the block, on any engine. The
+    blocks can be nested: a statement counts in every open one, including a request's.
+    """
+
+    listen_queries()
+
+    stats = QueryStats()
+    token = current_queries.set(current_queries.get() + (stats,))
+
+    try:
+        yield stats
+    finally:
+        current_queries.reset(token)
+
+def query_accounting_middleware(app):
+    """
+    Accounts the statements of every request. In debug mode the response carries their number
+    and time (X-Query-Count, X-Query-Time in ms), and the statements repeated more than
+    QUERY_REPEAT_THRESHOLD times are logged and counted in X-Query-Repeated. The queries of a
+    streamed body run after the headers are sent and are not included.
+    """
+
+    listen_queries()
+
+    @app.before_request
+    def start_query_accounting():
+        g.query_stats = QueryStats()
+        g.query_accounting = current_queries.set(current_queries.get() + (g.query_stats,))
+
+    @app.after_request
+    def query_accounting_headers(response):
+        stats = g.get('query_stats')
+
+        if stats is None or not app.debug:
+            return response
+
+        response.headers[QUERY_COUNT_HEADER] = str(stats.count)
+        response.headers[QUERY_TIME_HEADER] = f"{stats.duration * 1000:.2f}"
+
+        repeated = stats.repeated(QUERY_REPEAT_THRESHOLD)
+
+        if repeated:
+            response.headers[QUERY_REPEATED_HEADER] = str(len(repeated))
+
+            for statement, times in repeated.items():
+                log("Possible N+1: statement run %s times in one request: %s", times, statement, level='WARNING', uuid=None)
+
+        return response
+
+    @app.teardown_request
+    def stop_query_accounting(exc):
+        token = g.pop('query_accounting', None)
+
+        if token is not None:
+            current_queries.reset(token)
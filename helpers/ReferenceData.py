@@ -0,0 +1,87 @@
+import threading
+
+from sqlalchemy import select
+
+from db import db
+from helpers.error.StatusError.StatusNotFoundException import StatusNotFoundException
+from helpers.error.WeekdayError.WeekdayNotFoundException import WeekdayNotFoundException
+from models.status import StatusModel
+from models.weekday import WeekdayModel
+
+reference_data = None
+reference_data_mutex = threading.Lock()
+
+def loadReferenceData():
+    """
+    Reads the status and weekday tables into the registry of the process. Needs an app context.
+    An empty table is not cached, so it is read again on the next use.
+    """
+    global reference_data
+
+    status = dict(db.session.execute(select(StatusModel.status, StatusModel.id)).all())
+    weekdays = dict(db.session.execute(select(WeekdayModel.weekday, WeekdayModel.id)).all())
+
+    data = {
+        'status': status,
+        'weekday': weekdays,
+        'weekday_by_id': {id: weekday for weekday, id in weekdays.items()},
+    }
+
+    reference_data = data if status and weekdays else None
+
+    return data
+
+def reloadReferenceData():
+    """
+    Reloads the registry. Must be called after the status or weekday tables change.
+    """
+    with reference_data_mutex:
+        return loadReferenceData()
+
+def getReferenceData():
+
+    data = reference_data
+
+    if data is None:
+        with reference_data_mutex:
+            data = reference_data or loadReferenceData()
+
+    return data
+
+def getStatusId(status):
+
+    status_ids = getReferenceData()['status']
+
+    if status not in status_ids:
+        raise StatusNotFoundException(f"Status '{status}' was not found")
+
+    return status_ids[status]
+
+def getStatusIds(*status):
+    """
+    Ids of the given status that exist, or of all of them if none is given.
+    """
+    status_ids = getReferenceData()['status']
+
+    if not status:
+        return dict(status_ids)
+
+    return [status_ids[s] for s in status if s in status_ids]
+
+def getStatus(status):
+    """
+    StatusModel of the current session. Once loaded it is served from the identity map.
+    """
+    return db.session.get(StatusModel, getStatusId(status))
+
+def getWeekdayId(weekday):
+
+    weekday_ids = getReferenceData()['weekday']
+
+    if weekday not in weekday_ids:
+        raise WeekdayNotFoundException(f"Weekday '{weekday}' was not found")
+
+    return weekday_ids[weekday]
+
+def getWeekday(weekday_id):
+    return getReferenceData()['weekday_by_id'].get(weekday_id)
@@ -0,0 +1,110 @@
+import functools
+import hashlib
+import threading
+
+import redis
+from flask import Response, request
+
+from globals import RESPONSE_CACHE_MAX_AGE, RESPONSE_CACHE_TTL, log
+from helpers.Database import bump_version, get_key_value_cache, get_version, register_key_value_cache
+from helpers.Metrics import count_cache_event
+
+CATALOG_VERSION_PREFIX = 'catalog_version:'
+RESPONSE_CACHE_PREFIX = 'response:'
+
+response_cache_mutex = threading.Lock()
+
+response_cache_metrics = {
+    'hits': 0,
+    'misses': 0,
+    'not_modified': 0,
+    'invalidations': 0,
+    'redis_errors': 0,
+}
+
+def catalog_version_key(local_id):
+    return f"{CATALOG_VERSION_PREFIX}{local_id}"
+
+def response_cache_key(local_id, version):
+    return f"{RESPONSE_CACHE_PREFIX}{local_id}:{version}:{request.full_path}"
+
+def count(metric, value = 1):
+    with response_cache_mutex:
+        response_cache_metrics[metric] += value
+
+    count_cache_event('response', metric, value)
+
+def make_etag(body):
+    return hashlib.sha256(body).hexdigest()[:32]
+
+def cached_response(f):
+    """
+    Caches the 200 responses of a public GET of the local `local_id`.
+
+    The body and its strong ETag are stored in Redis under the catalog version of the local, so a
+    repeated request skips the queries and the serialization, and a request with a matching
+    If-None-Match gets a 304. invalidate_catalog bumps the version after any write to the local,
+    its services, workers, work groups or timetable.
+    """
+
+    @functools.wraps(f)
+    def decorated_function(*args, **kwargs):
+
+        try:
+            key = response_cache_key(kwargs['local_id'], get_version(catalog_version_key(kwargs['local_id'])))
+            cached = get_key_value_cache(key)
+        except redis.RedisError as e:
+            log('Could not read the response cache.', level='WARNING', error=e)
+            count('redis_errors')
+            return f(*args, **kwargs)
+
+        if cached is not None:
+            etag, body = (cached.decode() if isinstance(cached, bytes) else cached).split('\n', 1)
+            body = body.encode()
+            count('hits')
+        else:
+            response = f(*args, **kwargs)
+
+            if not isinstance(response, Response) or response.status_code != 200:
+                return response
+
+            body = response.get_data()
+            etag = make_etag(body)
+            count('misses')
+
+            try:
+                register_key_value_cache(key, f"{etag}\n{body.decode()}", exp=RESPONSE_CACHE_TTL)
+            except redis.RedisError as e:
+                log('Could not write the response cache.', level='WARNING', error=e)
+                count('redis_errors')
+
+        if etag in request.if_none_match:
+            count('not_modified')
+            response = Response(status=304)
+        else:
+            response = Response(body, status=200, mimetype='application/json')
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = f"public, max-age={RESPONSE_CACHE_MAX_AGE}"
+
+        return response
+
+    return decorated_function
+
+def invalidate_catalog(local_id):
+    """
+    Bumps the catalog version of the local. Must be called after committing a change of the local,
+    its services, workers, work groups or timetable.
+    """
+
+    count('invalidations')
+
+    try:
+        bump_version(catalog_version_key(local_id))
+    except redis.RedisError as e:
+        log('Could not bump the catalog version.', level='WARNING', error=e)
+        count('redis_errors')
+
+def get_response_cache_metrics():
+    with response_cache_mutex:
+        return dict(response_cache_metrics)
@@ -0,0 +1,182 @@
+import datetime
+import json
+import threading
+import time
+
+import redis
+from sqlalchemy import select
+
+from db import db
+from globals import SCHEDULE_CACHE_TTL, WEEK_DAYS, log
+from helpers.Database import bump_version, get_key_value_cache, get_version, register_key_value_cache
+from helpers.DatetimeHelper import awareToNaive
+from helpers.Metrics import count_cache_event
+from helpers.ReferenceData import getWeekday
+from models.closed import ClosedModel
+from models.timetable import TimetableModel
+
+SCHEDULE_VERSION_PREFIX = 'schedule_version:'
+SCHEDULE_CACHE_PREFIX = 'schedule:'
+
+local_schedules = {}
+local_schedules_mutex = threading.Lock()
+
+schedule_cache_metrics = {
+    'local_hits': 0,
+    'redis_hits': 0,
+    'misses': 0,
+    'invalidations': 0,
+    'redis_errors': 0,
+}
+
+def schedule_version_key(local_id):
+    return f"{SCHEDULE_VERSION_PREFIX}{local_id}"
+
+def schedule_cache_key(local_id, version):
+    return f"{SCHEDULE_CACHE_PREFIX}{local_id}:{version}"
+
+def count(metric, value = 1):
+    with local_schedules_mutex:
+        schedule_cache_metrics[metric] += value
+
+    count_cache_event('schedule', metric, value)
+
+def load_schedule(local_id):
+    """
+    Timetable of the local as {weekday_short: [(opening_time, closing_time), ...]} sorted by
+    opening time, and the closed days that have not ended yet as sorted (init, end) datetimes.
+    """
+
+    timetable = {}
+
+    rows = db.session.execute(
+        select(TimetableModel.weekday_id, TimetableModel.opening_time, TimetableModel.closing_time)
+        .where(TimetableModel.local_id == local_id)
+        .order_by(TimetableModel.opening_time)
+    )
+
+    for weekday_id, opening_time, closing_time in rows:
+        timetable.setdefault(getWeekday(weekday_id), []).append((opening_time, closing_time))
+
+    closed = db.session.execute(
+        select(ClosedModel.datetime_init, ClosedModel.datetime_end)
+        .where(ClosedModel.local_id == local_id, ClosedModel.datetime_end > datetime.datetime.now())
+        .order_by(ClosedModel.datetime_init)
+    ).all()
+
+    return {'timetable': timetable, 'closed': [tuple(c) for c in closed]}
+
+def dump_schedule(schedule):
+    return json.dumps({
+        'timetable': {weekday: [[o.isoformat(), c.isoformat()] for o, c in intervals] for weekday, intervals in schedule['timetable'].items()},
+        'closed': [[i.isoformat(), e.isoformat()] for i, e in schedule['closed']],
+    })
+
+def parse_schedule(value):
+    value = json.loads(value)
+
+    return {
+        'timetable': {weekday: [(datetime.time.fromisoformat(o), datetime.time.fromisoformat(c)) for o, c in intervals] for weekday, intervals in value['timetable'].items()},
+        'closed': [(datetime.datetime.fromisoformat(i), datetime.datetime.fromisoformat(e)) for i, e in value['closed']],
+    }
+
+def get_schedule(local_id):
+    """
+    Timetable and closed days of the local (see load_schedule). The result is shared, do not modify it.
+
+    Every read checks the version of the local in Redis, which is bumped by invalidate_schedule, so all
+    the API processes and Celery workers stop using a schedule as soon as it changes. The schedule of
+    the current version is kept in memory and in Redis for SCHEDULE_CACHE_TTL seconds.
+    """
+
+    try:
+        version = get_version(schedule_version_key(local_id))
+    except redis.RedisError as e:
+        log('Could not read the schedule version.', level='WARNING', error=e)
+        count('redis_errors')
+        return load_schedule(local_id)
+
+    with local_schedules_mutex:
+        cached = local_schedules.get(local_id)
+
+    if cached and cached[0] == version and cached[2] > time.monotonic():
+        count('local_hits')
+        return cached[1]
+
+    try:
+        value = get_key_value_cache(schedule_cache_key(local_id, version))
+    except redis.RedisError as e:
+        log('Could not read the schedule cache.', level='WARNING', error=e)
+        count('redis_errors')
+        value = None
+
+    if value is not None:
+        schedule = parse_schedule(value)
+        count('redis_hits')
+    else:
+        schedule = load_schedule(local_id)
+        count('misses')
+
+        try:
+            register_key_value_cache(schedule_cache_key(local_id, version), dump_schedule(schedule), exp=SCHEDULE_CACHE_TTL)
+        except redis.RedisError as e:
+            log('Could not write the schedule cache.', level='WARNING', error=e)
+            count('redis_errors')
+
+    with local_schedules_mutex:
+        local_schedules[local_id] = (version, schedule, time.monotonic() + SCHEDULE_CACHE_TTL)
+
+    return schedule
+
+def invalidate_schedule(local_id):
+    """
+    Bumps the schedule version of the local. Must be called after committing a change of its
+    timetable or closed days.
+    """
+
+    with local_schedules_mutex:
+        local_schedules.pop(local_id, None)
+
+    count('invalidations')
+
+    try:
+        bump_version(schedule_version_key(local_id))
+    except redis.RedisError as e:
+        log('Could not bump the schedule version.', level='WARNING', error=e)
+        count('redis_errors')
+
+def clear_local_schedules():
+    with local_schedules_mutex:
+        local_schedules.clear()
+
+def get_schedule_cache_metrics():
+    with local_schedules_mutex:
+        metrics = dict(schedule_cache_metrics)
+        metrics['size'] = len(local_schedules)
+
+    return metrics
+
+def is_open(schedule, datetime_init, datetime_end):
+    """
+    Whether [datetime_init, datetime_end] is inside one opening interval of its weekday.
+    """
+
+    return any(opening_time <= datetime_init.time() and closing_time >= datetime_end.time()
+               for opening_time, closing_time in schedule['timetable'].get(WEEK_DAYS[datetime_init.weekday()], []))
+
+def is_closed(schedule, datetime_init, datetime_end):
+    """
+    Whether a closed day overlaps [datetime_init, datetime_end], the same way getClosedDays does.
+    """
+
+    datetime_init, datetime_end = awareToNaive(datetime_init), awareToNaive(datetime_end)
+
+    for closed_init, closed_end in schedule['closed']:
+
+        if closed_init > datetime_end:
+            return False
+
+        if closed_end >= datetime_init:
+            return True
+
+    return False
@@ -0,0 +1,207 @@
+from contextlib import contextmanager
+import os
+import smtplib
+import threading
+import time
+
+from globals import SMTP_POOL_IDLE_TIMEOUT, SMTP_POOL_NOOP_INTERVAL, SMTP_POOL_SIZE, SMTP_TIMEOUT
+from helpers.error.EmailError.SmtpPoolExhaustedException import SmtpPoolExhaustedException
+from helpers.Metrics import count_smtp_event
+
+# Errors after which the connection can not be reused.
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPHeloError, OSError)
+
+smtp_pools = {}
+smtp_pools_mutex = threading.Lock()
+
+class SmtpPool():
+    """
+    Authenticated SMTP connections of one account, reused between messages.
+    Idle connections are checked with NOOP before being reused and at most
+    `max_connections` are open at the same time.
+    """
+
+    def __init__(self, host, port, user, password, starttls = True, max_connections = SMTP_POOL_SIZE, idle_timeout = SMTP_POOL_IDLE_TIMEOUT, noop_interval = SMTP_POOL_NOOP_INTERVAL, timeout = SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.idle_timeout = idle_timeout
+        self.noop_interval = noop_interval
+        self.timeout = timeout
+
+        self.idle = []
+        self.mutex = threading.Lock()
+        self.semaphore = threading.BoundedSemaphore(max_connections)
+
+        self.metrics = {
+            'hits': 0,
+            'misses': 0,
+            'reconnects': 0,
+            'discarded': 0,
+            'sent': 0,
+            'errors': 0,
+        }
+
+    def count(self, metric, value = 1):
+        with self.mutex:
+            self.metrics[metric] += value
+
+        count_smtp_event(self.host, metric, value)
+
+    def connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+
+        try:
+            if self.starttls: server.starttls()
+            server.login(self.user, self.password)
+        except Exception:
+            close_connection(server)
+            raise
+
+        self.count('misses')
+
+        return server
+
+    def is_alive(self, server, last_used):
+
+        if time.monotonic() - last_used < self.noop_interval:
+            return True
+
+        try:
+            return server.noop()[0] == 250
+        except CONNECTION_ERRORS + (smtplib.SMTPException,):
+            return False
+
+    def checkout(self):
+
+        while True:
+
+            with self.mutex:
+                if not self.idle: break
+                server, last_used = self.idle.pop()
+
+            if time.monotonic() - last_used < self.idle_timeout and self.is_alive(server, last_used):
+                self.count('hits')
+                return server
+
+            self.count('discarded')
+            close_connection(server)
+
+        return self.connect()
+
+    def checkin(self, server):
+        with self.mutex:
+            self.idle.append((server, time.monotonic()))
+
+    @contextmanager
+    def connection(self, timeout = None):
+
+        if not self.semaphore.acquire(timeout=self.timeout if timeout is None else timeout):
+            raise SmtpPoolExhaustedException(f'All the SMTP connections of {self.user}@{self.host}:{self.port} are busy.')
+
+        try:
+            server = self.checkout()
+
+            try:
+                yield server
+            except CONNECTION_ERRORS:
+                close_connection(server)
+                raise
+            except Exception:
+                # The connection is still usable after a refused message.
+                self.checkin(server)
+                raise
+
+            self.checkin(server)
+        finally:
+            self.semaphore.release()
+
+    def sendmail(self, from_addr, to_addrs, msg):
+
+        try:
+            try:
+                with self.connection() as server:
+                    return self.send(server, from_addr, to_addrs, msg)
+            except CONNECTION_ERRORS:
+                # The server dropped the connection since it was checked:
+                # try once more with a new one.
+                self.count('reconnects')
+
+            with self.connection() as server:
+                return self.send(server, from_addr, to_addrs, msg)
+        except Exception:
+            self.count('errors')
+            raise
+
+    def send(self, server, from_addr, to_addrs, msg):
+        refused = server.sendmail(from_addr, to_addrs, msg)
+        self.count('sent')
+        return refused
+
+    def close(self):
+        with self.mutex:
+            idle, self.idle = self.idle, []
+
+        for server, _ in idle:
+            close_connection(server)
+
+def close_connection(server):
+    try:
+        server.quit()
+    except Exception:
+        server.close()
+
+def get_smtp_pool(host, port, user, password) -> SmtpPool:
+    key = (host, int(port), user, password)
+
+    with smtp_pools_mutex:
+        pool = smtp_pools.get(key)
+
+        if pool is None:
+            pool = smtp_pools[key] = SmtpPool(host, int(port), user, password)
+
+    return pool
+
+def get_smtp_pool_metrics():
+    with smtp_pools_mutex:
+        pools = list(smtp_pools.values())
+
+    return {f'{pool.user}@{pool.host}:{pool.port}': {**pool.metrics, 'idle': len(pool.idle)} for pool in pools}
+
+def get_smtp_idle_connections():
+    """
+    Idle connections by SMTP host, without the accounts.
+    """
+
+    with smtp_pools_mutex:
+        pools = list(smtp_pools.values())
+
+    idle = {}
+
+    for pool in pools:
+        idle[pool.host] = idle.get(pool.host, 0) + len(pool.idle)
+
+    return idle
+
+def close_smtp_pools():
+    with smtp_pools_mutex:
+        pools = list(smtp_pools.values())
+        smtp_pools.clear()
+
+    for pool in pools:
+        pool.close()
+
+def reset_smtp_pools():
+    """
+    Forgets the connections inherited from the parent process without closing them,
+    because the sockets are still used by the parent.
+    """
+    global smtp_pools_mutex
+
+    smtp_pools_mutex = threading.Lock()
+    smtp_pools.clear()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_smtp_pools)
@@ -0,0 +1,156 @@
+from collections import OrderedDict
+import json
+import threading
+import time
+
+import redis
+
+from globals import TOKEN_CACHE_LOCAL_TTL, TOKEN_CACHE_NEGATIVE_TTL, TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL, log
+from helpers.Database import get_key_value_cache, register_key_value_cache
+from helpers.Metrics import count_cache_event
+from models.session_token import SessionTokenModel
+
+# Also used by access.py, which can not import the app helpers.
+TOKEN_CACHE_PREFIX = 'session_token:'
+
+# Value of unknown and revoked tokens.
+TOKEN_CACHE_REVOKED = json.dumps(None)
+
+local_tokens = OrderedDict()
+local_tokens_mutex = threading.Lock()
+
+token_cache_metrics = {
+    'local_hits': 0,
+    'redis_hits': 0,
+    'negative_hits': 0,
+    'misses': 0,
+    'invalidations': 0,
+    'redis_errors': 0,
+}
+
+def token_cache_key(token_id):
+    return f"{TOKEN_CACHE_PREFIX}{token_id}"
+
+def count(metric, value = 1):
+    with local_tokens_mutex:
+        token_cache_metrics[metric] += value
+
+    count_cache_event('token', metric, value)
+
+def get_local_token(token_id):
+    with local_tokens_mutex:
+        cached = local_tokens.get(token_id)
+
+        if cached is None:
+            return False, None
+
+        if cached[1] < time.monotonic():
+            local_tokens.pop(token_id)
+            return False, None
+
+        local_tokens.move_to_end(token_id)
+
+        return True, cached[0]
+
+def set_local_token(token_id, value, ttl):
+    with local_tokens_mutex:
+        local_tokens[token_id] = (value, time.monotonic() + min(ttl, TOKEN_CACHE_LOCAL_TTL))
+        local_tokens.move_to_end(token_id)
+
+        while len(local_tokens) > TOKEN_CACHE_SIZE:
+            local_tokens.popitem(last=False)
+
+def get_session_token(token_id, exp = None):
+    """
+    Returns {'jti', 'local_id'} of the session token, or None if it does not exist.
+
+    The lookup goes through the LRU of the process, then Redis and finally the database.
+    Known tokens are stored in Redis for TOKEN_CACHE_TTL seconds (never past `exp`, the
+    timestamp of the JWT) and only if no revocation was written meanwhile; unknown ids for
+    TOKEN_CACHE_NEGATIVE_TTL seconds. The LRU keeps them at most TOKEN_CACHE_LOCAL_TTL seconds,
+    which bounds how long other processes may accept a revoked token.
+    """
+
+    found, value = get_local_token(token_id)
+
+    if found:
+        count('local_hits' if value else 'negative_hits')
+        return value
+
+    ttl = max(1, min(TOKEN_CACHE_TTL, int(exp - time.time()))) if exp else TOKEN_CACHE_NEGATIVE_TTL
+
+    try:
+        cached = get_key_value_cache(token_cache_key(token_id))
+    except redis.RedisError as e:
+        log('Could not read the session token cache.', level='WARNING', error=e)
+        count('redis_errors')
+        cached = None
+
+    if cached is not None:
+        value = json.loads(cached)
+        count('redis_hits' if value else 'negative_hits')
+        set_local_token(token_id, value, ttl if value else TOKEN_CACHE_NEGATIVE_TTL)
+        return value
+
+    count('misses')
+
+    session_token = SessionTokenModel.query.get(token_id)
+
+    value = {'jti': session_token.jti, 'local_id': session_token.local_id} if session_token else None
+
+    if not value:
+        ttl = TOKEN_CACHE_NEGATIVE_TTL
+
+    try:
+        # A token revoked after the query above already left its tombstone: it must not be replaced.
+        if not register_key_value_cache(token_cache_key(token_id), json.dumps(value), exp=ttl, nx=True):
+            cached = get_key_value_cache(token_cache_key(token_id))
+
+            if cached is not None:
+                value = json.loads(cached)
+                ttl = ttl if value else TOKEN_CACHE_NEGATIVE_TTL
+    except redis.RedisError as e:
+        log('Could not write the session token cache.', level='WARNING', error=e)
+        count('redis_errors')
+
+    set_local_token(token_id, value, ttl)
+
+    return value
+
+def invalidate_session_tokens(*token_ids):
+    """
+    Marks the tokens as revoked in the cache. Must be called after deleting them.
+
+    The tombstone outlives any valid entry another process may still be writing (TOKEN_CACHE_TTL).
+    If Redis can not be reached the entries of the other processes expire after TOKEN_CACHE_TTL.
+    """
+
+    with local_tokens_mutex:
+        for token_id in token_ids:
+            local_tokens.pop(token_id, None)
+
+        token_cache_metrics['invalidations'] += len(token_ids)
+
+    count_cache_event('token', 'invalidations', len(token_ids))
+
+    for token_id in token_ids:
+        try:
+            register_key_value_cache(token_cache_key(token_id), TOKEN_CACHE_REVOKED, exp=TOKEN_CACHE_TTL)
+        except redis.RedisError as e:
+            log('Could not revoke the token in the session token cache. It may be accepted for %s seconds.', TOKEN_CACHE_TTL, level='ERROR', error=e)
+            count('redis_errors')
+
+def clear_local_session_tokens():
+    with local_tokens_mutex:
+        local_tokens.clear()
+
+def get_token_cache_metrics():
+    with local_tokens_mutex:
+        metrics = dict(token_cache_metrics)
+
+    lookups = metrics['local_hits'] + metrics['redis_hits'] + metrics['negative_hits'] + metrics['misses']
+
+    metrics['size'] = len(local_tokens)
+    metrics['hit_rate'] = (lookups - metrics['misses']) / lookups if lookups else 0.0
+
+    return metrics
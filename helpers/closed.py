@@ -1,45 +1,64 @@
-
-from db import deleteAndCommit, rollback
-from helpers.DatetimeHelper import isAware, naiveToAware
+from db import db, rollback
+from globals import log
+from helpers.DatetimeHelper import awareToNaive
 from helpers.error.ClosedDaysError.BadDatetimesClosedDaysException import BadDatetimesClosedDaysException
 from helpers.error.ClosedDaysError.ConflictClosedDaysException import ConflictClosedDaysException
 from models.closed import ClosedModel
+from sqlalchemy import delete, select
+from sqlalchemy.exc import SQLAlchemyError
 import datetime
 
-def getClosedDays(localId, datetime_init = None, datetime_end = None):
-    closedDays = ClosedModel.query.filter_by(local_id=localId).all()
-        
-    for closedDay in closedDays:
-        if closedDay.datetime_end < datetime.datetime.now():
-            try:
-                deleteAndCommit(closedDay)
-                closedDays.remove(closedDay)
-            except:
-                rollback()
+def getClosedDaysQuery(localId, datetime_init = None, datetime_end = None):
+    """
+    Closed days of the local that have not ended yet and overlap [datetime_init, datetime_end].
+    Aware datetimes are compared in the default location, as they are stored.
+    """
+    
+    query = ClosedModel.query.filter(ClosedModel.local_id == localId, ClosedModel.datetime_end >= datetime.datetime.now())
     
     if datetime_init:
-        if not isAware(datetime_init):
-            datetime_init = naiveToAware(datetime_init)
-        closedDays = [closedDay for closedDay in closedDays if naiveToAware(closedDay.datetime_end )>= datetime_init]
+        query = query.filter(ClosedModel.datetime_end >= awareToNaive(datetime_init))
         
     if datetime_end:
-        if not isAware(datetime_end):
-            datetime_end = naiveToAware(datetime_end)
-        closedDays = [closedDay for closedDay in closedDays if naiveToAware(closedDay.datetime_init) <= datetime_end]
+        query = query.filter(ClosedModel.datetime_init <= awareToNaive(datetime_end))
         
-    return closedDays
+    return query.order_by(ClosedModel.datetime_init)
+
+def getClosedDays(localId, datetime_init = None, datetime_end = None):
+    return getClosedDaysQuery(localId, datetime_init, datetime_end).all()
 
 def checkClosedDay(localId, datetime_init, datetime_end, closedDayId = None):
     
     if datetime_init >= datetime_end:
         raise BadDatetimesClosedDaysException('La fecha de inicio debe ser menor a la fecha de fin.')
-        
-    closedDays = getClosedDays(localId)
     
-    for closedDay in closedDays:
-        if closedDayId and closedDay.id == closedDayId:
-            continue
-        if closedDay.datetime_init <= datetime_init < closedDay.datetime_end or closedDay.datetime_init < datetime_end <= closedDay.datetime_end:
-            raise ConflictClosedDaysException('La fecha de cierre se cruza con otra fecha de cierre.')
+    query = getClosedDaysQuery(localId).filter(ClosedModel.datetime_init < awareToNaive(datetime_end), ClosedModel.datetime_end > awareToNaive(datetime_init))
+    
+    if closedDayId:
+        query = query.filter(ClosedModel.id != closedDayId)
+    
+    if db.session.execute(select(query.exists())).scalar():
+        raise ConflictClosedDaysException('La fecha de cierre se cruza con otra fecha de cierre.')
             
-    return True
\ No newline at end of file
+    return True
+
+def purgeClosedDays(_uuid = None):
+    """
+    Deletes the closed days that already ended, in one statement.
+    """
+    
+    try:
+        result = db.session.execute(
+            delete(ClosedModel)
+            .where(ClosedModel.datetime_end < datetime.datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    except SQLAlchemyError as e:
+        rollback()
+        log("Error purging the closed days", uuid=_uuid, level="ERROR", error=e)
+        raise e
+    
+    log(f"Closed days: {result.rowcount} purged", uuid=_uuid)
+    
+    return result.rowcount
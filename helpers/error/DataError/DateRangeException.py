@@ -0,0 +1,4 @@
+class DateRangeException(Exception):
+    def __init__(self, message='The date range is not valid.'):
+        self.message = message
+        super().__init__(self.message)
@@ -0,0 +1,4 @@
+class SmtpPoolExhaustedException(Exception):
+    def __init__(self, message='All the SMTP connections of the account are busy.'):
+        self.message = message
+        super().__init__(self.message)
\ No newline at end of file
@@ -2,8 +2,6 @@
 import os
 import shutil
 
-from dotenv import load_dotenv
-
 from globals import ALLOWED_EXTENSIONS, IMAGE_TYPE_GALLERY, IMAGE_TYPE_LOGOS, IMAGES_FOLDER, PAGES_FOLDER, log
 
 
@@ -19,8 +17,6 @@ def checkAndCreatePath(*path):
     return absolute_path
 
 def createPathFromLocal(local_id, _uuid = None):
-    
-    load_dotenv()
 
     PUBLIC_FOLDER = os.getenv('PUBLIC_FOLDER', None)
     p = checkAndCreatePath(PUBLIC_FOLDER, local_id, IMAGES_FOLDER, IMAGE_TYPE_LOGOS)
@@ -40,8 +36,6 @@ def generatePagePath(filename):
     return os.path.join(PAGES_FOLDER, filename).replace('\\', '/')
 
 def saveFile(file, path, local_id, update_if_conflict = False):
-    
-    load_dotenv()
 
     PUBLIC_FOLDER = os.getenv('PUBLIC_FOLDER', None)
     
@@ -57,8 +51,6 @@ def saveFile(file, path, local_id, update_if_conflict = False):
     file.save(os.path.join(absolute_path, PUBLIC_FOLDER, local_id, path))
     
 def removeFile(local_id, path):
-    
-    load_dotenv()
 
     PUBLIC_FOLDER = os.getenv('PUBLIC_FOLDER', None)
     
@@ -66,22 +58,10 @@ def removeFile(local_id, path):
     
     os.remove(path)
     
-def getFile(local_id, path):
-    
-    load_dotenv()
-
-    PUBLIC_FOLDER = os.getenv('PUBLIC_FOLDER', None)
+def getFilePath(local_id, path):
+    return os.path.join(os.getcwd(), os.getenv('PUBLIC_FOLDER', None), local_id, path)
     
-    path = os.path.join(os.getcwd(), PUBLIC_FOLDER, local_id, path)
-    
-    with open(path, 'rb') as f:
-        file = f.read()
-        
-        return file
-       
 def removePath(local_id) -> str:
-    
-    load_dotenv()
 
     PUBLIC_FOLDER = os.getenv('PUBLIC_FOLDER', None)
     
@@ -12,6 +12,7 @@ from cryptography.fernet import Fernet
 
 from globals import ADMIN_IDENTITY, ADMIN_ROLE, CRYPTO_KEY, DEFAULT_CRYPTO_JWT, JWT_ALGORITHM, LOCAL_ROLE, PASSWORD_SIZE, EXPIRE_TOKEN, EXPIRE_ACCESS, SECRET_JWT
 
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended import create_access_token, create_refresh_token, decode_token
 
@@ -21,6 +22,7 @@ from helpers.error.SecurityError.AdminTokenRoleException import AdminTokenRoleEx
 from helpers.error.SecurityError.AdminTokenIdentityException import AdminTokenIdentityException
 from helpers.error.SecurityError.NoTokenProvidedException import NoTokenProvidedException
 from helpers.error.SecurityError.TokenNotFound import TokenNotFoundException
+from helpers.TokenCache import invalidate_session_tokens
 from models.session_token import SessionTokenModel
 from models.user_session import UserSessionModel
 
@@ -72,9 +74,13 @@ def generateUUID():
 
 def logOutAll(local_id):
     
+    tokens_ids = db.session.execute(select(SessionTokenModel.id).where(SessionTokenModel.local_id == local_id)).scalars().all()
+    
     SessionTokenModel.query.filter(SessionTokenModel.local_id == local_id).delete()
     db.session.commit()
     
+    invalidate_session_tokens(*tokens_ids)
+    
 def encrypt_str(txt, key = CRYPTO_KEY):
     cipher_suite = Fernet(key)
     return cipher_suite.encrypt(txt.encode())
@@ -0,0 +1,61 @@
+"""booking local and work group columns
+
+Revision ID: 3f1c2a9d7b10
+Revises:
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('local_id', sa.String(length=32), nullable=True))
+        batch_op.add_column(sa.Column('work_group_id', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_booking_local_id', ['local_id'], unique=False)
+        batch_op.create_index('ix_booking_work_group_id', ['work_group_id'], unique=False)
+        batch_op.create_foreign_key('fk_booking_local_id', 'local', ['local_id'], ['id'], ondelete='SET NULL')
+        batch_op.create_foreign_key('fk_booking_work_group_id', 'work_group', ['work_group_id'], ['id'], ondelete='SET NULL')
+
+    # The work group of a booking is the one of its services; bookings without
+    # services fall back to the first work group of the worker.
+    op.execute("""
+        UPDATE booking SET work_group_id = (
+            SELECT MIN(service.work_group_id) FROM service_booking
+            JOIN service ON service.id = service_booking.service_id
+            WHERE service_booking.booking_id = booking.id
+        )
+    """)
+
+    op.execute("""
+        UPDATE booking SET work_group_id = (
+            SELECT MIN(work_group_worker.work_group_id) FROM work_group_worker
+            WHERE work_group_worker.worker_id = booking.worker_id
+        )
+        WHERE work_group_id IS NULL
+    """)
+
+    op.execute("""
+        UPDATE booking SET local_id = (
+            SELECT work_group.local_id FROM work_group
+            WHERE work_group.id = booking.work_group_id
+        )
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_booking_work_group_id', type_='foreignkey')
+        batch_op.drop_constraint('fk_booking_local_id', type_='foreignkey')
+        batch_op.drop_index('ix_booking_work_group_id')
+        batch_op.drop_index('ix_booking_local_id')
+        batch_op.drop_column('work_group_id')
+        batch_op.drop_column('local_id')
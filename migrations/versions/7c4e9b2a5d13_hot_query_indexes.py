@@ -0,0 +1,55 @@
+"""composite indexes for the booking hot queries
+
+Revision ID: 7c4e9b2a5d13
+Revises: 3f1c2a9d7b10
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c4e9b2a5d13'
+down_revision = '3f1c2a9d7b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Overlap checks of a worker or a local: "datetime_end > ? AND datetime_init < ?".
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.create_index('ix_booking_worker_datetime', ['worker_id', 'datetime_end', 'datetime_init', 'status_id'], unique=False)
+        batch_op.create_index('ix_booking_local_datetime', ['local_id', 'datetime_end', 'datetime_init', 'status_id'], unique=False)
+        batch_op.create_index('ix_booking_status_datetime_end', ['status_id', 'datetime_end'], unique=False)
+
+    with op.batch_alter_table('closed', schema=None) as batch_op:
+        batch_op.create_index('ix_closed_local_datetime', ['local_id', 'datetime_end', 'datetime_init'], unique=False)
+
+    with op.batch_alter_table('timetable', schema=None) as batch_op:
+        batch_op.create_index('ix_timetable_local_weekday', ['local_id', 'weekday_id', 'opening_time'], unique=False)
+
+    with op.batch_alter_table('file', schema=None) as batch_op:
+        batch_op.create_index('ix_file_local_path', ['local_id', 'path'], unique=False)
+
+    with op.batch_alter_table('work_group_worker', schema=None) as batch_op:
+        batch_op.create_index('ix_work_group_worker_worker', ['worker_id', 'work_group_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('work_group_worker', schema=None) as batch_op:
+        batch_op.drop_index('ix_work_group_worker_worker')
+
+    with op.batch_alter_table('file', schema=None) as batch_op:
+        batch_op.drop_index('ix_file_local_path')
+
+    with op.batch_alter_table('timetable', schema=None) as batch_op:
+        batch_op.drop_index('ix_timetable_local_weekday')
+
+    with op.batch_alter_table('closed', schema=None) as batch_op:
+        batch_op.drop_index('ix_closed_local_datetime')
+
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.drop_index('ix_booking_status_datetime_end')
+        batch_op.drop_index('ix_booking_local_datetime')
+        batch_op.drop_index('ix_booking_worker_datetime')
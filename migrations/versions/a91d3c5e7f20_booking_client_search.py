@@ -0,0 +1,105 @@
+"""booking client search columns and grams
+
+Revision ID: a91d3c5e7f20
+Revises: 7c4e9b2a5d13
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from helpers.ClientSearch import CLIENT_SEARCH_FIELDS, searchGrams
+
+
+# revision identifiers, used by Alembic.
+revision = 'a91d3c5e7f20'
+down_revision = '7c4e9b2a5d13'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def upgrade():
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('client_name_search', sa.String(length=90), nullable=True))
+        batch_op.add_column(sa.Column('client_tlf_search', sa.String(length=13), nullable=True))
+        batch_op.add_column(sa.Column('client_email_search', sa.String(length=70), nullable=True))
+
+    op.create_table('booking_search_gram',
+        sa.Column('booking_id', sa.Integer(), nullable=False),
+        sa.Column('field', sa.String(length=1), nullable=False),
+        sa.Column('gram', sa.String(length=3), nullable=False),
+        sa.Column('local_id', sa.String(length=32), nullable=True),
+        sa.ForeignKeyConstraint(['booking_id'], ['booking.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('booking_id', 'field', 'gram')
+    )
+
+    backfill()
+
+    # Created after the backfill, so the rows are not indexed one by one.
+    with op.batch_alter_table('booking_search_gram', schema=None) as batch_op:
+        batch_op.create_index('ix_booking_search_gram_lookup', ['local_id', 'field', 'gram', 'booking_id'], unique=False)
+
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.create_index('ix_booking_local_client_name', ['local_id', 'client_name_search'], unique=False)
+        batch_op.create_index('ix_booking_local_client_tlf', ['local_id', 'client_tlf_search'], unique=False)
+        batch_op.create_index('ix_booking_local_client_email', ['local_id', 'client_email_search'], unique=False)
+
+
+def backfill():
+    # The normalization is done in Python, the same way the model does it.
+    connection = op.get_bind()
+
+    booking = sa.table('booking', sa.column('id', sa.Integer), sa.column('local_id', sa.String),
+                       *[sa.column(field, sa.String) for field in CLIENT_SEARCH_FIELDS],
+                       *[sa.column(search_column, sa.String) for _, search_column, _ in CLIENT_SEARCH_FIELDS.values()])
+    gram = sa.table('booking_search_gram', sa.column('booking_id', sa.Integer), sa.column('field', sa.String),
+                    sa.column('gram', sa.String), sa.column('local_id', sa.String))
+
+    last_id = 0
+
+    while True:
+        rows = connection.execute(
+            sa.select(booking.c.id, booking.c.local_id, *[booking.c[field] for field in CLIENT_SEARCH_FIELDS])
+            .where(booking.c.id > last_id)
+            .order_by(booking.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).mappings().all()
+
+        if not rows:
+            return
+
+        updates = []
+        grams = []
+
+        for row in rows:
+            update = {'b_id': row['id']}
+
+            for field, (code, search_column, normalize) in CLIENT_SEARCH_FIELDS.items():
+                value = normalize(row[field])
+                update[search_column] = value
+                grams += [{'booking_id': row['id'], 'field': code, 'gram': g, 'local_id': row['local_id']} for g in searchGrams(value)]
+
+            updates.append(update)
+
+        connection.execute(booking.update().where(booking.c.id == sa.bindparam('b_id')), updates)
+
+        if grams:
+            connection.execute(gram.insert(), grams)
+
+        last_id = rows[-1]['id']
+
+
+def downgrade():
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.drop_index('ix_booking_local_client_email')
+        batch_op.drop_index('ix_booking_local_client_tlf')
+        batch_op.drop_index('ix_booking_local_client_name')
+
+    op.drop_table('booking_search_gram')
+
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.drop_column('client_email_search')
+        batch_op.drop_column('client_tlf_search')
+        batch_op.drop_column('client_name_search')
@@ -0,0 +1,29 @@
+"""closed days index by start
+
+Revision ID: c52e8f1a9b34
+Revises: a91d3c5e7f20
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52e8f1a9b34'
+down_revision = 'a91d3c5e7f20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The ended closed days are purged, so the start bounds the range reads: "datetime_init <= ? AND datetime_end >= ?".
+    with op.batch_alter_table('closed', schema=None) as batch_op:
+        batch_op.drop_index('ix_closed_local_datetime')
+        batch_op.create_index('ix_closed_local_datetime', ['local_id', 'datetime_init', 'datetime_end'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('closed', schema=None) as batch_op:
+        batch_op.drop_index('ix_closed_local_datetime')
+        batch_op.create_index('ix_closed_local_datetime', ['local_id', 'datetime_end', 'datetime_init'], unique=False)
@@ -2,6 +2,7 @@ from models.local import LocalModel
 from models.service_booking import ServiceBookingModel
 from models.service import ServiceModel
 from models.booking import BookingModel
+from models.booking_search_gram import BookingSearchGramModel
 from models.user_session import UserSessionModel
 from models.session_token import SessionTokenModel
 from models.file import FileModel
@@ -1,11 +1,14 @@
 from datetime import timedelta
 from db import db
+from globals import CONFIRMED_STATUS, DONE_STATUS, PENDING_STATUS
+from helpers.DatetimeHelper import now
 
-from sqlalchemy.orm import column_property
+from helpers.ClientSearch import CLIENT_SEARCH_FIELDS, searchGrams
+from sqlalchemy.orm import column_property, validates
 from sqlalchemy import select, join, text
 
-from models.work_group import WorkGroupModel
-from models.work_group_worker import WorkGroupWorkerModel
+from models.booking_search_gram import BookingSearchGramModel
+from models.status import StatusModel
 from models.worker import WorkerModel
 
 class BookingModel(db.Model):
@@ -27,6 +30,11 @@ class BookingModel(db.Model):
     email_cancelled = db.Column(db.Boolean, nullable=False, default=False)
     email_updated = db.Column(db.Boolean, nullable=False, default=False)
     uuid_log = db.Column(db.String(36), nullable=True)
+    local_id = db.Column(db.String(32), db.ForeignKey('local.id', ondelete='SET NULL'), nullable=True, index=True)
+    work_group_id = db.Column(db.Integer, db.ForeignKey('work_group.id', ondelete='SET NULL'), nullable=True, index=True)
+    client_name_search = db.Column(db.String(90), nullable=True)
+    client_tlf_search = db.Column(db.String(13), nullable=True)
+    client_email_search = db.Column(db.String(70), nullable=True)
     
     status = db.relationship('StatusModel', back_populates='bookings')
     services = db.relationship(
@@ -36,24 +44,77 @@ class BookingModel(db.Model):
         overlaps="booking,service_bookings,service"
     )
     worker = db.relationship('WorkerModel', back_populates='bookings')
+    local = db.relationship('LocalModel')
+    search_grams = db.relationship('BookingSearchGramModel', cascade='all, delete-orphan')
+    
+    # Range filters go on datetime_end first: "datetime_end > ?" only walks the upcoming bookings.
+    __table_args__ = (
+        db.Index('ix_booking_worker_datetime', 'worker_id', 'datetime_end', 'datetime_init', 'status_id'),
+        db.Index('ix_booking_local_datetime', 'local_id', 'datetime_end', 'datetime_init', 'status_id'),
+        db.Index('ix_booking_status_datetime_end', 'status_id', 'datetime_end'),
+        db.Index('ix_booking_local_client_name', 'local_id', 'client_name_search'),
+        db.Index('ix_booking_local_client_tlf', 'local_id', 'client_tlf_search'),
+        db.Index('ix_booking_local_client_email', 'local_id', 'client_email_search'),
+    )
+    
+    @validates('client_name', 'client_tlf', 'client_email')
+    def validateClientField(self, key, value):
+        """
+        Keeps the search column and the grams of the field in sync with its value.
+        """
+        
+        code, search_column, normalize = CLIENT_SEARCH_FIELDS[key]
+        
+        search_value = normalize(value)
+        
+        if getattr(self, search_column) == search_value:
+            return value
+        
+        setattr(self, search_column, search_value)
+        
+        grams = searchGrams(search_value)
+        
+        self.search_grams = [gram for gram in self.search_grams if gram.field != code or gram.gram in grams]
+        
+        for gram in grams - set(gram.gram for gram in self.search_grams if gram.field == code):
+            self.search_grams.append(BookingSearchGramModel(field=code, gram=gram, local_id=self.local_id))
+        
+        return value
+    
+    @validates('local_id')
+    def validateLocalId(self, key, value):
+        
+        if value != self.local_id:
+            for gram in self.search_grams:
+                gram.local_id = value
+        
+        return value
     
     @property
-    def local_id(self):
-        
-        work_group_worker = db.session.query(WorkGroupWorkerModel).filter_by(worker_id=self.worker_id).first()
-        if work_group_worker:
-            work_group = db.session.query(WorkGroupModel).filter_by(id=work_group_worker.work_group_id).first()
-            if work_group:
-                return work_group.local_id
-        return None
+    def is_done(self):
+        
+        status = self.status.status
+        
+        if status == DONE_STATUS:
+            return True
+        
+        if status not in (PENDING_STATUS, CONFIRMED_STATUS) or not self.local:
+            return False
+        
+        return self.datetime_end < now(self.local.location).replace(tzinfo=None)
     
     @property
-    def work_group_id(self):
+    def current_status(self):
         
-        work_group_worker = db.session.query(WorkGroupWorkerModel).filter_by(worker_id=self.worker_id).first()
-        if work_group_worker:
-            return work_group_worker.work_group_id
-        return None
+        if self.status.status != DONE_STATUS and self.is_done:
+            from helpers.ReferenceData import getStatus
+            return getStatus(DONE_STATUS)
+        
+        return self.status
+    
+    def setWorkGroup(self, work_group):
+        self.work_group_id = work_group.id
+        self.local_id = work_group.local_id
     
     # @property
     # def datetime_end(self):
@@ -0,0 +1,11 @@
+from db import db
+
+class BookingSearchGramModel(db.Model):
+    __tablename__ = 'booking_search_gram'
+    
+    booking_id = db.Column(db.Integer, db.ForeignKey('booking.id', ondelete='CASCADE'), primary_key=True)
+    field = db.Column(db.String(1), primary_key=True)
+    gram = db.Column(db.String(3), primary_key=True)
+    local_id = db.Column(db.String(32), nullable=True)
+    
+    __table_args__ = (db.Index('ix_booking_search_gram_lookup', 'local_id', 'field', 'gram', 'booking_id'),)
@@ -12,6 +12,8 @@ class ClosedModel(db.Model):
      
      local = db.relationship('LocalModel', back_populates='closed')
      
+     __table_args__ = (db.Index('ix_closed_local_datetime', 'local_id', 'datetime_init', 'datetime_end'),)
+     
      def __str__(self):
          return f"{self.id} - {self.datetime_init} - {self.datetime_end}"
      
\ No newline at end of file
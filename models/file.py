@@ -11,4 +11,4 @@ class FileModel(db.Model):
     mimetype = db.Column(db.String(45), nullable=False)
     path = db.Column(db.String(300), nullable=False)
 
-    __table_args__ = (UniqueConstraint('name', 'local_id', 'path', name='name'),)    
+    __table_args__ = (UniqueConstraint('name', 'local_id', 'path', name='name'), db.Index('ix_file_local_path', 'local_id', 'path'))    
@@ -14,5 +14,7 @@ class TimetableModel(db.Model):
     local = db.relationship('LocalModel', back_populates='timetables')
     weekday = db.relationship('WeekdayModel', back_populates='timetables')
     
+    __table_args__ = (db.Index('ix_timetable_local_weekday', 'local_id', 'weekday_id', 'opening_time'),)
+    
     def __str__(self):
         return f"{self.id} - {self.opening_time} - {self.closing_time} - {self.weekday.weekday}"
\ No newline at end of file
@@ -19,6 +19,10 @@ class WorkGroupModel(db.Model):
     )
 
     services = db.relationship('ServiceModel', back_populates='work_group', lazy='dynamic')
+    
+    # Loadable versions of the dynamic relationships, for selectinload in the listings.
+    workers_list = db.relationship('WorkerModel', secondary='work_group_worker', viewonly=True, order_by='WorkerModel.id')
+    services_list = db.relationship('ServiceModel', viewonly=True, order_by='ServiceModel.id')
     local = db.relationship('LocalModel', back_populates='work_groups')
 
     __table_args__ = (UniqueConstraint('name', 'local_id', name='name'),)
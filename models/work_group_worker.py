@@ -5,4 +5,6 @@ class WorkGroupWorkerModel(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     work_group_id = db.Column(db.Integer, db.ForeignKey('work_group.id'), nullable=False)
-    worker_id = db.Column(db.Integer, db.ForeignKey('worker.id'), nullable=False)
\ No newline at end of file
+    worker_id = db.Column(db.Integer, db.ForeignKey('worker.id'), nullable=False)
+    
+    __table_args__ = (db.Index('ix_work_group_worker_worker', 'worker_id', 'work_group_id'),)
\ No newline at end of file
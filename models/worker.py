@@ -20,4 +20,7 @@ class WorkerModel(db.Model):
         lazy='dynamic'
     )
     
+    # Loadable version of work_groups, for selectinload in the listings.
+    work_groups_list = db.relationship('WorkGroupModel', secondary='work_group_worker', viewonly=True, order_by='WorkGroupModel.id')
+    
     
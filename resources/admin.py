@@ -1,10 +1,15 @@
 
-from flask import request
+from flask import Response, request
 import jwt
 from helpers.LocalController import getLocals
 
 from helpers.LoggingMiddleware import log_route
-from helpers.security import decodeJWT, generateTokens
+from helpers.Metrics import generate_metrics
+from helpers.error.SecurityError.AdminTokenIdentityException import AdminTokenIdentityException
+from helpers.error.SecurityError.AdminTokenRoleException import AdminTokenRoleException
+from helpers.error.SecurityError.NoTokenProvidedException import NoTokenProvidedException
+from helpers.error.SecurityError.TokenNotFound import TokenNotFoundException
+from helpers.security import check_admin_request, decodeJWT, generateTokens
 from flask_smorest import Blueprint, abort
 from flask.views import MethodView
 
@@ -107,4 +112,33 @@ class LocalAll(MethodView):
         locals = getLocals(params)
                 
         return {'locals': locals, 'total': len(locals)}
-        
\ No newline at end of file
+        
+
+@blp.route('metrics')
+class Metrics(MethodView):
+
+    @blp.response(404, description='El token administrativo no existe.')
+    @blp.response(403, description='No tienes permisos para usar este endpoint.')
+    @blp.response(401, description='Falta cabecera de autorización. El token ha expirado.')
+    @blp.response(200, description='Métricas en formato de texto de Prometheus.')
+    def get(self):
+        """
+        Devuelve las métricas de la API (latencia por endpoint y resultado de las reservas) de todos los procesos.
+        """
+
+        try:
+            check_admin_request(request)
+        except NoTokenProvidedException:
+            abort(401, message = 'Missing Authorization Header.')
+        except jwt.exceptions.ExpiredSignatureError:
+            abort(401, message = 'The token has expired.')
+        except jwt.exceptions.InvalidTokenError:
+            abort(401, message = 'Invalid token.')
+        except (AdminTokenIdentityException, AdminTokenRoleException):
+            abort(403, message = 'You are not allowed to use this endpoint.')
+        except TokenNotFoundException:
+            abort(404, message = 'The token does not exist.')
+
+        body, content_type = generate_metrics()
+
+        return Response(body, content_type=content_type)
@@ -1,20 +1,25 @@
 from datetime import datetime, timedelta
 import json
-from flask import request
+from flask import Response, request, stream_with_context
 from flask.views import MethodView
 from flask_smorest import Blueprint, abort
 from helpers.error.ClosedDaysError.ClosedDayException import ClosedDayException
 from jwt import ExpiredSignatureError
-from helpers.BookingController import calculatEndTimeBooking, calculateExpireBookingToken, cancelBooking, confirmBooking, createOrUpdateBooking, deserializeBooking, getBookings, getBookingBySession as getBookingBySessionHelper, unregisterBooking
-from helpers.BookingEmailController import send_cancelled_mail_async, send_confirmed_mail_async, send_updated_mail_async, start_waiter_booking_status
+from helpers.BookingController import calculatEndTimeBooking, calculateExpireBookingToken, cancelBooking, confirmBooking, createOrUpdateBooking, decodeBookingsCursor, deserializeBooking, getBookings, getBookingBySession as getBookingBySessionHelper, getBookingsPage, getFilteredBookingsQuery, iterBookingsPages, unregisterBooking
+from helpers.AvailabilityController import getAvailability
+from helpers.BookingEmailController import send_cancelled_mail_async, send_confirm_mail_async, send_confirmed_mail_async, send_confirmed_mails_batch_async, send_updated_mail_async, start_waiter_booking_status
+from helpers.BulkBookingController import createBookings
 from helpers.DataController import getDataRequest, getMonthDataRequest, getWeekDataRequest
 from helpers.DatetimeHelper import now
-from helpers.EmailController import send_confirm_booking_mail
+from helpers.EmailController import is_confirm_email_enabled
 from helpers.LoggingMiddleware import log_route
 from helpers.TimetableController import getTimetable
+from helpers.TokenCache import invalidate_session_tokens
+from helpers.ReferenceData import getStatus, getWeekdayId
 from helpers.error.BookingError.AlredyBookingException import AlredyBookingExceptionException
 from helpers.error.BookingError.BookingNotFoundError import BookingNotFoundException
 from helpers.error.BookingError.LocalUnavailableException import LocalUnavailableException
+from helpers.error.DataError.DateRangeException import DateRangeException
 from helpers.error.DataError.PastDateException import PastDateException
 from helpers.error.BookingError.WorkerUnavailable import WorkerUnavailableException
 from helpers.error.BookingError.WrongServiceWorkGroupException import WrongServiceWorkGroupException
@@ -33,9 +38,10 @@ from models.booking import BookingModel
 from db import addAndFlush, addAndCommit, commit, deleteAndCommit, deleteAndFlush, rollback
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy.exc import SQLAlchemyError, OperationalError
+from sqlalchemy.orm import selectinload
 import traceback
 
-from globals import ADMIN_IDENTITY, ADMIN_ROLE, CANCELLED_STATUS, DEBUG, CONFIRMED_STATUS, DONE_STATUS, PENDING_STATUS, SESSION_GET, STATUS_LIST_GET, USER_ROLE, WEEK_DAYS, WORK_GROUP_ID_GET, WORKER_ID_GET, log
+from globals import ADMIN_IDENTITY, ADMIN_ROLE, AVAILABILITY_INTERVAL, CANCELLED_STATUS, DEBUG, CONFIRMED_STATUS, DONE_STATUS, EMAIL_STATUS_PENDING, MAX_BOOKINGS_PAGE_SIZE, PENDING_STATUS, SESSION_GET, STATUS_LIST_GET, USER_ROLE, WEEK_DAYS, WORK_GROUP_ID_GET, WORKER_ID_GET, log
 from models.local import LocalModel
 from models.service import ServiceModel
 from models.service_booking import ServiceBookingModel
@@ -44,7 +50,7 @@ from models.status import StatusModel
 from models.timetable import TimetableModel
 from models.weekday import WeekdayModel
 from models.worker import WorkerModel
-from schema import BookingAdminListSchema, BookingAdminParams, BookingAdminPatchSchema, BookingAdminSchema, BookingAdminWeekParams, BookingListSchema, BookingParams, BookingPatchSchema, BookingSchema, BookingSessionParams, BookingWeekParams, CommentSchema, NewBookingSchema, NotifyParams, PublicBookingListSchema, PublicBookingSchema, StatusSchema, UpdateParams
+from schema import AvailabilityParams, AvailabilitySchema, BookingAdminListSchema, BookingAdminParams, BookingAdminPatchSchema, BookingAdminSchema, BookingAdminWeekParams, BookingListSchema, BookingParams, BookingPatchSchema, BookingSchema, BookingSessionParams, BookingWeekParams, BulkBookingListSchema, BulkBookingParams, BulkBookingSchema, CommentSchema, NewBookingSchema, NotifyParams, PublicBookingListSchema, PublicBookingSchema, StatusSchema, UpdateParams
 
 blp = Blueprint('booking', __name__, description='Control de reservas.')
 
@@ -85,6 +91,66 @@ def patchBooking(booking, booking_data, admin = False):
         
     return booking_deserialized
 
+def streamBookings(bookings_query, cursor = None):
+    
+    schema = BookingAdminSchema()
+    total = 0
+    
+    yield '{"bookings": ['
+    
+    for bookings in iterBookingsPages(bookings_query, cursor=cursor):
+        for booking in bookings:
+            yield (', ' if total else '') + json.dumps(schema.dump(booking))
+            total += 1
+    
+    yield f'], "total": {total}}}'
+
+def getBookingsList(datetime_init, datetime_end, params, _uuid = None):
+    """
+    Bookings of the local in the range with the filters of the request: all of them, one page
+    if `limit` or `cursor` is given, or a streamed response with `stream`.
+    """
+    
+    worker_id = request.args.get(WORKER_ID_GET, None)
+    work_group_id = request.args.get(WORK_GROUP_ID_GET, None)
+    status = request.args.get(STATUS_LIST_GET, None)
+    if status:
+        status = status.split(',')
+        
+    client_filter = {
+        'name': request.args.get('name', None),
+        'email': request.args.get('email', None),
+        'tlf': request.args.get('tlf', None)
+    }
+    
+    cursor = params.get('cursor')
+    
+    if cursor:
+        # Checked before a streamed response starts.
+        decodeBookingsCursor(cursor)
+        
+    log("Searching bookings for local '%s' in date '%s' to '%s'. [worker_id: %s, work_group_id: %s, status: %s, client_filter: %s, limit: %s, cursor: %s, stream: %s]", get_jwt_identity(), datetime_init, datetime_end, worker_id, work_group_id, status, client_filter, params.get('limit'), cursor, params.get('stream', False), uuid=_uuid)
+    
+    bookings_query = getFilteredBookingsQuery(get_jwt_identity(), datetime_init, datetime_end, status=status, worker_id=worker_id, work_group_id=work_group_id, client_filter=client_filter)
+    
+    # BookingSchema dumps the worker, the services and total_price of every booking: one query per relationship and page instead of per booking.
+    bookings_query = bookings_query.options(
+        selectinload(BookingModel.worker),
+        selectinload(BookingModel.services),
+        selectinload(BookingModel.service_bookings).selectinload(ServiceBookingModel.service),
+    )
+    
+    if params.get('stream'):
+        return Response(stream_with_context(streamBookings(bookings_query, cursor)), mimetype='application/json')
+    
+    if params.get('limit') or cursor:
+        bookings, next_cursor = getBookingsPage(bookings_query, params.get('limit', MAX_BOOKINGS_PAGE_SIZE), cursor)
+        return {"bookings": bookings, "total": len(bookings), "next_cursor": next_cursor}
+    
+    bookings = bookings_query.all()
+    
+    return {"bookings": bookings, "total": len(bookings)}
+
 @blp.route('/local/<string:local_id>')
 class SeePublicBooking(MethodView):
     
@@ -121,9 +187,9 @@ class SeePublicBooking(MethodView):
         free = params['free'] if 'free' in params else False
                 
         if free:
-            week_day = WeekdayModel.query.filter_by(weekday=WEEK_DAYS[datetime_init.weekday()]).first()
-            timetable_init = getTimetable(local_id, week_day.id, datetime_init)
-            timetable_end = getTimetable(local_id, week_day.id, datetime_end)
+            week_day_id = getWeekdayId(WEEK_DAYS[datetime_init.weekday()])
+            timetable_init = getTimetable(local_id, week_day_id, datetime_init)
+            timetable_end = getTimetable(local_id, week_day_id, datetime_end)
             init = timetable_init[0].opening_time if timetable_init else None
             end = timetable_end[-1].closing_time if timetable_end else None
             print("Timetables: ", init, end)
@@ -202,6 +268,46 @@ class SeePublicBookingMonth(MethodView):
                    
         return {"bookings": bookings, "total": len(bookings)}  
     
+@blp.route('/local/<string:local_id>/availability')
+class SeeAvailability(MethodView):
+    
+    @log_route
+    @blp.arguments(AvailabilityParams, location='query')
+    @blp.response(404, description='El local, el servicio o el trabajador no existe.')
+    @blp.response(400, description='Formato de fecha o rango de fechas no válido.')
+    @blp.response(409, description='Los servicios deben ser del mismo grupo de trabajo. El trabajador debe ser del mismo grupo de trabajo que los servicios.')
+    @blp.response(422, description='Fecha no especificada.')
+    @blp.response(200, AvailabilitySchema)
+    def get(self, params, local_id, _uuid = None):
+        """
+        Devuelve las horas de inicio libres de cada trabajador para reservar los servicios indicados.
+        """
+        
+        try:
+            datetime_init, datetime_end = getDataRequest(request)
+            
+            if 'date' in params and 'days' in params:
+                datetime_end = datetime.combine((datetime_init + timedelta(days=params['days'] - 1)).date(), datetime.max.time())
+            
+            services_ids = [int(service_id) for service_id in params['services_ids'].split(',') if service_id.strip()]
+            
+            log(f"Searching availability for local '{local_id}' in date '{datetime_init}' to '{datetime_end}'. [services_ids: {services_ids}, worker_id: {params.get('worker_id')}]", uuid=_uuid)
+            
+            return getAvailability(local_id, services_ids, datetime_init, datetime_end, worker_id=params.get('worker_id'), interval=params.get('interval', AVAILABILITY_INTERVAL))
+        
+        except (ValueError, DateRangeException) as e:
+            log(f"Invalid date range or services.", uuid=_uuid, level='WARNING', error=e)
+            abort(400, message=str(e))
+        except ModelNotFoundException as e:
+            log(f"Availability search for local '{local_id}' failed.", uuid=_uuid, level='WARNING', error=e)
+            abort(404, message=str(e))
+        except (WrongServiceWorkGroupException, WrongWorkerWorkGroupException) as e:
+            log(f"Availability search for local '{local_id}' failed.", uuid=_uuid, level='WARNING', error=e)
+            abort(409, message=str(e))
+        except UnspecifedDateException as e:
+            log(f"Date not specified.", uuid=_uuid, level='WARNING', error=e)
+            abort(422, message=str(e))
+    
 @blp.route('/all')
 class SeeBookingWeek(MethodView):
     
@@ -212,7 +318,7 @@ class SeeBookingWeek(MethodView):
     @blp.response(204, description='El local no tiene reservas para la fecha indicada.')
     @blp.response(200, BookingAdminListSchema)
     @jwt_required(refresh=True)
-    def get(self, _, _uuid = None):
+    def get(self, params, _uuid = None):
         """
         Devuelve las reservas privadas de una fecha específica.
         """      
@@ -220,21 +326,7 @@ class SeeBookingWeek(MethodView):
         try:
             datetime_init, datetime_end = getDataRequest(request)
             
-            worker_id = request.args.get(WORKER_ID_GET, None)
-            work_group_id = request.args.get(WORK_GROUP_ID_GET, None)
-            status = request.args.get(STATUS_LIST_GET, None)
-            if status:
-                status = status.split(',')
-            
-            client_filter = {
-                'name': request.args.get('name', None),
-                'email': request.args.get('email', None),
-                'tlf': request.args.get('tlf', None)
-            }
-            
-            log(f"Searching bookings for local '{get_jwt_identity()}' in date '{datetime_init}' to '{datetime_end}'. [worker_id: {worker_id}, work_group_id: {work_group_id}, status: {status}, client_filter: {json.dumps(client_filter)}]", uuid=_uuid)
-            
-            bookings = getBookings(get_jwt_identity(), datetime_init, datetime_end, status=status, worker_id=worker_id, work_group_id=work_group_id, client_filter=client_filter)
+            return getBookingsList(datetime_init, datetime_end, params, _uuid=_uuid)
             
         except ValueError as e:
             log(f"Invalid date format.", uuid=_uuid, level='WARNING', error=e)
@@ -244,9 +336,7 @@ class SeeBookingWeek(MethodView):
             abort(404, message=str(e))
         except UnspecifedDateException as e:
             log(f"Date not specified.", uuid=_uuid, level='WARNING', error=e)
-            abort(422, message=str(e))     
-                                
-        return {"bookings": bookings, "total": len(bookings)}  
+            abort(422, message=str(e))
        
 @blp.route('/all/week')
 class SeeBookingWeek(MethodView):
@@ -258,7 +348,7 @@ class SeeBookingWeek(MethodView):
     @blp.response(204, description='El local no tiene reservas para la fecha indicada.')
     @blp.response(200, BookingAdminListSchema)
     @jwt_required(refresh=True)
-    def get(self, _, _uuid = None):
+    def get(self, params, _uuid = None):
         """
         Devuelve las reservas privadas de una semana.
         """
@@ -266,21 +356,7 @@ class SeeBookingWeek(MethodView):
         try:
             datetime_init, datetime_end = getWeekDataRequest(request)
             
-            worker_id = request.args.get(WORKER_ID_GET, None)
-            work_group_id = request.args.get(WORK_GROUP_ID_GET, None)
-            status = request.args.get(STATUS_LIST_GET, None)
-            if status:
-                status = status.split(',')
-                
-            client_filter = {
-                'name': request.args.get('name', None),
-                'email': request.args.get('email', None),
-                'tlf': request.args.get('tlf', None)
-            }
-                
-            log(f"Searching bookings for local '{get_jwt_identity()}' in date '{datetime_init}' to '{datetime_end}'. [worker_id: {worker_id}, work_group_id: {work_group_id}, status: {status}, client_filter: {json.dumps(client_filter)}]", uuid=_uuid)
-                
-            bookings = getBookings(get_jwt_identity(), datetime_init, datetime_end, status=status, worker_id=worker_id, work_group_id=work_group_id, client_filter=client_filter)
+            return getBookingsList(datetime_init, datetime_end, params, _uuid=_uuid)
             
         except ValueError as e:
             log(f"Invalid date format.", uuid=_uuid, level='WARNING', error=e)
@@ -290,9 +366,7 @@ class SeeBookingWeek(MethodView):
             abort(404, message=str(e))
         except UnspecifedDateException as e:
             log(f"Date not specified.", uuid=_uuid, level='WARNING', error=e)
-            abort(422, message=str(e))    
-                                                
-        return {"bookings": bookings, "total": len(bookings)}  
+            abort(422, message=str(e))
     
 @blp.route('/all/month')
 class SeeBookingMonth(MethodView):
@@ -304,7 +378,7 @@ class SeeBookingMonth(MethodView):
     @blp.response(204, description='El local no tiene reservas para la fecha indicada.')
     @blp.response(200, BookingAdminListSchema)
     @jwt_required(refresh=True)
-    def get(self, _, _uuid = None):
+    def get(self, params, _uuid = None):
         """
         Devuelve las reservas privadas de un mes.
         """
@@ -312,21 +386,7 @@ class SeeBookingMonth(MethodView):
         try:
             datetime_init, datetime_end = getMonthDataRequest(request)
             
-            worker_id = request.args.get(WORKER_ID_GET, None)
-            work_group_id = request.args.get(WORK_GROUP_ID_GET, None)
-            status = request.args.get(STATUS_LIST_GET, None)
-            if status:
-                status = status.split(',')
-                    
-            client_filter = {
-                'name': request.args.get('name', None),
-                'email': request.args.get('email', None),
-                'tlf': request.args.get('tlf', None)
-            }
-                
-            log(f"Searching bookings for local '{get_jwt_identity()}' in date '{datetime_init}' to '{datetime_end}'. [worker_id: {worker_id}, work_group_id: {work_group_id}, status: {status}, client_filter: {json.dumps(client_filter)}]", uuid=_uuid)
-                
-            bookings = getBookings(get_jwt_identity(), datetime_init, datetime_end, status=status, worker_id=worker_id, work_group_id=work_group_id, client_filter=client_filter)
+            return getBookingsList(datetime_init, datetime_end, params, _uuid=_uuid)
             
         except ValueError as e:
             log(f"Invalid date format.", uuid=_uuid, level='WARNING', error=e)
@@ -336,9 +396,7 @@ class SeeBookingMonth(MethodView):
             abort(404, message=str(e))
         except UnspecifedDateException as e:
             log(f"Date not specified.", uuid=_uuid, level='WARNING', error=e)
-            abort(422, message=str(e))    
-        
-        return {"bookings": bookings, "total": len(bookings)}  
+            abort(422, message=str(e))
 
 @blp.route('/local/<string:local_id>')
 class Booking(MethodView):
@@ -356,8 +414,8 @@ class Booking(MethodView):
                 
         local = LocalModel.query.get_or_404(local_id)
         
-        log(f"Creating a new booking for local '{local.name}'.", uuid=_uuid)
-        log(f"<| Last UUID Log: [NULL] |>")
+        log("Creating a new booking for local '%s'.", local.name, uuid=_uuid)
+        log("<| Last UUID Log: [NULL] |>", level='DEBUG')
         
         session = None
         
@@ -365,50 +423,56 @@ class Booking(MethodView):
             
             booking, unregisterFromCache = createOrUpdateBooking(new_booking, local=local, commit=False, _uuid=_uuid)
                         
-            log(f"Booking created for local '{local.name}'.", uuid=_uuid)
-            log(f"Generating booking token for local '{local.name}'.", uuid=_uuid)
+            log("Booking created for local '%s'.", local.name, uuid=_uuid)
+            log("Generating booking token for local '%s'.", local.name, uuid=_uuid)
                         
             exp:timedelta = calculateExpireBookingToken(booking.datetime_init, local.location)
                         
             token = generateTokens(booking.id, booking.local_id, refresh_token=True, expire_refresh=exp, user_role=USER_ROLE)
                         
-            booking.email_confirm = True
+            booking.email_confirm = is_confirm_email_enabled(local.local_settings)
             
             booking.uuid_log = _uuid
             
             try:
-                log(f"Commiting booking for local '{local.name}'.", uuid=_uuid)            
+                log("Commiting booking for local '%s'.", local.name, uuid=_uuid)            
                 commit(session)
             except SQLAlchemyError as e:
-                log(f"Error commiting booking for local '{local.name}'. Unregistering from cache", uuid=_uuid, level='ERROR', error=e)
+                log("Error commiting booking for local '%s'. Unregistering from cache", local.name, uuid=_uuid, level='ERROR', error=e)
                 unregisterFromCache()
                 raise e
             
             log("Unregistering from cache.", uuid=_uuid)
             unregisterFromCache()
                         
-            log(f"Sending confirmation email for booking '{booking.id}'.", uuid=_uuid)
-            email_confirm = send_confirm_booking_mail(local, booking, token, _uuid=_uuid)
+            email_confirm = booking.email_confirm
                         
             timeout = None
             
+            if email_confirm:
+                log("Queueing confirmation email for booking '%s'.", booking.id, uuid=_uuid)
+                
+                # The task only runs inline in email test mode; otherwise its result is an AsyncResult.
+                if send_confirm_mail_async(local_id, booking.id, _uuid=_uuid) is False:
+                    email_confirm = False
+                    
             if email_confirm:
                 timeout_local = local.local_settings.booking_timeout
-                log(f"Starting waiter for booking '{booking.id}' with timeout '{timeout_local}'.", uuid=_uuid)
+                log("Starting waiter for booking '%s' with timeout '%s'.", booking.id, timeout_local, uuid=_uuid)
                 timeout = start_waiter_booking_status(booking.id, timeout=timeout_local)
-            else:
+            elif booking.status.status == PENDING_STATUS:
                 
-                log(f"Booking '{booking.id}' will not be confirmed by email.", uuid=_uuid)
+                log("Booking '%s' will not be confirmed by email.", booking.id, uuid=_uuid)
                 
                 booking.email_confirm = False
                     
-                log(f"Confirming booking '{booking.id}'.", uuid=_uuid)
+                log("Confirming booking '%s'.", booking.id, uuid=_uuid)
                 confirmBooking(booking, session=session)
                     
-                log(f"Sending confirmation email for booking '{booking.id}'.", uuid=_uuid)
+                log("Sending confirmation email for booking '%s'.", booking.id, uuid=_uuid)
                 send_confirmed_mail_async(local_id, booking.id, _uuid=_uuid)
                     
-                log(f"Commiting booking '{booking.id}'.", uuid=_uuid)
+                log("Commiting booking '%s'.", booking.id, uuid=_uuid)
                 addAndCommit(booking, session)
               
             if session is not None: session.close()
@@ -417,6 +481,7 @@ class Booking(MethodView):
                 "booking": booking,
                 "timeout": timeout,
                 "email_confirm": email_confirm,
+                "email_status": EMAIL_STATUS_PENDING,
                 "session_token": token
             }
         except (StatusNotFoundException, WeekdayNotFoundException) as e:
@@ -655,17 +720,19 @@ class BookingSession(MethodView):
         
         log(f"Getting booking '{booking.id}' by session.", uuid=_uuid)
         
-        if booking.status.status == DONE_STATUS:
+        if booking.is_done:
             log(f"Booking '{booking.id}' is done.", uuid=_uuid)
             token = SessionTokenModel.query.get_or_404(decodeToken(params[SESSION_GET])['token'])
             try:
                 log(f"Deleting session token '{token.id}'.", uuid=_uuid)
+                token_id = token.id
                 deleteAndCommit(token)
+                invalidate_session_tokens(token_id)
             except SQLAlchemyError as e:
                 log(f"Error deleting session token '{token.id}'.", uuid=_uuid, level='ERROR', error=e)
                 traceback.print_exc()
                 rollback()
-            abort(409, message = f"The booking is '{booking.status.name}'.")       
+            abort(409, message = f"The booking is '{booking.current_status.name}'.")       
             
         return booking 
         
@@ -690,11 +757,11 @@ class BookingSession(MethodView):
         log(f"<| Last UUID Log: [{booking.uuid_log}] |>")
         booking.uuid_log = _uuid
 
-        status = booking.status.status
+        status = booking.current_status.status
 
         if status == CANCELLED_STATUS or status == DONE_STATUS:
             log(f"Booking '{booking.id}' is cancelled or done. Status: {status}", uuid=_uuid)
-            abort(409, message = f"The booking is '{booking.status.name}'.")
+            abort(409, message = f"The booking is '{booking.current_status.name}'.")
 
         session = None
 
@@ -747,11 +814,11 @@ class BookingSession(MethodView):
         log(f"<| Last UUID Log: [{booking.uuid_log}] |>")
         booking.uuid_log = _uuid
         
-        status = booking.status.status
+        status = booking.current_status.status
 
         if status == CANCELLED_STATUS or status == DONE_STATUS:
             log(f"Booking '{booking.id}' is cancelled or done. Status: {status}", uuid=_uuid)
-            abort(409, message = f"The booking is '{booking.status.name}'.")
+            abort(409, message = f"The booking is '{booking.current_status.name}'.")
                 
         booking_data = patchBooking(booking, booking_data)
 
@@ -802,11 +869,11 @@ class BookingSession(MethodView):
         log(f"<| Last UUID Log: [{booking.uuid_log}] |>")
         booking.uuid_log = _uuid
         
-        status = booking.status.status
+        status = booking.current_status.status
         
         if status == DONE_STATUS or status == CANCELLED_STATUS:
             log(f"Booking '{booking.id}' is done or cancelled. Status: {status}", uuid=_uuid) 
-            abort(409, message = f"The booking is '{booking.status.name}'.")
+            abort(409, message = f"The booking is '{booking.current_status.name}'.")
         
         comment = None
         
@@ -898,6 +965,79 @@ class BookingSession(MethodView):
             if session is not None: session.close()
             abort(500, message = str(e) if DEBUG else 'Could not create the booking.')
         
+def bulkBookingResult(result, atomic_failed = False):
+    
+    if 'booking' in result:
+        return {'index': result['index'], 'status_code': 201, 'booking': result['booking']}
+    
+    if 'error' not in result:
+        return {'index': result['index'], 'status_code': 424, 'message': 'Not created because another booking of the batch is not valid.' if atomic_failed else 'Not created.'}
+    
+    e = result['error']
+    
+    status_code = 404 if isinstance(e, ModelNotFoundException) else 400 if isinstance(e, ValueError) else 409
+    
+    return {'index': result['index'], 'status_code': status_code, 'message': str(e)}
+
+@blp.route('bulk')
+class BookingBulk(MethodView):
+    
+    @log_route
+    @blp.arguments(BulkBookingParams, location='query')
+    @blp.arguments(BulkBookingSchema)
+    @blp.response(409, BulkBookingListSchema, description='Ninguna reserva ha sido creada. El resultado de cada reserva indica el motivo.')
+    @blp.response(503, description='El local está saturado. Inténtalo más tarde.')
+    @blp.response(201, BulkBookingListSchema)
+    @jwt_required(refresh=True)
+    def post(self, params, bulk_data, _uuid = None):
+        """
+        Crea varias reservas confirmadas por parte del local, identificado por el token de refresco, en una sola transacción.
+        Devuelve el resultado de cada reserva en el mismo orden. Con 'atomic' no se crea ninguna si alguna no es válida.
+        Con 'notify' los emails de confirmación se envían juntos en una sola tarea.
+        """
+        
+        force = 'force' in params and params['force']
+        notify = 'notify' in params and params['notify']
+        atomic = 'atomic' in params and params['atomic']
+        
+        local = LocalModel.query.get_or_404(get_jwt_identity())
+        
+        bookings_data = bulk_data['bookings']
+        
+        log(f"Creating {len(bookings_data)} bookings by local. Local: '{local.id}'.", uuid=_uuid)
+        
+        try:
+            results = createBookings(local, bookings_data, force=force, atomic=atomic, _uuid=_uuid)
+        except (StatusNotFoundException, WeekdayNotFoundException) as e:
+            log(f"Error creating bookings by local. Local: '{local.id}'.", uuid=_uuid, level='ERROR', error=e)
+            abort(500, message = str(e))
+        except LocalOverloadedException as e:
+            log(f"Error creating bookings by local. Local: '{local.id}'.", uuid=_uuid, level='ERROR', error=e)
+            abort(503, message = str(e))
+        except SQLAlchemyError as e:
+            log(f"FATAL ERROR. Error creating bookings by local. Local: '{local.id}'.", uuid=_uuid, level='ERROR', error=e)
+            traceback.print_exc()
+            rollback()
+            abort(500, message = str(e) if DEBUG else 'Could not create the bookings.')
+        
+        bookings_ids = [result['booking'].id for result in results if 'booking' in result]
+        failed = len(results) - len(bookings_ids)
+        
+        log(f"{len(bookings_ids)} bookings created by local, {failed} failed. Local: '{local.id}'.", uuid=_uuid)
+        
+        if notify and bookings_ids:
+            log(f"Sending confirmation emails for {len(bookings_ids)} bookings.", uuid=_uuid)
+            send_confirmed_mails_batch_async(local.id, bookings_ids, _uuid = _uuid)
+        
+        response = {
+            'results': [bulkBookingResult(result, atomic and failed > 0) for result in results],
+            'created': len(bookings_ids),
+            'failed': failed,
+            'email_status': EMAIL_STATUS_PENDING if notify and bookings_ids else None
+        }
+        
+        return response, 201 if bookings_ids else 409
+        
 @blp.route('confirm')
 class BookingConfirm(MethodView):
     
@@ -1018,9 +1158,9 @@ class BookingCancelId(MethodView):
             log(f"Unauthorized to cancel booking '{booking.id}'.", uuid=_uuid, level='WARNING')
             abort(401, message = f'You are not allowed to cancel the booking [{booking.id}].')
         
-        if booking.status.status == DONE_STATUS or booking.status.status == CANCELLED_STATUS:
-            log(f"Booking '{booking.id}' is done or cancelled. Status: {booking.status.status}", uuid=_uuid)
-            abort(409, message = f"The booking is '{booking.status.name}'.")
+        if booking.current_status.status == DONE_STATUS or booking.current_status.status == CANCELLED_STATUS:
+            log(f"Booking '{booking.id}' is done or cancelled. Status: {booking.current_status.status}", uuid=_uuid)
+            abort(409, message = f"The booking is '{booking.current_status.name}'.")
         
         comment = None
         
@@ -1059,6 +1199,7 @@ class BookingAdmin(MethodView):
     @blp.response(404, description='El token de administrador no existe.')
     @blp.response(403, description='No tienes permisos para usar este endpoint.')
     @blp.response(401, description='Falta la cabecera de autorización.')
+    @blp.response(400, description='Faltan los servicios o el trabajador de la reserva.')
     @blp.response(201, NewBookingSchema)
     def post(self, booking_data, _uuid = None):
         """
@@ -1083,6 +1224,11 @@ class BookingAdmin(MethodView):
             abort(403, message = 'You are not allowed to use this endpoint.')
             
         services_ids = booking_data.pop('services_ids')
+
+        if not services_ids:
+            log(f"Missing services_ids.", uuid=_uuid, level='WARNING')
+            abort(400, message = 'The services_ids are required.')
+
         services = [ServiceModel.query.get_or_404(id) for id in services_ids]
 
         if 'worker_id' not in booking_data:
@@ -1091,13 +1237,14 @@ class BookingAdmin(MethodView):
             
         worker = WorkerModel.query.get_or_404(booking_data.pop('worker_id'))
 
-        status = StatusModel.query.filter_by(status=CONFIRMED_STATUS).first()
+        status = getStatus(CONFIRMED_STATUS)
         
         booking = BookingModel(**booking_data)
         
         booking.services = services
         booking.worker = worker
         booking.status = status
+        booking.setWorkGroup(services[0].work_group)
         booking = calculatEndTimeBooking(booking)
         
         try:
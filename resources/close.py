@@ -4,6 +4,7 @@ from flask.views import MethodView
 from flask_smorest import Blueprint, abort
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from globals import DEBUG
+from helpers.ScheduleCache import invalidate_schedule
 from helpers.closed import checkClosedDay, getClosedDays
 from helpers.error.ClosedDaysError.BadDatetimesClosedDaysException import BadDatetimesClosedDaysException
 from helpers.error.ClosedDaysError.ConflictClosedDaysException import ConflictClosedDaysException
@@ -36,7 +37,8 @@ class CloseDays(MethodView):
             checkClosedDay(local.id, datetime_init, datetime_end)
             
             closed = ClosedModel(local_id=local.id, datetime_init=datetime_init, datetime_end=datetime_end, description=data.get('description'))
-            addAndCommit(closed)            
+            addAndCommit(closed)
+            invalidate_schedule(local.id)
             return closed
             
         except BadDatetimesClosedDaysException as e:
@@ -75,6 +77,7 @@ class CloseDay(MethodView):
         
         try:
             deleteAndCommit(closedDay)
+            invalidate_schedule(closedDay.local_id)
             return {}
         except Exception as e:
             traceback.print_exc()
@@ -102,6 +105,7 @@ class CloseDay(MethodView):
             closedDay.description = data.get('description')
             
             addAndCommit(closedDay)
+            invalidate_schedule(closedDay.local_id)
         
             return closedDay
         
@@ -1,7 +1,6 @@
 
 import os
 import traceback
-from dotenv import load_dotenv
 from flask import request
 
 from flask_jwt_extended import get_jwt_identity, jwt_required
@@ -12,6 +11,8 @@ from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from db import commit, addAndCommit, deleteAndFlush, rollback
 
 from globals import DEBUG, IMAGE_TYPE_GALLERY, IMAGE_TYPE_LOGOS, IMAGES_FOLDER, PARAM_FILE_NAME
+from helpers.EmailTemplate import invalidate_template
+from helpers.FileCache import invalidate_file
 from helpers.ImageController import checkRequestFile
 from helpers.error.ImageError.InvalidExtensionException import InvalidExtensionException
 from helpers.error.ImageError.InvalidFilenameException import InvalidFilenameException
@@ -25,16 +26,12 @@ from schema import FileSchema
 blp = Blueprint('files', __name__, description='Sistema de almacenamiento de archivos.')
 
 def generateURLImage(local_id, image_type, name):
-            
-    load_dotenv()
 
     PUBLIC_FOLDER_URL = os.getenv('PUBLIC_FOLDER_URL', None)
     
     return {'url': f'/{PUBLIC_FOLDER_URL}/images/local/{local_id}/{image_type}/{name}'}
 
 def generateURLPage(local_id, name):
-            
-    load_dotenv()
 
     PUBLIC_FOLDER_URL = os.getenv('PUBLIC_FOLDER_URL', None)
     
@@ -61,6 +58,7 @@ def saveRequestFile(request, path_generator_callback, generate_url_callback, upd
             raise IntegrityError()
             
         addAndCommit(image)
+        invalidate_file(get_jwt_identity(), path)
     except (InvalidExtensionException, InvalidFilenameException, NotFileException) as e:
         abort(400, message=str(e))
     except (IntegrityError, FileExistsError) as e:
@@ -77,7 +75,9 @@ def saveImage(request, image_type):
     return saveRequestFile(request, lambda filename: generateImagePath(filename, image_type), lambda filename: generateURLImage(get_jwt_identity(), image_type, filename))
         
 def savePage(request):
-    return saveRequestFile(request, generatePagePath, lambda filename: generateURLPage(get_jwt_identity(), filename), update_if_conflict = True)
+    response = saveRequestFile(request, generatePagePath, lambda filename: generateURLPage(get_jwt_identity(), filename), update_if_conflict = True)
+    invalidate_template(get_jwt_identity())
+    return response
     
 def deleteFile(local_id, path):
     file = FileModel.query.filter_by(local_id = local_id, path = path).first_or_404()
@@ -85,6 +85,7 @@ def deleteFile(local_id, path):
         deleteAndFlush(file)
         removeFile(local_id, path)
         commit()
+        invalidate_file(local_id, path)
     except FileNotFoundError:
         rollback()
         abort(404, message='The file does not exist.')
@@ -97,7 +98,8 @@ def deleteImage(name, image_type):
     return deleteFile(get_jwt_identity(), generateImagePath(name, image_type))
         
 def deletePage(name):
-    return deleteFile(get_jwt_identity(), generatePagePath(name))
+    deleteFile(get_jwt_identity(), generatePagePath(name))
+    invalidate_template(get_jwt_identity(), generatePagePath(name))
         
 @blp.route('local/<string:local_id>/logos')
 class LogosImages(MethodView):
@@ -168,7 +170,7 @@ class LogosImagesUpload(MethodView):
         f"""
         Elimina una imagen de la galería.
         """
-        deleteImage(name, IMAGE_TYPE_LOGOS)
+        deleteImage(name, IMAGE_TYPE_GALLERY)
         
         return {}
     
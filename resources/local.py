@@ -10,6 +10,10 @@ from helpers.error.SecurityError.AdminTokenIdentityException import AdminTokenId
 from helpers.error.SecurityError.AdminTokenRoleException import AdminTokenRoleException
 from helpers.error.SecurityError.NoTokenProvidedException import NoTokenProvidedException
 from helpers.error.SecurityError.TokenNotFound import TokenNotFoundException
+from helpers.EmailTemplate import invalidate_template
+from helpers.FileCache import invalidate_file
+from helpers.TokenCache import invalidate_session_tokens
+from helpers.ResponseCache import cached_response, invalidate_catalog
 from helpers.path import createPathFromLocal, removePath
 from helpers.security import check_admin_request, decodeJWT, generatePassword, generateTokens, generateUUID, logOutAll
 from flask_smorest import Blueprint, abort
@@ -224,6 +228,7 @@ def update_local(local_data, local_id, patch = False, _uuid = None):
         else: log('No warnings', uuid=_uuid)
         
         commit()
+        invalidate_catalog(local_id)
         
         log('Local updated', uuid=_uuid)
         
@@ -245,6 +250,7 @@ def update_local(local_data, local_id, patch = False, _uuid = None):
 class Local(MethodView):
 
     @log_route
+    @cached_response
     @blp.response(404, description='El local no existe.')
     @blp.response(200, PublicLocalSchema)
     def get(self, local_id, _uuid = None):
@@ -279,10 +285,16 @@ class Local(MethodView):
         log(f"<| Last UUID Log: [{local.uuid_log}] |>")
         local.uuid_log = _uuid
         
+        tokens_ids = [token.id for token in local.tokens]
+        
         try:
             deleteAndCommit(local)
+            invalidate_session_tokens(*tokens_ids)
+            invalidate_catalog(local_id)
             log('Local removed', uuid=_uuid)
             p = removePath(local_id)
+            invalidate_template(local_id)
+            invalidate_file(local_id)
             log(f"'{p}' removed.", uuid=_uuid)
         except Exception as e:
             traceback.print_exc()
@@ -441,6 +453,7 @@ class LocalLogout(MethodView):
         tokenId = get_jwt().get('token')
         
         deleteAndCommit(SessionTokenModel.query.get(tokenId))
+        invalidate_session_tokens(tokenId)
         
         return {}
     
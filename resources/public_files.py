@@ -1,27 +1,38 @@
-
-from flask import make_response
+from flask import send_file
 
 from flask_smorest import Blueprint, abort
 from flask.views import MethodView
 
-from globals import IMAGE_TYPE_GALLERY, IMAGE_TYPE_LOGOS
-from helpers.path import generateImagePath, generatePagePath, getFile
-from models.file import FileModel
+from globals import FILES_MAX_AGE, HASHED_FILES_MAX_AGE, IMAGE_TYPE_GALLERY, IMAGE_TYPE_LOGOS
+from helpers.FileCache import get_file, is_content_hashed
+from helpers.path import generateImagePath, generatePagePath, getFilePath
 
 
 blp = Blueprint('public_files', __name__, description='Obtiene archivos públicos.')
 
-def generateFileResponse(local_id, path):
-    file = FileModel.query.filter_by(local_id = local_id, path = path).first_or_404()
+def generateFileResponse(local_id, path, immutable = True):
+    file = get_file(local_id, path)
+
+    if file is None:
+        abort(404, message='The file does not exist.')
+
+    file_path = getFilePath(local_id, file['path'])
+
+    # Pages are overwritten in place, they are never immutable.
+    hashed = immutable and is_content_hashed(local_id, file, file_path)
+
+    # send_file streams the file (or hands it to Apache with USE_X_SENDFILE) and answers
+    # Range, If-None-Match and If-Modified-Since with 206 and 304.
     try:
-        r = getFile(local_id, file.path)
+        response = send_file(file_path, mimetype=file['mimetype'], download_name=file['name'], conditional=True, etag=True, max_age=HASHED_FILES_MAX_AGE if hashed else FILES_MAX_AGE)
     except FileNotFoundError:
         abort(404, message='The file does not exist.')
 
-    response = make_response(r)
-    response.headers['Content-Type'] = file.mimetype
-    response.headers['Content-Disposition'] = f'inline; filename="{file.name}"'
-    
+    response.cache_control.public = True
+
+    if hashed:
+        response.cache_control.immutable = True
+
     return response
        
 @blp.route('/images/local/<string:local_id>/logos/<string:name>')
@@ -52,4 +63,4 @@ class Page(MethodView):
         """
         Devuelve una página.
         """
-        return generateFileResponse(local_id, generatePagePath(page))
\ No newline at end of file
+        return generateFileResponse(local_id, generatePagePath(page), immutable=False)
\ No newline at end of file
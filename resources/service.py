@@ -4,12 +4,14 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_smorest import Blueprint, abort
 from flask.views import MethodView
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.orm import contains_eager
 
 from db import addAndFlush, commit, deleteAndCommit, addAndCommit, rollback
 
 from globals import CONFIRMED_STATUS, DEBUG, PENDING_STATUS
-from helpers.BookingController import cancelBooking, createOrUpdateBooking, deserializeBooking, getBookings
+from helpers.BookingController import cancelBooking, createOrUpdateBooking, deserializeBooking, getBookings, updateServiceBookingsWorkGroup
 from helpers.DatetimeHelper import DATETIME_NOW
+from helpers.ResponseCache import cached_response, invalidate_catalog
 from helpers.error.BookingError.AlredyBookingException import AlredyBookingExceptionException
 from helpers.error.BookingError.LocalUnavailableException import LocalUnavailableException
 from helpers.error.LocalError.LocalNotFoundException import LocalNotFoundException
@@ -24,19 +26,22 @@ from datetime import datetime
 blp = Blueprint('service', __name__, description='CRUD de servicios.')
 
 def getAllServices(local_id):
-    work_groups = LocalModel.query.get_or_404(local_id).work_groups.all()
+    """
+    Services of the local with their work group and its workers, in three queries.
+    """
+    LocalModel.query.get_or_404(local_id)
     
-    services = []
-    
-    for wg in work_groups:
-        for service in wg.services.all():
-            services.append(service)
-    
-    return services
+    return (ServiceModel.query
+            .join(ServiceModel.work_group)
+            .filter(WorkGroupModel.local_id == local_id)
+            .options(contains_eager(ServiceModel.work_group).selectinload(WorkGroupModel.workers_list))
+            .order_by(WorkGroupModel.id, ServiceModel.id)
+            .all())
 
 @blp.route('local/<string:local_id>')
 class AllServices(MethodView):
 
+    @cached_response
     @blp.response(404, description='El local no existe.')
     @blp.response(200, ServiceWorkGroupListSchema)
     def get(self, local_id):
@@ -90,6 +95,7 @@ class ServiceById(MethodView):
                 abort(409, message = 'The service has bookings with workers on differents work group.')
             
         check_booking = service.duration != service_data['duration']
+        move_bookings = work_group_id != service.work_group_id
                                         
         for key, value in service_data.items():
             setattr(service, key, value)
@@ -99,6 +105,9 @@ class ServiceById(MethodView):
         try:
             addAndFlush(service)
             
+            if move_bookings:
+                updateServiceBookingsWorkGroup(service.id, work_group_id)
+            
             bookings = getBookings(get_jwt_identity(), datetime_init=DATETIME_NOW,datetime_end=None, status=[CONFIRMED_STATUS, PENDING_STATUS], service_id=service.id)
             
             if check_booking and not force:
@@ -109,6 +118,7 @@ class ServiceById(MethodView):
                         abort(409, message = f"The service has bookings that can not be updated. Booking [{booking.id}]: '{str(e)}'")
             
             commit()
+            invalidate_catalog(get_jwt_identity())
         except IntegrityError as e:
             traceback.print_exc()
             rollback()
@@ -150,6 +160,7 @@ class ServiceById(MethodView):
                     cancelBooking(booking, params['comment'] if 'comment' in params else None) #TODO add comment
             
             deleteAndCommit(service)
+            invalidate_catalog(get_jwt_identity())
             return {}
         except SQLAlchemyError as e:
             traceback.print_exc()
@@ -187,6 +198,7 @@ class Service(MethodView):
         
         try:
             addAndCommit(service)
+            invalidate_catalog(local.id)
         except IntegrityError as e:
             traceback.print_exc()
             rollback()
@@ -207,6 +219,7 @@ class Service(MethodView):
         """
         try:
             deleteAndCommit(*getAllServices(get_jwt_identity()))
+            invalidate_catalog(get_jwt_identity())
             return {}
         except SQLAlchemyError as e:
             traceback.print_exc()
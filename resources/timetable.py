@@ -1,11 +1,15 @@
 from flask.views import MethodView
 from flask_smorest import Blueprint, abort
 from helpers.BookingController import checkTimetableBookings
+from helpers.ReferenceData import getWeekdayId
+from helpers.ResponseCache import cached_response, invalidate_catalog
+from helpers.ScheduleCache import invalidate_schedule
 from helpers.TimetableController import getTimetable, validateTimetable
 from helpers.error.BookingError.BookingsConflictException import BookingsConflictException
 from helpers.error.LocalError.LocalNotFoundException import LocalNotFoundException
 from helpers.error.TimetableError.TimetableOverlapsException import TimetableOverlapsException
 from helpers.error.TimetableError.TimetableTimesException import TimetableTimesException
+from helpers.error.WeekdayError.WeekdayNotFoundException import WeekdayNotFoundException
 from models.local import LocalModel
 from db import db, addAndFlush, addAndCommit, commit, deleteAndFlush, deleteAndCommit, flush, rollback
 from flask_jwt_extended import jwt_required, get_jwt_identity
@@ -22,6 +26,7 @@ blp = Blueprint('timetable', __name__, description='CRUD de horarios.')
 @blp.route('/local/<string:local_id>/week')
 class TimetableWeek(MethodView):
 
+    @cached_response
     @blp.response(404, description='El local no existe.')
     @blp.response(200, TimetableSchema(many=True))
     def get(self, local_id):
@@ -33,6 +38,7 @@ class TimetableWeek(MethodView):
 @blp.route('/local/<string:local_id>/week/<string:week>')
 class TimetableDay(MethodView):
     
+    @cached_response
     @blp.response(404, description='El local no existe o el día no existe.')
     @blp.response(204, description='No hay horario para el día indicado.')
     @blp.response(200, TimetableSchema(many=True))
@@ -44,11 +50,10 @@ class TimetableDay(MethodView):
         
         week = week.upper()
         
-        weekday_id = WeekdayModel.query.filter_by(weekday=week).first()
-        
-        if not weekday_id: abort(404, message=f'The day [{week}] was not found.')
-        
-        weekday_id = weekday_id.id
+        try:
+            weekday_id = getWeekdayId(week)
+        except WeekdayNotFoundException:
+            abort(404, message=f'The day [{week}] was not found.')
         
         weekdays = getTimetable(local_id, weekday_id)
         
@@ -76,16 +81,17 @@ class TimetableDayDelete(MethodView):
         
         week = week.upper()
         
-        weekday_id = WeekdayModel.query.filter_by(weekday=week).first()
-        
-        if not weekday_id: abort(404, message=f'The day [{week}] was not found.')
-        
-        weekday_id = weekday_id.id
+        try:
+            weekday_id = getWeekdayId(week)
+        except WeekdayNotFoundException:
+            abort(404, message=f'The day [{week}] was not found.')
         
         timetable = local.timetables.filter_by(weekday_id=weekday_id).all()
         
         try:
             deleteAndCommit(*timetable)
+            invalidate_schedule(local.id)
+            invalidate_catalog(local.id)
         except SQLAlchemyError as e:
             traceback.print_exc()
             rollback()
@@ -110,12 +116,13 @@ class Timetable(MethodView):
         for timetable_data in timetables_data:
             weekday_short = timetable_data.pop('weekday_short').upper()
             
-            weekday = WeekdayModel.query.filter_by(weekday=weekday_short).first()
-                    
-            if not weekday: abort(404, message=f'The day [{weekday_short}] was not found.')
+            try:
+                weekday_id = getWeekdayId(weekday_short)
+            except WeekdayNotFoundException:
+                abort(404, message=f'The day [{weekday_short}] was not found.')
                     
             timetable = TimetableModel(**timetable_data)
-            timetable.weekday = weekday
+            timetable.weekday_id = weekday_id
             timetable.local = local
             
             timetables.append(timetable)
@@ -129,6 +136,8 @@ class Timetable(MethodView):
             validateTimetable(local.id)
             checkTimetableBookings(local.id)
             commit()
+            invalidate_schedule(local.id)
+            invalidate_catalog(local.id)
         except (TimetableOverlapsException, TimetableTimesException) as e:
             rollback()
             abort(409, message = str(e))
@@ -2,6 +2,7 @@ from flask.views import MethodView
 from flask_smorest import Blueprint, abort
 from helpers.BookingController import cancelBooking, getBookings
 from helpers.DatetimeHelper import DATETIME_NOW
+from helpers.ResponseCache import cached_response, invalidate_catalog
 from helpers.error.LocalError.LocalNotFoundException import LocalNotFoundException
 from models import WorkGroupModel
 from models.local import LocalModel
@@ -9,6 +10,7 @@ from schema import DeleteParams, PublicWorkGroupWorkerListSchema, PublicWorkGrou
 from db import db, addAndCommit, deleteAndCommit, rollback
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.orm import selectinload
 import traceback
 from datetime import datetime
 
@@ -16,9 +18,19 @@ from globals import CONFIRMED_STATUS, DEBUG, PENDING_STATUS
 
 blp = Blueprint('work_group', __name__, description='CRUD de grupos de trabajo.')
 
+def getAllWorkGroups(local_id, *options):
+    """
+    Work groups of the local in one query after the one of the local. `options` are the
+    loader options of the relationships the response needs.
+    """
+    LocalModel.query.get_or_404(local_id)
+    
+    return WorkGroupModel.query.filter_by(local_id=local_id).options(*options).order_by(WorkGroupModel.id).all()
+
 @blp.route('/local/<string:local_id>')
 class WorkGroupGetAll(MethodView):
 
+    @cached_response
     @blp.response(404, description='El local no existe.')
     @blp.response(200, WorkGroupListSchema)
     def get(self, local_id):
@@ -26,20 +38,21 @@ class WorkGroupGetAll(MethodView):
         Devuelve todos los datos públicos de los grupos de trabajo de un local.
         """
         
-        wg = list(LocalModel.query.get_or_404(local_id).work_groups)
+        wg = getAllWorkGroups(local_id)
         
         return {'work_groups': wg, 'total': len(wg)}
     
 @blp.route('/local/<string:local_id>/workers')
 class WorkGroupWorkersGetAll(MethodView):
 
+    @cached_response
     @blp.response(404, description='El local no existe.')
     @blp.response(200, PublicWorkGroupWorkerListSchema)
     def get(self, local_id):
         """
         Devuelve todos los datos públicos de los grupos de trabajo de un local con sus trabajadores.
         """
-        wg = list(LocalModel.query.get_or_404(local_id).work_groups)
+        wg = getAllWorkGroups(local_id, selectinload(WorkGroupModel.workers_list))
         
         return {"work_groups": wg, "total": len(wg)}
     
@@ -54,13 +67,14 @@ class WorkGroupWorkersGetAll(MethodView):
         Devuelve todos los datos de los grupos de trabajo del local identificado con el token de refresco con sus trabajadores.
         """
         
-        wg = list(LocalModel.query.get_or_404(get_jwt_identity()).work_groups)
+        wg = getAllWorkGroups(get_jwt_identity(), selectinload(WorkGroupModel.workers_list))
         
         return {"work_groups": wg, "total": len(wg)}
     
 @blp.route('/local/<string:local_id>/services')
 class WorkGroupServicesGetAll(MethodView):
 
+    @cached_response
     @blp.response(404, description='El local no existe.')
     @blp.response(200, WorkGroupServiceListSchema)
     def get(self, local_id):
@@ -68,7 +82,7 @@ class WorkGroupServicesGetAll(MethodView):
         Devuelve todos los datos públicos de los grupos de trabajo de un local con sus servicios.
         """
         
-        wg = list(LocalModel.query.get_or_404(local_id).work_groups)
+        wg = getAllWorkGroups(local_id, selectinload(WorkGroupModel.services_list))
         
         return {"work_groups": wg, "total": len(wg)}
     
@@ -94,6 +108,7 @@ class WorkGroup(MethodView):
         
         try:
             addAndCommit(work_group)
+            invalidate_catalog(local.id)
         except IntegrityError as e:
             traceback.print_exc()
             rollback()
@@ -173,6 +188,7 @@ class WorkGroupByID(MethodView):
             setattr(work_group, key, value)
         try:
             addAndCommit(work_group)
+            invalidate_catalog(work_group.local_id)
         except IntegrityError as e:
             traceback.print_exc()
             rollback()
@@ -214,6 +230,7 @@ class WorkGroupByID(MethodView):
                     cancelBooking(booking, params['comment'] if 'comment' in params else None) #TODO add comment
             
             deleteAndCommit(work_group)
+            invalidate_catalog(get_jwt_identity())
         except SQLAlchemyError as e:
             traceback.print_exc()
             rollback()
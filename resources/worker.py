@@ -3,34 +3,40 @@ from flask.views import MethodView
 from flask_smorest import Blueprint, abort
 from helpers.BookingController import cancelBooking, getBookings, searchWorkerBookings
 from helpers.DatetimeHelper import DATETIME_NOW
+from helpers.ResponseCache import cached_response, invalidate_catalog
 from helpers.error.LocalError.LocalNotFoundException import LocalNotFoundException
-from models import WorkGroupModel
+from models import WorkGroupModel, WorkGroupWorkerModel
 from models.local import LocalModel
 from models.worker import WorkerModel
 from schema import DeleteParams, PublicWorkerListSchema, PublicWorkerSchema, PublicWorkerWorkGroupSchema, PublicWorkerWorkListGroupSchema, UpdateParams, WorkerListSchema, WorkerSchema, WorkerWorkGroupSchema
 from db import addAndCommit, deleteAndCommit, rollback
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import selectinload
 import traceback
 
 from globals import CONFIRMED_STATUS, DEBUG, PENDING_STATUS
 
 blp = Blueprint('worker', __name__, description='CRUD de trabajadores.')
 
-def getAllWorkers(local_id):
-    workers = set()
+def getAllWorkers(local_id, *options):
+    """
+    Workers of the local in one query after the one of the local. `options` are the
+    loader options of the relationships the response needs.
+    """
+    LocalModel.query.get_or_404(local_id)
     
-    work_groups = LocalModel.query.get_or_404(local_id).work_groups
+    workers_ids = (select(WorkGroupWorkerModel.worker_id)
+                   .join(WorkGroupModel, WorkGroupModel.id == WorkGroupWorkerModel.work_group_id)
+                   .where(WorkGroupModel.local_id == local_id))
     
-    for work_group in work_groups:
-        for worker in work_group.workers:
-            workers.add(worker)
-    
-    return workers
+    return WorkerModel.query.filter(WorkerModel.id.in_(workers_ids)).options(*options).order_by(WorkerModel.id).all()
 
 @blp.route('/local/<string:local_id>')
 class WorkersGetAll(MethodView):
 
+    @cached_response
     @blp.response(404, description='El local no existe.')
     @blp.response(200, PublicWorkerListSchema)
     def get(self, local_id):
@@ -43,13 +49,14 @@ class WorkersGetAll(MethodView):
 @blp.route('/local/<string:local_id>/work_group')
 class WorkersGetAllWorkGroups(MethodView):
 
+    @cached_response
     @blp.response(404, description='El local no existe.')
     @blp.response(200, PublicWorkerWorkListGroupSchema)
     def get(self, local_id):
         """
         Devuelve todos los datos públicos de los trabajadores de un local con sus grupos de trabajo.
         """    
-        workers = getAllWorkers(local_id)            
+        workers = getAllWorkers(local_id, selectinload(WorkerModel.work_groups_list).selectinload(WorkGroupModel.services_list))
         return {"workers": workers, "total": len(workers)}
     
 @blp.route('')
@@ -96,6 +103,7 @@ class Worker(MethodView):
         
         try:
             addAndCommit(worker, *work_groups)
+            invalidate_catalog(local.id)
         except SQLAlchemyError as e:
             traceback.print_exc()
             rollback()
@@ -206,6 +214,7 @@ class PublicWorkerByID(MethodView):
                 setattr(worker, key, value)
         
             addAndCommit(worker)
+            invalidate_catalog(get_jwt_identity())
         except SQLAlchemyError as e:
             traceback.print_exc()
             rollback()
@@ -247,6 +256,7 @@ class PublicWorkerByID(MethodView):
         
             if force: addAndCommit(*bookings)
             deleteAndCommit(worker)
+            invalidate_catalog(get_jwt_identity())
         except SQLAlchemyError as e:
             traceback.print_exc()
             rollback()
@@ -3,7 +3,7 @@ from marshmallow import Schema, ValidationError, fields, validate, pre_load, pos
 from marshmallow import Schema, fields
 from email_validator import validate_email, EmailNotValidError
 
-from globals import MIN_TIMEOUT_CONFIRM_BOOKING, TIMEOUT_CONFIRM_BOOKING
+from globals import MAX_BOOKINGS_PAGE_SIZE, MAX_BULK_BOOKINGS, MIN_TIMEOUT_CONFIRM_BOOKING, TIMEOUT_CONFIRM_BOOKING
 from helpers.security import decrypt_str, encrypt_str
 
 class SmtpSettingsSchema(Schema):
@@ -183,27 +183,27 @@ class WorkerListSchema(ListSchema):
     workers = fields.Nested(WorkerSchema, many=True, dump_only=True)
 
 class PublicWorkGroupWorkerSchema(WorkGroupSchema):
-    workers = fields.Nested(PublicWorkerSchema, many=True, dump_only=True)
+    workers = fields.Nested(PublicWorkerSchema, many=True, dump_only=True, attribute='workers_list')
 
 class PublicWorkGroupWorkerListSchema(ListSchema):
     work_groups = fields.Nested(PublicWorkGroupWorkerSchema, many=True, dump_only=True)
 
 class WorkGroupWorkerSchema(WorkGroupSchema):
-    workers = fields.Nested(WorkerSchema, many=True, dump_only=True)
+    workers = fields.Nested(WorkerSchema, many=True, dump_only=True, attribute='workers_list')
     
 class WorkGroupWorkerListSchema(ListSchema):
     work_groups = fields.Nested(WorkGroupWorkerSchema, many=True, dump_only=True)
 
 class WorkGroupServiceSchema(WorkGroupSchema):
-    services = fields.Nested(ServiceSchema, many=True, dump_only=True)
+    services = fields.Nested(ServiceSchema, many=True, dump_only=True, attribute='services_list')
     
 class WorkGroupServiceListSchema(ListSchema):
     work_groups = fields.Nested(WorkGroupServiceSchema, many=True, dump_only=True)
     
 class WorkerWorkGroupSchema(WorkerSchema):
-    work_groups = fields.Nested(WorkGroupServiceSchema(), many=True, dump_only=True)
+    work_groups = fields.Nested(WorkGroupServiceSchema(), many=True, dump_only=True, attribute='work_groups_list')
 class PublicWorkerWorkGroupSchema(PublicWorkerSchema):
-    work_groups = fields.Nested(WorkGroupServiceSchema(), many=True, dump_only=True)
+    work_groups = fields.Nested(WorkGroupServiceSchema(), many=True, dump_only=True, attribute='work_groups_list')
 class PublicWorkerWorkListGroupSchema(ListSchema):
     workers = fields.Nested(PublicWorkerWorkGroupSchema(), many=True, dump_only=True)
     
@@ -239,6 +239,16 @@ class PublicBookingSchema(Schema):
 class PublicBookingListSchema(ListSchema):
     bookings = fields.Nested(PublicBookingSchema, many=True, dump_only=True)
     
+class WorkerAvailabilitySchema(Schema):
+    worker = fields.Nested(PublicWorkerSchema(), dump_only=True)
+    slots = fields.List(fields.DateTime(), dump_only=True)
+    
+class AvailabilitySchema(ListSchema):
+    duration = fields.Int(dump_only=True)
+    interval = fields.Int(dump_only=True)
+    slots = fields.List(fields.DateTime(), dump_only=True)
+    workers = fields.Nested(WorkerAvailabilitySchema, many=True, dump_only=True)
+    
 class PublicBookingPatchSchema(Schema):
     id = fields.Int(required=True, dump_only=True)
     datetime_init = fields.DateTime(required=False)
@@ -252,7 +262,7 @@ class BookingSchema(PublicBookingSchema):
     comment = fields.Str()
     datetime_created = fields.DateTime(dump_only=True)
     datetime_updated = fields.DateTime(dump_only=True)
-    status = fields.Nested(StatusSchema(), dump_only=True)
+    status = fields.Nested(StatusSchema(), dump_only=True, attribute='current_status')
     total_price = fields.Float(required=True, dump_only=True)
     services = fields.Nested(ServiceSchema(), many=True, dump_only=True)
     uuid_log = fields.Str(required=False, dump_only=True)
@@ -267,7 +277,7 @@ class BookingPatchSchema(PublicBookingPatchSchema):
     comment = fields.Str()
     datetime_created = fields.DateTime(dump_only=True)
     datetime_updated = fields.DateTime(dump_only=True)
-    status = fields.Nested(StatusSchema(), dump_only=True)
+    status = fields.Nested(StatusSchema(), dump_only=True, attribute='current_status')
     total_price = fields.Float(required=False, dump_only=True)
     services = fields.Nested(ServiceSchema(), many=True, dump_only=True)
     
@@ -279,6 +289,7 @@ class NewBookingSchema(Schema):
     session_token = fields.Str(required=True)
     timeout = fields.Float(required=True)
     email_confirm = fields.Bool(required=True, dump_only=True)
+    email_status = fields.Str(required=True, dump_only=True)
     
 class BookingAdminSchema(BookingSchema):
     new_status = fields.Str(required=True, load_only=True)
@@ -289,11 +300,27 @@ class BookingAdminSchema(BookingSchema):
 class BookingAdminPatchSchema(BookingPatchSchema):
     new_status = fields.Str(required=False, load_only=True)
    
+class BulkBookingSchema(Schema):
+    bookings = fields.Nested(BookingSchema, many=True, required=True, validate=validate.Length(min=1, max=MAX_BULK_BOOKINGS))
+    
+class BulkBookingResultSchema(Schema):
+    index = fields.Int(required=True, dump_only=True)
+    status_code = fields.Int(required=True, dump_only=True)
+    message = fields.Str(dump_only=True)
+    booking = fields.Nested(BookingSchema(), dump_only=True)
+    
+class BulkBookingListSchema(Schema):
+    results = fields.Nested(BulkBookingResultSchema, many=True, dump_only=True)
+    created = fields.Int(dump_only=True)
+    failed = fields.Int(dump_only=True)
+    email_status = fields.Str(dump_only=True)
+    
 class BookingListSchema(ListSchema):
     bookings = fields.Nested(BookingSchema, many=True, dump_only=True)
 
 class BookingAdminListSchema(ListSchema):
     bookings = fields.Nested(BookingAdminSchema, many=True, dump_only=True)
+    next_cursor = fields.Str(dump_only=True, allow_none=True)
     
 class FileSchema(Schema):
     url = fields.Str(required=True)
@@ -313,13 +340,28 @@ class BookingParams(Schema):
 class BookingWeekParams(BookingParams):
     days = fields.Int(required=False, description='Espefica el número de días de la semana a visualizar. Default: 7.')
     
-class BookingAdminParams(BookingParams):
+class AvailabilityParams(Schema):
+    services_ids = fields.Str(required=True, description='IDs de los servicios a reservar separados por comas (Ej: 1,2).')
+    date = fields.Date(required=False, description='Espefica una fecha para ver la disponibilidad de todo el día.')
+    datetime_init = fields.DateTime(required=False, description='Espefica una fecha y hora inicial para ver la disponibilidad.')
+    datetime_end = fields.DateTime(required=False, description='Espefica una fecha y hora final para ver la disponibilidad.')
+    format = fields.Str(required=False, description='Espefica el formato de la fecha y hora. Default: %Y-%m-%d %H:%M:%S')
+    days = fields.Int(required=False, validate=validate.Range(min=1), description='Junto con date, número de días a visualizar. Default: 1.')
+    worker_id = fields.Int(required=False, description='ID del trabajador para filtrar la disponibilidad.')
+    interval = fields.Int(required=False, validate=validate.Range(min=1), description='Minutos entre dos horas de inicio. Default: 15.')
+    
+class BookingPageParams(Schema):
+    limit = fields.Int(required=False, validate=validate.Range(min=1, max=MAX_BOOKINGS_PAGE_SIZE), description='Número máximo de reservas a devolver. Activa la paginación.')
+    cursor = fields.Str(required=False, description='Cursor devuelto en next_cursor para obtener la siguiente página.')
+    stream = fields.Bool(required=False, description='Devuelve todas las reservas en una respuesta en streaming.')
+    
+class BookingAdminParams(BookingParams, BookingPageParams):
     status = fields.Str(required=False, description='Especifica el estado para filtrar las reservas (Ej: C,P).')
     name = fields.Str(required=False, description='Espefica el nombre del cliente para filtrar las reservas.')
     email = fields.Str(required=False, description='Espefica el email del cliente para filtrar las reservas.')
     tlf = fields.Str(required=False, description='Espefica el teléfono del cliente para filtrar las reservas.')
     
-class BookingAdminWeekParams(BookingWeekParams):
+class BookingAdminWeekParams(BookingWeekParams, BookingPageParams):
     status = fields.Str(required=False, description='Espefica el estado para filtrar las reservas (Ej: C,P).')
     name = fields.Str(required=False, description='Espefica el nombre del cliente para filtrar las reservas.')
     email = fields.Str(required=False, description='Espefica el email del cliente para filtrar las reservas.')
@@ -337,6 +379,9 @@ class NotifyParams(Schema):
 class UpdateParams(NotifyParams):
     force = fields.Bool(required=False, description='Fuerza la actualización del item incluso si tiene reservas.')
     
+class BulkBookingParams(UpdateParams):
+    atomic = fields.Bool(required=False, description='No crea ninguna reserva si alguna no es válida.')
+    
 class LocalAdminParams(Schema):
     name = fields.Str(required=False, description='Espefica el nombre para filtrar locales.')
     email = fields.Str(required=False, description='Espefica el email para filtrar locales.')
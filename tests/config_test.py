@@ -4,6 +4,7 @@ import traceback
 from access import Access
 from default_config import DefaultConfig
 from globals import ADMIN_IDENTITY, ADMIN_ROLE, CANCELLED_STATUS, CONFIRMED_STATUS, DONE_STATUS, JWT_ALGORITHM, LOCAL_ROLE, PENDING_STATUS, SECRET_JWT, TEST_DATABASE_URI, USER_ROLE, WEEK_DAYS
+from helpers.ReferenceData import reloadReferenceData
 from models.status import StatusModel
 from models.user_session import UserSessionModel
 from app import db as default_db
@@ -128,6 +129,8 @@ class ConfigTest(DefaultConfig):
         self.insertStatus(db)
         self.insertWeekdays(db)
         
+        reloadReferenceData()
+        
         self.createAdminToken(db)
         
         os.environ['PUBLIC_FOLDER'] = 'tests/public'
@@ -0,0 +1,21 @@
+from contextlib import contextmanager
+
+from helpers.QueryAccounting import record_queries
+
+@contextmanager
+def max_queries(test, count, repeated = None):
+    """
+    Fails `test` if the block sends more than `count` statements, or if one of them is repeated
+    more than `repeated` times.
+
+        with max_queries(self, 3, repeated=1):
+            r = self.client.get(...)
+    """
+
+    with record_queries() as stats:
+        yield stats
+
+    test.assertLessEqual(stats.count, count, stats.statements)
+
+    if repeated is not None:
+        test.assertEqual(stats.repeated(repeated), {}, f'Statements repeated more than {repeated} times (N+1).')
@@ -0,0 +1,135 @@
+# python -m unittest .\tests\test_availability.py
+
+import datetime
+import json
+import unittest
+from flask_testing import TestCase
+from app import create_app, db
+from globals import MAX_AVAILABILITY_DAYS
+from tests import config_test, getUrl, setParams
+from tests.configure_local_base import configure
+
+ENDPOINT = 'booking'
+
+class TestAvailability(TestCase):
+    def create_app(self):
+        app = create_app(config_test)
+        return app
+
+    def setUp(self):
+
+        db.create_all()
+        config_test.config(db = db)
+        self.admin_token = config_test.ADMIN_TOKEN
+
+    def tearDown(self):
+
+        db.session.remove()
+        db.drop_all()
+        config_test.drop(self.local.locals)
+
+    def configure_local(self):
+        self.local = configure(self.client, self.admin_token, self.assertEqual, set_smtp_settings=False, set_local_settings=False)
+
+    def get_availability(self, **params):
+        return self.client.get(setParams(getUrl(ENDPOINT, 'local', self.local.local['id'], 'availability'), **params), content_type='application/json')
+
+    def post_booking(self, booking):
+        return self.client.post(getUrl(ENDPOINT, 'local', self.local.local['id']), data=json.dumps(booking), content_type='application/json')
+
+    def post_close(self, close):
+        return self.client.post(getUrl('close'), data=json.dumps(close), headers={'Authorization': f"Bearer {self.local.refresh_token}"}, content_type='application/json')
+
+    def worker_slots(self, response, worker_id):
+        return [w['slots'] for w in response['workers'] if w['worker']['id'] == worker_id][0]
+
+    def test_integration_availability(self):
+
+        self.configure_local()
+
+        work_group = self.local.work_groups[0]
+        service = work_group['services'][0]
+        workers = work_group['workers']
+        date = (datetime.datetime.now() + datetime.timedelta(days=7)).strftime("%Y-%m-%d")
+
+        #1. Disponibilidad completa: 10:00-14:30 y 16:00-19:30 cada 15 minutos
+
+        r = self.get_availability(services_ids=service['id'], date=date)
+        self.assertEqual(r.status_code, 200)
+        response = r.json
+
+        self.assertEqual(response['duration'], service['duration'])
+        self.assertEqual(len(response['workers']), len(workers))
+        self.assertEqual(response['total'], 19 + 15)
+        self.assertEqual(response['slots'][0], f"{date}T10:00:00")
+        self.assertEqual(response['slots'][-1], f"{date}T19:30:00")
+
+        for worker in workers:
+            self.assertEqual(len(self.worker_slots(response, worker['id'])), 19 + 15)
+
+        #2. Una reserva ocupa los huecos del trabajador
+
+        booking = {
+            "client_name": "Client Test",
+            "client_tlf": "123456789",
+            "client_email": "client@test.com",
+            "datetime_init": f"{date} 10:00:00",
+            "services_ids": [service['id']],
+            "worker_id": workers[0]['id']
+        }
+
+        r = self.post_booking(booking)
+        self.assertEqual(r.status_code, 201)
+
+        response = self.get_availability(services_ids=service['id'], date=date).json
+        slots = self.worker_slots(response, workers[0]['id'])
+
+        self.assertNotIn(f"{date}T10:00:00", slots)
+        self.assertNotIn(f"{date}T10:15:00", slots)
+        self.assertIn(f"{date}T10:30:00", slots)
+        self.assertIn(f"{date}T10:00:00", response['slots'])
+        self.assertEqual(response['total'], 19 + 15)
+
+        r = self.get_availability(services_ids=service['id'], date=date, worker_id=workers[0]['id'])
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.json['workers']), 1)
+        self.assertEqual(r.json['total'], 19 + 15 - 2)
+
+        #3. Un cierre elimina los huecos de todos los trabajadores
+
+        r = self.post_close({"datetime_init": f"{date}T16:00:00", "datetime_end": f"{date}T20:00:00"})
+        self.assertEqual(r.status_code, 200)
+
+        response = self.get_availability(services_ids=service['id'], date=date).json
+        self.assertEqual(response['total'], 19)
+        self.assertEqual(response['slots'][-1], f"{date}T14:30:00")
+
+        #4. Servicios de varios días y duración total
+
+        services_ids = ','.join(str(s['id']) for s in work_group['services'][:2])
+        r = self.get_availability(services_ids=services_ids, date=date, days=2, interval=30)
+        self.assertEqual(r.status_code, 200)
+        response = r.json
+
+        next_date = (datetime.datetime.strptime(date, "%Y-%m-%d") + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+
+        self.assertEqual(response['duration'], 90)
+        self.assertIn(f"{next_date}T18:30:00", response['slots'])
+        self.assertNotIn(f"{next_date}T19:00:00", response['slots'])
+
+        #5. Errores
+
+        r = self.get_availability(services_ids=service['id'])
+        self.assertEqual(r.status_code, 422)
+
+        r = self.get_availability(services_ids=0, date=date)
+        self.assertEqual(r.status_code, 404)
+
+        r = self.get_availability(services_ids=f"{service['id']},{self.local.work_groups[1]['services'][0]['id']}", date=date)
+        self.assertEqual(r.status_code, 409)
+
+        r = self.get_availability(services_ids=service['id'], date=date, days=MAX_AVAILABILITY_DAYS + 1)
+        self.assertEqual(r.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,8 @@ import unittest
 from flask_testing import TestCase
 from app import create_app, db
 from globals import CANCELLED_STATUS, CONFIRMED_STATUS, DONE_STATUS, PENDING_STATUS, WEEK_DAYS, DEBUG
+from helpers.BookingController import markDoneBookings
+from models.booking import BookingModel
 from tests import config_test, getUrl, setParams
 from tests.configure_local_base import configure
 
@@ -263,6 +265,8 @@ class TestBooking(TestCase):
         #Obtener reserva despues de ser terminado
         booking['datetime_init'] = "2020-01-01 13:00:00"
         booking['worker_id'] = response['worker']['id']
+        r = self.post_booking_admin({**booking, 'services_ids': []})
+        self.assertEqual(r.status_code, 400)
         r = self.post_booking_admin(booking)
         self.assertEqual(r.status_code, 201)
         
@@ -725,6 +729,17 @@ class TestBooking(TestCase):
         for booking in r.json['bookings']:
             if booking['id'] == id: self.assertEqual(booking['status']['status'], DONE_STATUS)
         
+        #El listado no modifica el estado guardado, lo persiste el barrido
+        self.assertNotEqual(BookingModel.query.get(id).status.status, DONE_STATUS)
+        
+        r = self.get_bookings_admin(date = "2020-01-01", status = DONE_STATUS)
+        self.assertEqual(r.status_code, 200)
+        self.assertIn(id, [booking['id'] for booking in r.json['bookings']])
+        
+        self.assertGreaterEqual(markDoneBookings()['rows'], 1)
+        self.assertEqual(BookingModel.query.get(id).status.status, DONE_STATUS)
+        self.assertEqual(markDoneBookings()['rows'], 0)
+        
     def checkUpdateBookingAdmin(self, _booking):        
         #Cancelar todas las reservas
         r = self.get_bookings_admin(datetime_init = self.bookings[0]['datetime_init'], datetime_end = self.bookings[-1]['datetime_end'].replace('T', ' '), status = f"{PENDING_STATUS},{CONFIRMED_STATUS}")
@@ -0,0 +1,167 @@
+# python -m unittest .\tests\test_booking_bulk.py
+
+import datetime
+import json
+import time
+import unittest
+from unittest import mock
+from flask_testing import TestCase
+from app import create_app, db
+from helpers.BookingController import bookingLockKey
+from helpers.Database import acquire_lock, get_lock_metrics, release_lock
+from tests import config_test, getUrl, setParams
+from tests.configure_local_base import configure
+
+ENDPOINT = 'booking'
+
+class TestBookingBulk(TestCase):
+    def create_app(self):
+        app = create_app(config_test)
+        return app
+
+    def setUp(self):
+
+        db.create_all()
+        config_test.config(db = db)
+        self.admin_token = config_test.ADMIN_TOKEN
+
+    def tearDown(self):
+
+        db.session.remove()
+        db.drop_all()
+        config_test.drop(self.local.locals)
+
+    def configure_local(self):
+        self.local = configure(self.client, self.admin_token, self.assertEqual, set_smtp_settings=False, set_local_settings=False)
+
+    def post_bulk(self, bookings, **params):
+        return self.client.post(setParams(getUrl(ENDPOINT, 'bulk'), **params), data=json.dumps({'bookings': bookings}), headers={'Authorization': f"Bearer {self.local.refresh_token}"}, content_type='application/json')
+
+    def post_booking(self, booking):
+        return self.client.post(getUrl(ENDPOINT, 'local', self.local.local['id']), data=json.dumps(booking), content_type='application/json')
+
+    def get_availability(self, **params):
+        return self.client.get(setParams(getUrl(ENDPOINT, 'local', self.local.local['id'], 'availability'), **params), content_type='application/json')
+
+    def booking(self, datetime_init, services_ids, worker_id = None):
+        booking = {
+            "client_name": "client test",
+            "client_tlf": "123456789",
+            "client_email": "client@test.com",
+            "datetime_init": datetime_init,
+            "services_ids": services_ids
+        }
+
+        if worker_id: booking['worker_id'] = worker_id
+
+        return booking
+
+    def test_integration_booking_bulk(self):
+
+        self.configure_local()
+
+        work_group = self.local.work_groups[0]
+        service = work_group['services'][0]
+        workers = work_group['workers']
+        date = (datetime.datetime.now() + datetime.timedelta(days=7)).strftime("%Y-%m-%d")
+        next_date = (datetime.datetime.now() + datetime.timedelta(days=8)).strftime("%Y-%m-%d")
+        past_date = (datetime.datetime.now() - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+
+        #1. Resultado por reserva, en el mismo orden
+
+        bookings = [
+            self.booking(f"{date} 10:00:00", [service['id']], workers[0]['id']),
+            self.booking(f"{date} 10:00:00", [service['id']], workers[0]['id']),
+            self.booking(f"{date} 10:00:00", [service['id']]),
+            self.booking(f"{next_date} 16:00:00", [service['id']], workers[1]['id']),
+            self.booking(f"{date} 09:00:00", [service['id']]),
+            self.booking(f"{past_date} 10:00:00", [service['id']]),
+            self.booking(f"{date} 11:00:00", [0]),
+            self.booking(f"{date} 11:00:00", [service['id'], self.local.work_groups[1]['services'][0]['id']]),
+        ]
+
+        r = self.post_bulk(bookings)
+        self.assertEqual(r.status_code, 201)
+        response = r.json
+
+        self.assertEqual(response['created'], 3)
+        self.assertEqual(response['failed'], 5)
+        self.assertEqual([result['index'] for result in response['results']], list(range(len(bookings))))
+        self.assertEqual([result['status_code'] for result in response['results']], [201, 409, 201, 201, 409, 409, 404, 409])
+
+        created = [result['booking'] for result in response['results'] if result['status_code'] == 201]
+
+        self.assertEqual(created[0]['client_name'], 'Client Test')
+        self.assertEqual(created[0]['status']['status'], 'C')
+        self.assertEqual(created[1]['datetime_end'], f"{date}T{10 + service['duration'] // 60:02d}:{service['duration'] % 60:02d}:00")
+
+        #2. Las reservas creadas ocupan los huecos de los trabajadores
+
+        r = self.get_availability(services_ids=service['id'], date=date, worker_id=workers[0]['id'])
+        self.assertNotIn(f"{date}T10:00:00", r.json['slots'])
+
+        r = self.post_booking(self.booking(f"{date} 10:00:00", [service['id']], workers[0]['id']))
+        self.assertEqual(r.status_code, 409)
+
+        #3. Atómico: no se crea ninguna si alguna no es válida
+
+        bookings = [
+            self.booking(f"{date} 12:00:00", [service['id']], workers[0]['id']),
+            self.booking(f"{date} 10:00:00", [service['id']], workers[0]['id']),
+        ]
+
+        r = self.post_bulk(bookings, atomic=True)
+        self.assertEqual(r.status_code, 409)
+        self.assertEqual(r.json['created'], 0)
+        self.assertEqual([result['status_code'] for result in r.json['results']], [424, 409])
+
+        r = self.get_availability(services_ids=service['id'], date=date, worker_id=workers[0]['id'])
+        self.assertIn(f"{date}T12:00:00", r.json['slots'])
+
+        #4. Notificaciones en una sola tarea
+
+        r = self.post_bulk(bookings[:1], notify=True)
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(r.json['created'], 1)
+        self.assertEqual(r.json['email_status'], 'pending')
+
+        #5. Un trabajador bloqueado por otra reserva no impide asignar otro libre
+
+        locked = [bookingLockKey(self.local.local['id'], date, worker_id=worker['id']) for worker in workers[:-1]]
+
+        for key in locked:
+            self.assertTrue(acquire_lock(key, 'bulk', exp=60, timeout=0))
+
+        metrics = get_lock_metrics()
+        time_init = time.monotonic()
+
+        r = self.post_booking(self.booking(f"{date} 17:00:00", [service['id']]))
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(r.json['booking']['worker']['id'], workers[-1]['id'])
+        self.assertLess(time.monotonic() - time_init, 1)
+        self.assertEqual(get_lock_metrics()['timeouts'], metrics['timeouts'])
+
+        #6. Con todos los trabajadores libres ocupados se espera y después se responde 503
+
+        self.assertTrue(acquire_lock(bookingLockKey(self.local.local['id'], date, worker_id=workers[-1]['id']), 'bulk', exp=60, timeout=0))
+        locked.append(bookingLockKey(self.local.local['id'], date, worker_id=workers[-1]['id']))
+
+        with mock.patch('helpers.BookingController.MAX_TIMEOUT_WAIT_BOOKING', 0.2):
+            r = self.post_booking(self.booking(f"{date} 18:00:00", [service['id']]))
+
+        self.assertEqual(r.status_code, 503)
+        self.assertGreater(get_lock_metrics()['busy'], metrics['busy'])
+
+        for key in locked:
+            self.assertTrue(release_lock(key, 'bulk'))
+
+        #7. Errores
+
+        r = self.post_bulk([])
+        self.assertEqual(r.status_code, 422)
+
+        r = self.client.post(getUrl(ENDPOINT, 'bulk'), data=json.dumps({'bookings': bookings}), content_type='application/json')
+        self.assertEqual(r.status_code, 401)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+# python -m unittest .\tests\test_booking_list.py
+
+import datetime
+import json
+import unittest
+from flask_testing import TestCase
+from app import create_app, db
+from tests import config_test, getUrl, setParams
+from tests.configure_local_base import configure
+from tests.query_counter import max_queries
+
+ENDPOINT = 'booking'
+
+class TestBookingList(TestCase):
+    def create_app(self):
+        app = create_app(config_test)
+        return app
+
+    def setUp(self):
+
+        db.create_all()
+        config_test.config(db = db)
+        self.admin_token = config_test.ADMIN_TOKEN
+
+    def tearDown(self):
+
+        db.session.remove()
+        db.drop_all()
+        config_test.drop(self.local.locals)
+
+    def configure_local(self):
+        self.local = configure(self.client, self.admin_token, self.assertEqual, set_smtp_settings=False, set_local_settings=False)
+
+    def post_bulk(self, bookings):
+        return self.client.post(getUrl(ENDPOINT, 'bulk'), data=json.dumps({'bookings': bookings}), headers={'Authorization': f"Bearer {self.local.refresh_token}"}, content_type='application/json')
+
+    def get_bookings_admin(self, *path, **params):
+        return self.client.get(setParams(getUrl(ENDPOINT, 'all', *path), **params), headers={'Authorization': f"Bearer {self.local.refresh_token}"}, content_type='application/json')
+
+    def get_pages(self, *path, **params):
+        bookings = []
+        cursor = None
+
+        while True:
+            r = self.get_bookings_admin(*path, **params, **({'cursor': cursor} if cursor else {}))
+            self.assertEqual(r.status_code, 200)
+            self.assertLessEqual(r.json['total'], params['limit'])
+
+            bookings += r.json['bookings']
+            cursor = r.json['next_cursor']
+
+            if not cursor:
+                return bookings
+
+    def booking(self, datetime_init, services_ids, worker_id):
+        return {
+            "client_name": "client test",
+            "client_tlf": "123456789",
+            "client_email": "client@test.com",
+            "datetime_init": datetime_init,
+            "services_ids": services_ids,
+            "worker_id": worker_id
+        }
+
+    def test_integration_booking_list(self):
+
+        self.configure_local()
+
+        work_group = self.local.work_groups[0]
+        service = work_group['services'][0]
+        workers = work_group['workers']
+        date = (datetime.datetime.now() + datetime.timedelta(days=7)).strftime("%Y-%m-%d")
+
+        bookings = [self.booking(f"{date} {hour}:00:00", [service['id']], worker['id']) for hour in (10, 12, 16, 18) for worker in workers]
+
+        r = self.post_bulk(bookings)
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(r.json['created'], len(bookings))
+
+        r = self.get_bookings_admin(date=date)
+        self.assertEqual(r.status_code, 200)
+        self.assertNotIn('next_cursor', r.json)
+
+        expected = sorted(r.json['bookings'], key=lambda booking: (booking['datetime_init'], booking['id']))
+        self.assertEqual(len(expected), len(bookings))
+
+        #1. Paginación por cursor: todas las reservas, ordenadas y sin repetir
+
+        self.assertEqual(self.get_pages(date=date, limit=5), expected)
+        self.assertEqual(self.get_pages(date=date, limit=len(bookings)), expected)
+
+        for path in (('week',), ('month',)):
+            self.assertEqual([booking['id'] for booking in self.get_pages(*path, date=date, limit=3)], [booking['id'] for booking in expected])
+
+        #2. Los filtros se mantienen entre páginas
+
+        worker_bookings = self.get_pages(date=date, limit=2, worker_id=workers[0]['id'])
+        self.assertEqual([booking['id'] for booking in worker_bookings], [booking['id'] for booking in expected if booking['worker']['id'] == workers[0]['id']])
+
+        self.assertEqual(self.get_pages(date=date, limit=2, status='X'), [])
+
+        #3. Streaming: el mismo contenido que sin paginar
+
+        r = self.get_bookings_admin(date=date, stream=True)
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.is_streamed)
+
+        response = json.loads(r.get_data(as_text=True))
+        self.assertEqual(response['total'], len(bookings))
+        self.assertEqual(response['bookings'], expected)
+
+        r = self.get_bookings_admin(date=date, stream=True, cursor=self.get_bookings_admin(date=date, limit=5).json['next_cursor'])
+        self.assertEqual(json.loads(r.get_data(as_text=True))['bookings'], expected[5:])
+
+        r = self.get_bookings_admin(date=date, stream=True, worker_id=workers[1]['id'])
+        self.assertEqual(json.loads(r.get_data(as_text=True))['total'], len(bookings) // len(workers))
+
+        #4. Número de consultas constante, sin cargar las relaciones de cada reserva (N+1)
+
+        for params in ({'limit': 5}, {'limit': len(bookings)}, {'stream': True}):
+            db.session.expunge_all()
+
+            with max_queries(self, 8, repeated=2):
+                r = self.get_bookings_admin(date=date, **params)
+                r.get_data()
+
+        #5. Errores
+
+        r = self.get_bookings_admin(date=date, cursor='not-a-cursor')
+        self.assertEqual(r.status_code, 400)
+
+        r = self.get_bookings_admin(date=date, stream=True, cursor='not-a-cursor')
+        self.assertEqual(r.status_code, 400)
+
+        r = self.get_bookings_admin(date=date, limit=0)
+        self.assertEqual(r.status_code, 422)
+
+        r = self.get_bookings_admin(date=date, limit=100000)
+        self.assertEqual(r.status_code, 422)
+
+if __name__ == '__main__':
+    unittest.main()
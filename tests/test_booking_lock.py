@@ -0,0 +1,69 @@
+# python -m unittest .\tests\test_booking_lock.py
+
+import os
+import threading
+import time
+import unittest
+
+from helpers.Database import acquire_lock, get_lock_metrics, release_lock, reset_lock_metrics
+
+KEY = 'booking_lock:test:worker:1:2030-01-01'
+
+class TestBookingLock(unittest.TestCase):
+
+    def setUp(self):
+        os.environ['REDIS_TEST_MODE'] = 'True'
+        reset_lock_metrics()
+
+    def test_integration_booking_lock(self):
+
+        #1. Solo el propietario puede liberar el bloqueo
+
+        self.assertTrue(acquire_lock(KEY, 'owner', timeout=1))
+        self.assertFalse(acquire_lock(KEY, 'other', timeout=0.1))
+        self.assertFalse(release_lock(KEY, 'other'))
+        self.assertTrue(release_lock(KEY, 'owner'))
+
+        #2. Un bloqueo por trabajador no bloquea a otro trabajador
+
+        self.assertTrue(acquire_lock(KEY, 'owner', timeout=1))
+        self.assertTrue(acquire_lock(KEY.replace('worker:1', 'worker:2'), 'other', timeout=0))
+        self.assertTrue(release_lock(KEY.replace('worker:1', 'worker:2'), 'other'))
+
+        #3. La espera se despierta al liberar el bloqueo
+
+        waited = {}
+
+        def waiter():
+            time_init = time.monotonic()
+            waited['acquired'] = acquire_lock(KEY, 'waiter', timeout=5)
+            waited['time'] = time.monotonic() - time_init
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        time.sleep(0.2)
+        release_lock(KEY, 'owner')
+        thread.join()
+
+        self.assertTrue(waited['acquired'])
+        self.assertLess(waited['time'], 1)
+        self.assertTrue(release_lock(KEY, 'waiter'))
+
+        #4. Un bloqueo caducado se puede volver a adquirir
+
+        self.assertTrue(acquire_lock(KEY, 'owner', exp=0.2, timeout=0))
+        self.assertTrue(acquire_lock(KEY, 'other', timeout=1))
+        self.assertFalse(release_lock(KEY, 'owner'))
+        self.assertTrue(release_lock(KEY, 'other'))
+
+        #5. Métricas de contención
+
+        metrics = get_lock_metrics()
+
+        self.assertEqual(metrics['timeouts'], 1)
+        self.assertEqual(metrics['contended'], 3)
+        self.assertEqual(metrics['lost'], 2)
+        self.assertGreater(metrics['max_wait_time'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
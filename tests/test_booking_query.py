@@ -0,0 +1,102 @@
+# python -m unittest .\tests\test_booking_query.py
+
+import datetime
+import itertools
+import json
+import unittest
+from flask_testing import TestCase
+from app import create_app, db
+from helpers.BookingController import getBookings
+from helpers.QueryAccounting import record_queries
+from tests import config_test, getUrl
+from tests.configure_local_base import configure
+
+ENDPOINT = 'booking'
+
+class TestBookingQuery(TestCase):
+    def create_app(self):
+        app = create_app(config_test)
+        return app
+
+    def setUp(self):
+
+        db.create_all()
+        config_test.config(db = db)
+        self.admin_token = config_test.ADMIN_TOKEN
+
+    def tearDown(self):
+
+        db.session.remove()
+        db.drop_all()
+        config_test.drop(self.local.locals)
+
+    def configure_local(self):
+        self.local = configure(self.client, self.admin_token, self.assertEqual, set_smtp_settings=False, set_local_settings=False)
+
+    def post_bulk(self, bookings):
+        return self.client.post(getUrl(ENDPOINT, 'bulk'), data=json.dumps({'bookings': bookings}), headers={'Authorization': f"Bearer {self.local.refresh_token}"}, content_type='application/json')
+
+    def booking(self, hour, name, service, worker):
+        return {
+            "client_name": name,
+            "client_tlf": "123456789",
+            "client_email": "client@test.com",
+            "datetime_init": f"{self.date} {hour}:00:00",
+            "services_ids": [service['id']],
+            "worker_id": worker['id']
+        }
+
+    def test_integration_booking_query(self):
+
+        self.configure_local()
+
+        work_group_0, work_group_1 = self.local.work_groups[0], self.local.work_groups[1]
+        service_0, service_1 = work_group_0['services'][0], work_group_0['services'][1]
+        worker_1, worker_2, worker_3 = self.local.workers
+        self.date = (datetime.datetime.now() + datetime.timedelta(days=7)).strftime("%Y-%m-%d")
+
+        r = self.post_bulk([
+            self.booking(10, "Ana Ruiz", service_0, worker_1),
+            self.booking(11, "Luis Gil", service_1, worker_2),
+            self.booking(16, "Ana Gil", work_group_1['services'][0], worker_2),
+            self.booking(12, "Eva Sol", service_0, worker_3),
+        ])
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(r.json['created'], 4)
+
+        bookings = [result['booking'] for result in r.json['results']]
+        work_groups = {service['id']: work_group['id'] for work_group in self.local.work_groups for service in work_group['services']}
+
+        datetime_init = datetime.datetime.strptime(self.date, "%Y-%m-%d")
+        datetime_end = datetime_init + datetime.timedelta(days=1)
+
+        filters = itertools.product(
+            [None, ['C'], ['P']],
+            [None, worker_2['id']],
+            [None, service_0['id']],
+            [None, work_group_1['id']],
+            [None, {'name': 'gil', 'email': None, 'tlf': None}],
+        )
+
+        #1. Una consulta para el local y una para las reservas, sean cuales sean los filtros
+
+        for status, worker_id, service_id, work_group_id, client_filter in filters:
+
+            expected = [booking['id'] for booking in bookings
+                        if (not status or booking['status']['status'] in status)
+                        and (not worker_id or booking['worker']['id'] == worker_id)
+                        and (not service_id or service_id in [service['id'] for service in booking['services']])
+                        and (not work_group_id or work_groups[booking['services'][0]['id']] == work_group_id)
+                        and (not client_filter or client_filter['name'] in booking['client_name'].lower())]
+
+            db.session.expunge_all()
+
+            with record_queries() as counter:
+                result = getBookings(self.local.local['id'], datetime_init, datetime_end, status=status, worker_id=worker_id, service_id=service_id, work_group_id=work_group_id, client_filter=client_filter)
+
+            self.assertEqual(sorted(booking.id for booking in result), sorted(expected), (status, worker_id, service_id, work_group_id, client_filter))
+            self.assertEqual(counter.count, 2, counter.statements)
+            self.assertIn('FROM booking', counter.statements[1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+# python -m unittest .\tests\test_booking_search.py
+
+import datetime
+import json
+import unittest
+from flask_testing import TestCase
+from app import create_app, db
+from tests import config_test, getUrl, setParams
+from tests.configure_local_base import configure
+
+ENDPOINT = 'booking'
+
+class TestBookingSearch(TestCase):
+    def create_app(self):
+        app = create_app(config_test)
+        return app
+
+    def setUp(self):
+
+        db.create_all()
+        config_test.config(db = db)
+        self.admin_token = config_test.ADMIN_TOKEN
+
+    def tearDown(self):
+
+        db.session.remove()
+        db.drop_all()
+        config_test.drop(self.local.locals)
+
+    def configure_local(self):
+        self.local = configure(self.client, self.admin_token, self.assertEqual, set_smtp_settings=False, set_local_settings=False)
+
+    def post_bulk(self, bookings):
+        return self.client.post(getUrl(ENDPOINT, 'bulk'), data=json.dumps({'bookings': bookings}), headers={'Authorization': f"Bearer {self.local.refresh_token}"}, content_type='application/json')
+
+    def put_booking_admin(self, id, booking):
+        return self.client.put(getUrl(ENDPOINT, id), data=json.dumps(booking), headers={'Authorization': f"Bearer {self.local.refresh_token}"}, content_type='application/json')
+
+    def search(self, **params):
+        r = self.client.get(setParams(getUrl(ENDPOINT, 'all'), date=self.date, **params), headers={'Authorization': f"Bearer {self.local.refresh_token}"}, content_type='application/json')
+        self.assertEqual(r.status_code, 200)
+        return sorted(booking['client_name'] for booking in r.json['bookings'])
+
+    def booking(self, hour, name, tlf, email):
+        return {
+            "client_name": name,
+            "client_tlf": tlf,
+            "client_email": email,
+            "datetime_init": f"{self.date} {hour}:00:00",
+            "services_ids": [self.service['id']],
+            "worker_id": self.worker['id']
+        }
+
+    def test_integration_booking_search(self):
+
+        self.configure_local()
+
+        self.service = self.local.work_groups[0]['services'][0]
+        self.worker = self.local.work_groups[0]['workers'][0]
+        self.date = (datetime.datetime.now() + datetime.timedelta(days=7)).strftime("%Y-%m-%d")
+
+        r = self.post_bulk([
+            self.booking(10, "José Núñez", "+34612345678", "Jose.Nunez@Test.com"),
+            self.booking(11, "maria lopez", "612-999 000", "maria_lopez@test.com"),
+            self.booking(12, "Pedro Gómez", "699888777", "pedro@example.org"),
+        ])
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(r.json['created'], 3)
+
+        jose, maria, pedro = [result['booking'] for result in r.json['results']]
+
+        #1. Teléfono: solo se comparan los dígitos
+
+        self.assertEqual(self.search(tlf='612'), ['José Núñez', 'Maria Lopez'])
+        self.assertEqual(self.search(tlf='612 345'), ['José Núñez'])
+        self.assertEqual(self.search(tlf='345-678'), ['José Núñez'])
+        self.assertEqual(self.search(tlf='69'), ['Pedro Gómez'])
+        self.assertEqual(self.search(tlf='9'), [])
+        self.assertEqual(self.search(tlf='abc'), [])
+
+        #2. Nombre: sin mayúsculas ni acentos
+
+        self.assertEqual(self.search(name='nunez'), ['José Núñez'])
+        self.assertEqual(self.search(name='GÓMEZ'), ['Pedro Gómez'])
+        self.assertEqual(self.search(name='ez'), [])
+        self.assertEqual(self.search(name='pe'), ['Pedro Gómez'])
+        self.assertEqual(self.search(name='o'), [])
+
+        #3. Email: sin mayúsculas, los comodines se buscan literalmente
+
+        self.assertEqual(self.search(email='jose.nunez@test'), ['José Núñez'])
+        self.assertEqual(self.search(email='test.com'), ['José Núñez', 'Maria Lopez'])
+        self.assertEqual(self.search(email='a_l'), ['Maria Lopez'])
+        self.assertEqual(self.search(email='%'), [])
+
+        #4. Filtros combinados y paginación
+
+        self.assertEqual(self.search(tlf='612', email='maria'), ['Maria Lopez'])
+        self.assertEqual(self.search(tlf='612', limit=1, name='lopez'), ['Maria Lopez'])
+
+        #5. Al modificar el cliente se actualiza el índice
+
+        booking = self.booking(11, "Maria Ruiz", "633 111 222", maria['client_email'])
+        booking['new_status'] = 'C'
+        r = self.put_booking_admin(maria['id'], booking)
+        self.assertEqual(r.status_code, 200)
+
+        self.assertEqual(self.search(name='lopez'), [])
+        self.assertEqual(self.search(name='ruiz'), ['Maria Ruiz'])
+        self.assertEqual(self.search(tlf='612'), ['José Núñez'])
+        self.assertEqual(self.search(tlf='111222'), ['Maria Ruiz'])
+
+        self.assertEqual(pedro['client_name'], 'Pedro Gómez')
+        self.assertEqual(jose['client_tlf'], '+34612345678')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+# python -m unittest .\tests\test_catalog_queries.py
+
+import json
+import unittest
+from flask_testing import TestCase
+from app import create_app, db
+from helpers.QueryAccounting import record_queries
+from helpers.ResponseCache import invalidate_catalog
+from tests import config_test, getUrl
+from tests.configure_local_base import configure
+
+ENDPOINTS = {
+    ('service', 'local'): 3,
+    ('worker', 'local'): 2,
+    ('worker', 'local', 'work_group'): 4,
+    ('work_group', 'local'): 2,
+    ('work_group', 'local', 'workers'): 3,
+    ('work_group', 'local', 'services'): 3,
+}
+
+class TestCatalogQueries(TestCase):
+    def create_app(self):
+        app = create_app(config_test)
+        return app
+
+    def setUp(self):
+
+        db.create_all()
+        config_test.config(db = db)
+        self.admin_token = config_test.ADMIN_TOKEN
+
+    def tearDown(self):
+
+        db.session.remove()
+        db.drop_all()
+        config_test.drop(self.local.locals)
+
+    def configure_local(self):
+        self.local = configure(self.client, self.admin_token, self.assertEqual, set_smtp_settings=False, set_local_settings=False)
+
+    def post(self, endpoint, data):
+        r = self.client.post(getUrl(endpoint), data=json.dumps(data), headers={'Authorization': f"Bearer {self.local.refresh_token}"}, content_type='application/json')
+        self.assertEqual(r.status_code, 201)
+
+    def count_queries(self):
+        """
+        Queries and response of every endpoint, without the response cache.
+        """
+
+        local_id = self.local.local['id']
+        counts = {}
+
+        for (blueprint, *path), expected in ENDPOINTS.items():
+
+            invalidate_catalog(local_id)
+            db.session.expunge_all()
+
+            with record_queries() as counter:
+                r = self.client.get(getUrl(blueprint, path[0], local_id, *path[1:]))
+
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(counter.count, expected, (blueprint, *path, counter.statements))
+            self.assertEqual(counter.repeated(1), {}, (blueprint, *path))
+
+            counts[(blueprint, *path)] = r.json
+
+        return counts
+
+    def test_integration_catalog_queries(self):
+
+        self.configure_local()
+
+        work_groups = [work_group['id'] for work_group in self.local.work_groups]
+
+        #1. Consultas con los datos iniciales
+
+        small = self.count_queries()
+
+        self.assertEqual(small[('service', 'local')]['total'], 9)
+        self.assertEqual(small[('worker', 'local')]['total'], 3)
+
+        #2. Más trabajadores y servicios, mismas consultas
+
+        for i in range(4):
+            self.post('service', {"name": f"service extra {i}", "duration": 30, "price": 10, "work_group": work_groups[i % len(work_groups)]})
+            self.post('worker', {"name": f"worker extra {i}", "last_name": "extra", "work_groups": work_groups[:i % len(work_groups) + 1]})
+
+        big = self.count_queries()
+
+        self.assertEqual(big[('service', 'local')]['total'], 13)
+        self.assertEqual(big[('worker', 'local')]['total'], 7)
+
+        workers = {worker['name']: worker for worker in big[('worker', 'local', 'work_group')]['workers']}
+
+        self.assertEqual([work_group['id'] for work_group in workers['worker extra 2']['work_groups']], work_groups)
+        self.assertEqual(len(workers['worker extra 2']['work_groups'][0]['services']), 5)
+        self.assertEqual([worker['name'] for worker in big[('work_group', 'local', 'workers')]['work_groups'][1]['workers']], ['worker test 2', 'worker extra 1', 'worker extra 2'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+# python -m unittest .\tests\test_closed.py
+
+import datetime
+import json
+import unittest
+from flask_testing import TestCase
+from app import create_app, db
+from helpers.closed import purgeClosedDays
+from models.closed import ClosedModel
+from tests import config_test, getUrl, setParams
+from tests.configure_local_base import configure
+
+ENDPOINT = 'close'
+
+class TestClosed(TestCase):
+    def create_app(self):
+        app = create_app(config_test)
+        return app
+
+    def setUp(self):
+
+        db.create_all()
+        config_test.config(db = db)
+        self.admin_token = config_test.ADMIN_TOKEN
+
+    def tearDown(self):
+
+        db.session.remove()
+        db.drop_all()
+        config_test.drop(self.local.locals)
+
+    def configure_local(self):
+        self.local = configure(self.client, self.admin_token, self.assertEqual, set_smtp_settings=False, set_local_settings=False)
+
+    def post_close(self, init, end):
+        return self.client.post(getUrl(ENDPOINT), data=json.dumps({"datetime_init": f"{self.date}T{init}", "datetime_end": f"{self.date}T{end}"}), headers={'Authorization': f"Bearer {self.local.refresh_token}"}, content_type='application/json')
+
+    def put_close(self, close_id, init, end):
+        return self.client.put(getUrl(ENDPOINT, close_id), data=json.dumps({"datetime_init": f"{self.date}T{init}", "datetime_end": f"{self.date}T{end}"}), headers={'Authorization': f"Bearer {self.local.refresh_token}"}, content_type='application/json')
+
+    def get_closes(self, **params):
+        r = self.client.get(setParams(getUrl(ENDPOINT, 'local', self.local.local['id']), **params), content_type='application/json')
+        self.assertEqual(r.status_code, 200)
+        return [close['id'] for close in r.json]
+
+    def test_integration_closed(self):
+
+        self.configure_local()
+
+        self.date = (datetime.datetime.now() + datetime.timedelta(days=7)).strftime("%Y-%m-%d")
+
+        #1. Cierres que no se cruzan
+
+        r = self.post_close("10:00:00", "12:00:00")
+        self.assertEqual(r.status_code, 200)
+        morning = r.json['id']
+
+        r = self.post_close("16:00:00", "18:00:00")
+        self.assertEqual(r.status_code, 200)
+        afternoon = r.json['id']
+
+        r = self.post_close("12:00:00", "16:00:00")
+        self.assertEqual(r.status_code, 200)
+        midday = r.json['id']
+
+        #2. Cierres que se cruzan, también si contienen a otro
+
+        self.assertEqual(self.post_close("11:00:00", "13:00:00").status_code, 409)
+        self.assertEqual(self.post_close("09:00:00", "10:30:00").status_code, 409)
+        self.assertEqual(self.post_close("09:00:00", "20:00:00").status_code, 409)
+        self.assertEqual(self.post_close("12:00:00", "10:00:00").status_code, 400)
+
+        self.assertEqual(self.put_close(midday, "12:30:00", "15:30:00").status_code, 200)
+        self.assertEqual(self.put_close(midday, "11:30:00", "15:30:00").status_code, 409)
+
+        #3. Consulta por rango
+
+        self.assertEqual(self.get_closes(), [morning, midday, afternoon])
+        self.assertEqual(self.get_closes(datetime_init=f"{self.date}T12:10:00", datetime_end=f"{self.date}T16:00:00"), [midday, afternoon])
+        self.assertEqual(self.get_closes(datetime_init=f"{self.date}T18:30:00"), [])
+
+        #4. Los cierres terminados no se devuelven y se eliminan en bloque
+
+        yesterday = datetime.datetime.now() - datetime.timedelta(days=1)
+
+        db.session.add(ClosedModel(local_id=self.local.local['id'], datetime_init=yesterday - datetime.timedelta(hours=2), datetime_end=yesterday))
+        db.session.commit()
+
+        self.assertEqual(self.get_closes(), [morning, midday, afternoon])
+
+        self.assertEqual(purgeClosedDays(), 1)
+        self.assertEqual(ClosedModel.query.count(), 3)
+
+if __name__ == '__main__':
+    unittest.main()
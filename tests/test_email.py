@@ -193,6 +193,7 @@ class TestEmail(TestCase):
         
         self.assertEqual(response['booking']['status']['status'], PENDING_STATUS)
         self.assertEqual(response['email_confirm'], True)
+        self.assertEqual(response['email_status'], 'pending')
         
         self.check_email_booking('email_confirm', True, response['booking']['id'])
         
@@ -0,0 +1,88 @@
+# python -m unittest .\tests\test_email_template.py
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from globals import KEYWORDS_PAGES
+from helpers.EmailTemplate import get_template, invalidate_template, render_template, template_metrics
+from helpers.path import generatePagePath
+
+LOCAL_ID = 'local_template_test'
+PAGE = generatePagePath('email_test.html')
+
+TEMPLATE = f"""<html><head><title>Reserva en {KEYWORDS_PAGES['LOCAL_NAME']}</title></head>
+<body>Hola {KEYWORDS_PAGES['CLIENT_NAME']}, tu cita es el {KEYWORDS_PAGES['DATE']} a las {KEYWORDS_PAGES['TIME']}.
+<a href="{KEYWORDS_PAGES['ADDRESS-MAPS']}">{KEYWORDS_PAGES['ADDRESS']}</a> {KEYWORDS_PAGES['BOOKING_TOKEN']}</body></html>"""
+
+class TestEmailTemplate(unittest.TestCase):
+
+    def setUp(self):
+        self.public_folder = os.getenv('PUBLIC_FOLDER', None)
+        self.folder = tempfile.mkdtemp()
+        os.environ['PUBLIC_FOLDER'] = self.folder
+        os.makedirs(os.path.dirname(os.path.join(self.folder, LOCAL_ID, PAGE)))
+        self.write(TEMPLATE)
+
+    def tearDown(self):
+        invalidate_template(LOCAL_ID)
+        shutil.rmtree(self.folder)
+        if self.public_folder is None: os.environ.pop('PUBLIC_FOLDER')
+        else: os.environ['PUBLIC_FOLDER'] = self.public_folder
+
+    def write(self, content):
+        with open(os.path.join(self.folder, LOCAL_ID, PAGE), 'w', encoding='utf-8') as file:
+            file.write(content)
+
+    def test_integration_email_template(self):
+
+        values = {
+            'LOCAL_NAME': 'Local Test',
+            'CLIENT_NAME': KEYWORDS_PAGES['DATE'],
+            'DATE': '01/01/2030',
+            'TIME': '10:00',
+            'ADDRESS-MAPS': 'https://maps.test',
+            'ADDRESS': 'Calle Test',
+        }
+
+        #1. Sustitución en una sola pasada y asunto
+
+        hits, misses = template_metrics['hits'], template_metrics['misses']
+
+        body, subject = render_template(get_template(LOCAL_ID, PAGE), values)
+
+        self.assertEqual(subject, 'Reserva en Local Test')
+        self.assertIn(f"Hola {KEYWORDS_PAGES['DATE']}, tu cita es el 01/01/2030 a las 10:00.", body)
+        self.assertIn('<a href="https://maps.test">Calle Test</a>', body)
+        self.assertIn(KEYWORDS_PAGES['BOOKING_TOKEN'], body)
+
+        #2. La plantilla compilada se reutiliza
+
+        self.assertIs(get_template(LOCAL_ID, PAGE), get_template(LOCAL_ID, PAGE))
+        self.assertEqual(template_metrics['misses'], misses + 1)
+        self.assertEqual(template_metrics['hits'], hits + 2)
+
+        #3. Se vuelve a compilar si el archivo cambia
+
+        self.write(TEMPLATE.replace('Reserva en', 'Cita en'))
+
+        _, subject = render_template(get_template(LOCAL_ID, PAGE), values)
+        self.assertEqual(subject, 'Cita en Local Test')
+        self.assertEqual(template_metrics['misses'], misses + 2)
+
+        #4. Invalidación al subir o eliminar la página
+
+        invalidate_template(LOCAL_ID, PAGE)
+        get_template(LOCAL_ID, PAGE)
+        self.assertEqual(template_metrics['misses'], misses + 3)
+
+        #5. Plantilla sin título
+
+        self.write('<html><body>Sin asunto</body></html>')
+
+        with self.assertRaises(ValueError):
+            get_template(LOCAL_ID, PAGE)
+
+if __name__ == '__main__':
+    unittest.main()
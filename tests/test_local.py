@@ -2,9 +2,13 @@
 
 import json
 import unittest
+from unittest import mock
 from flask_testing import TestCase
 from app import create_app, db
 from globals import MIN_TIMEOUT_CONFIRM_BOOKING, TIMEOUT_CONFIRM_BOOKING
+from helpers import TokenCache
+from helpers.security import decodeToken
+from helpers.TokenCache import clear_local_session_tokens, get_session_token, get_token_cache_metrics, invalidate_session_tokens
 from tests import config_test, getUrl
 
 ENDPOINT = 'local'
@@ -135,6 +139,51 @@ class TestLocal(TestCase):
         response = self.client.get(getUrl(ENDPOINT), headers={'Authorization': f"Bearer {self.refresh_token}"}, content_type='application/json')
         self.assertEqual(response.status_code, 401)
         
+    def token_cache(self):
+        response = self.client.get(getUrl(ENDPOINT), headers={'Authorization': f"Bearer {self.refresh_token}"}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        
+        metrics = get_token_cache_metrics()
+        
+        for _ in range(3):
+            response = self.client.get(getUrl(ENDPOINT), headers={'Authorization': f"Bearer {self.refresh_token}"}, content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+        
+        cached = get_token_cache_metrics()
+        self.assertEqual(cached['misses'], metrics['misses'])
+        self.assertEqual(cached['local_hits'] + cached['redis_hits'], metrics['local_hits'] + metrics['redis_hits'] + 3)
+        
+    def token_cache_revoked(self, token):
+        metrics = get_token_cache_metrics()
+        
+        response = self.client.get(getUrl(ENDPOINT), headers={'Authorization': f"Bearer {token}"}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+        
+        self.assertEqual(get_token_cache_metrics()['negative_hits'], metrics['negative_hits'] + 1)
+        
+    def token_cache_race(self):
+        token = self.client.post(getUrl(ENDPOINT, 'login'), data=json.dumps({'email': self.data['email'], 'password': self.password_generated}), content_type='application/json').json['refresh_token']
+        payload = decodeToken(token)
+        
+        get_key_value_cache = TokenCache.get_key_value_cache
+        revoked = []
+        
+        def revoke_after_read(key):
+            cached = get_key_value_cache(key)
+            if not revoked:
+                # Another process revokes the token between the read of the cache and the write of the row read.
+                revoked.append(key)
+                invalidate_session_tokens(payload['token'])
+            return cached
+        
+        with mock.patch('helpers.TokenCache.get_key_value_cache', side_effect=revoke_after_read):
+            self.assertIsNone(get_session_token(payload['token'], payload['exp']))
+        
+        clear_local_session_tokens()
+        
+        response = self.client.get(getUrl(ENDPOINT), headers={'Authorization': f"Bearer {token}"}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+        
     def logout_all_local(self):
         refresh_token1 = self.client.post(getUrl(ENDPOINT, 'login'), data=json.dumps({'email': self.data['email'], 'password': self.password_generated}), content_type='application/json').json['refresh_token']
         refresh_token2 = self.client.post(getUrl(ENDPOINT, 'login'), data=json.dumps({'email': self.data['email'], 'password': self.password_generated}), content_type='application/json').json['refresh_token']
@@ -847,8 +896,13 @@ class TestLocal(TestCase):
         #Login
         self.login_local()
         
+        #Token cache
+        self.token_cache()
+        self.token_cache_race()
+        
         #Logout
         self.logout_local()        
+        self.token_cache_revoked(self.refresh_token)
         
         #Logout All
         self.logout_all_local()
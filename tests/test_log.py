@@ -0,0 +1,156 @@
+# python -m unittest .\tests\test_log.py
+
+import logging
+import queue
+import threading
+import unittest
+
+from flask import Flask, Response
+
+import globals
+from globals import LOG_REDACTED, flush_logs, get_log_metrics, getLogger, log, setLogger, stop_log_writer
+
+class ListHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+class Lazy:
+
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return 'lazy'
+
+class TestLog(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = getLogger()
+        self.cache = (globals.LOG_CACHE_TTL, globals.LOG_CACHE_SIZE)
+        self.level, self.body_max_length = globals.LOGGING_LEVEL, globals.LOG_BODY_MAX_LENGTH
+        self.handler = ListHandler()
+
+        logger = logging.getLogger('booking_app_test_log')
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+        logger.addHandler(self.handler)
+
+        # Lines left by other tests are written first, so the buffers of this one are the only ones.
+        stop_log_writer()
+
+        setLogger(logger)
+
+    def tearDown(self):
+        globals.LOG_CACHE_TTL, globals.LOG_CACHE_SIZE = self.cache
+        globals.LOGGING_LEVEL, globals.LOG_BODY_MAX_LENGTH = self.level, self.body_max_length
+        flush_logs()
+        logging.getLogger('booking_app_test_log').removeHandler(self.handler)
+        setLogger(self.logger)
+
+    def messages(self, uuid):
+        return [message for message in self.handler.messages if message.startswith(f"[{uuid}]")]
+
+    def test_integration_log(self):
+
+        #1. Las líneas de cada petición se escriben juntas y en orden por un solo hilo
+
+        for request in range(50):
+            for line in range(3):
+                log(f"line {line}", uuid=f"request-{request}")
+            log("end", uuid=f"request-{request}", save_cache=True)
+
+        flush_logs()
+
+        self.assertEqual(self.messages('request-7'), ['[request-7]: line 0', '[request-7]: line 1', '[request-7]: line 2', '[request-7]: end'])
+        self.assertEqual(len([thread for thread in threading.enumerate() if thread.name == 'log-writer']), 1)
+        self.assertNotIn('request-7', globals.cache_log)
+
+        #2. Las peticiones que no se guardan se escriben al caducar o al superar el límite
+
+        globals.LOG_CACHE_TTL = 0
+        log("never flushed", uuid='aborted')
+
+        evicted = get_log_metrics()['evicted']
+        log("next request", uuid='next')
+        flush_logs()
+
+        self.assertEqual(self.messages('aborted'), ['[aborted]: never flushed'])
+
+        globals.LOG_CACHE_TTL, globals.LOG_CACHE_SIZE = 60, 2
+
+        for request in range(4):
+            log("pending", uuid=f"pending-{request}")
+
+        flush_logs()
+
+        self.assertEqual(get_log_metrics()['buffered'], 2)
+        self.assertEqual(get_log_metrics()['evicted'], evicted + 4)
+        self.assertEqual(self.messages('pending-1'), ['[pending-1]: pending'])
+        self.assertEqual(self.messages('pending-3'), [])
+
+        #3. Con la cola llena las líneas se descartan y se cuentan
+
+        globals.LOG_CACHE_SIZE = self.cache[1]
+
+        dropped = get_log_metrics()['dropped']
+        log_queue = globals.log_queue
+
+        globals.log_queue = queue.Queue(maxsize=1)
+        globals.log_queue.put_nowait([])
+
+        try:
+            log("lost", uuid='dropped')
+            log("lost", uuid='dropped', save_cache=True)
+        finally:
+            globals.log_queue = log_queue
+
+        self.assertEqual(get_log_metrics()['dropped'], dropped + 2)
+
+        #4. Por debajo del nivel no se formatea ni se serializa nada
+
+        globals.LOGGING_LEVEL = logging.WARNING
+
+        lazy = Lazy()
+        lines = get_log_metrics()['lines']
+
+        log("Booking lock '%s' acquired.", lazy, uuid='level', level='DEBUG')
+        log("Creating booking '%s'.", lazy, uuid='level')
+        self.assertEqual((lazy.formatted, get_log_metrics()['lines']), (0, lines))
+
+        log("Booking lock '%s' expired.", lazy, uuid='level', level='WARNING')
+        log("Response generated", uuid='level', save_cache=True)
+        flush_logs()
+
+        self.assertEqual(lazy.formatted, 1)
+        self.assertEqual(self.messages('level'), ["[level]: Booking lock 'lazy' expired."])
+
+        #5. Los datos de la petición se ocultan y se recortan
+
+        globals.LOGGING_LEVEL, globals.LOG_BODY_MAX_LENGTH = logging.INFO, 300
+
+        body = {'name': 'Local', 'password': 'secret-password', 'settings': [{'access_token': 'secret-token'}], 'description': 'x' * 1000}
+
+        with Flask(__name__).test_request_context('/local', method='POST', json=body, headers={'Authorization': 'Bearer secret-jwt'}) as context:
+            log("Request received", uuid='redact', request=context.request)
+            log("Response generated", uuid='redact', request=context.request, response=Response('{"password_generated": "secret-generated"}', mimetype='application/json'), save_cache=True)
+
+        flush_logs()
+
+        request, response = self.messages('redact')
+
+        for secret in ('secret-password', 'secret-token', 'secret-jwt', 'secret-generated'):
+            self.assertNotIn(secret, request + response)
+
+        self.assertIn(f'"Authorization": "{LOG_REDACTED}"', request)
+        self.assertIn(f'"password_generated": "{LOG_REDACTED}"', response)
+        self.assertIn('more characters) >', request)
+        self.assertLess(len(request), 500)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+# python -m unittest .\tests\test_metrics.py
+
+import datetime
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from flask_testing import TestCase
+from prometheus_client.parser import text_string_to_metric_families
+from app import create_app, db
+from tests import config_test, getUrl
+from tests.configure_local_base import configure
+
+OBSERVE = "from helpers.Metrics import count_cache_event, observe_request; observe_request('booking', 'booking.Booking', 'POST', {status}, 0.2); count_cache_event('token', 'misses')"
+COLLECT = "from helpers.Metrics import generate_metrics; print(generate_metrics()[0].decode())"
+
+def samples(text):
+    return {(sample.name, tuple(sorted(sample.labels.items()))): sample.value for family in text_string_to_metric_families(text) for sample in family.samples}
+
+class TestMetrics(TestCase):
+    def create_app(self):
+        app = create_app(config_test)
+        return app
+
+    def setUp(self):
+
+        db.create_all()
+        config_test.config(db = db)
+        self.admin_token = config_test.ADMIN_TOKEN
+
+    def tearDown(self):
+
+        db.session.remove()
+        db.drop_all()
+        config_test.drop(self.local.locals)
+
+    def configure_local(self):
+        self.local = configure(self.client, self.admin_token, self.assertEqual, set_smtp_settings=False, set_local_settings=False)
+
+    def get_metrics(self, token):
+        r = self.client.get(getUrl('admin', 'metrics'), headers={'Authorization': f"Bearer {token}"} if token else {})
+        return r, samples(r.get_data(as_text=True)) if r.status_code == 200 else None
+
+    def post_booking(self, time):
+        booking = {
+            "client_name": "Client metrics",
+            "client_tlf": "612345678",
+            "client_email": "client@metrics.com",
+            "datetime_init": f"{(datetime.datetime.now() + datetime.timedelta(days=1)).strftime('%Y-%m-%d')} {time}",
+            "services_ids": [self.local.services[0]['id']],
+        }
+        return self.client.post(getUrl('booking', 'local', self.local.local['id']), json=booking)
+
+    def test_integration_metrics(self):
+
+        self.configure_local()
+
+        opening_time = datetime.datetime.strptime(self.local.timetable[0]['opening_time'], "%H:%M:%S")
+        outcome = lambda metrics, status: metrics.get(('booking_api_booking_outcomes_total', (('endpoint', 'booking.Booking'), ('method', 'POST'), ('status', status))), 0)
+        latency = lambda metrics, status: metrics.get(('booking_api_request_duration_seconds_count', (('blueprint', 'booking'), ('endpoint', 'booking.Booking'), ('method', 'POST'), ('status', status))), 0)
+
+        #1. Solo el administrador puede leer las métricas
+
+        self.assertEqual(self.get_metrics(None)[0].status_code, 401)
+        self.assertEqual(self.get_metrics(self.local.refresh_token)[0].status_code, 403)
+
+        r, before = self.get_metrics(self.admin_token)
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.content_type.startswith('text/plain'))
+
+        #2. Latencia por endpoint y resultado de las reservas
+
+        self.assertEqual(self.post_booking(opening_time.strftime("%H:%M:%S")).status_code, 201)
+        self.assertEqual(self.post_booking((opening_time - datetime.timedelta(minutes=10)).strftime("%H:%M:%S")).status_code, 409)
+        self.assertEqual(self.client.get(getUrl('service', 'local', self.local.local['id'])).status_code, 200)
+
+        _, after = self.get_metrics(self.admin_token)
+
+        self.assertEqual(outcome(after, '201'), outcome(before, '201') + 1)
+        self.assertEqual(outcome(after, '409'), outcome(before, '409') + 1)
+        self.assertEqual(latency(after, '201'), latency(before, '201') + 1)
+        self.assertGreater(after[('booking_api_request_duration_seconds_count', (('blueprint', 'service'), ('endpoint', 'service.AllServices'), ('method', 'GET'), ('status', '200')))], 0)
+
+        #3. Bloqueos, cachés y logs de los helpers
+
+        event = lambda metrics, name, **labels: metrics.get((name, tuple(sorted(labels.items()))), 0)
+
+        self.assertGreater(event(after, 'booking_api_booking_lock_events_total', event='acquired'), event(before, 'booking_api_booking_lock_events_total', event='acquired'))
+        self.assertGreater(after[('booking_api_booking_lock_wait_seconds_count', ())], 0)
+        self.assertGreater(sum(value for (name, labels), value in after.items() if name == 'booking_api_cache_events_total' and ('cache', 'token') in labels), 0)
+        self.assertGreater(event(after, 'booking_api_cache_events_total', cache='schedule', event='misses') + event(after, 'booking_api_cache_events_total', cache='schedule', event='local_hits'), 0)
+        self.assertGreater(event(after, 'booking_api_log_lines_total', event='lines'), event(before, 'booking_api_log_lines_total', event='lines'))
+        self.assertGreater(event(after, 'booking_api_cache_entries', cache='token', pid=str(os.getpid())), 0)
+
+        #4. Con varios procesos se suman las métricas de todos
+
+        with tempfile.TemporaryDirectory() as folder:
+            env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=folder)
+
+            for status in (201, 201, 503):
+                subprocess.run([sys.executable, '-c', OBSERVE.format(status=status)], env=env, check=True)
+
+            metrics = samples(subprocess.run([sys.executable, '-c', COLLECT], env=env, check=True, capture_output=True, text=True).stdout)
+
+        self.assertEqual(outcome(metrics, '201'), 2)
+        self.assertEqual(outcome(metrics, '503'), 1)
+        self.assertEqual(latency(metrics, '201'), 2)
+        self.assertEqual(metrics[('booking_api_cache_events_total', (('cache', 'token'), ('event', 'misses')))], 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+# python -m unittest .\tests\test_public_files.py
+
+import hashlib
+import io
+import unittest
+from flask_testing import TestCase
+from app import create_app, db
+from globals import FILES_MAX_AGE, HASHED_FILES_MAX_AGE, PARAM_FILE_NAME
+from helpers.FileCache import get_file_cache_metrics
+from helpers.QueryAccounting import record_queries
+from tests import config_test, getUrl
+from tests.configure_local_base import configure
+
+CONTENT = bytes(range(256)) * 16
+
+class TestPublicFiles(TestCase):
+    def create_app(self):
+        app = create_app(config_test)
+        return app
+
+    def setUp(self):
+
+        db.create_all()
+        config_test.config(db = db)
+        self.admin_token = config_test.ADMIN_TOKEN
+
+    def tearDown(self):
+
+        db.session.remove()
+        db.drop_all()
+        config_test.drop(self.local.locals)
+
+    def configure_local(self):
+        self.local = configure(self.client, self.admin_token, self.assertEqual, set_smtp_settings=False, set_local_settings=False)
+
+    def upload(self, name, content = CONTENT, folder = 'gallery', mimetype = 'image/png'):
+        r = self.client.post(getUrl('files', folder), data={PARAM_FILE_NAME: (io.BytesIO(content), name, mimetype)}, headers={'Authorization': f"Bearer {self.local.refresh_token}"}, content_type='multipart/form-data')
+        self.assertEqual(r.status_code, 201)
+        return r.json['url']
+
+    def test_integration_public_files(self):
+
+        self.configure_local()
+
+        url = self.upload('photo.png')
+
+        #1. Se envía el archivo con validadores
+
+        r = self.client.get(url)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data, CONTENT)
+        self.assertEqual(r.mimetype, 'image/png')
+        self.assertEqual(r.headers['Content-Disposition'], 'inline; filename=photo.png')
+        self.assertTrue(r.cache_control.public)
+        self.assertIsNotNone(r.last_modified)
+
+        etag = r.get_etag()[0]
+        self.assertTrue(etag)
+        r.close()
+
+        #2. Las siguientes peticiones no consultan la base de datos
+
+        with record_queries() as counter:
+            r = self.client.get(url, headers={'If-None-Match': f'"{etag}"'})
+            self.assertEqual(r.status_code, 304)
+            self.assertEqual(r.data, b'')
+
+            r = self.client.get(url, headers={'Range': 'bytes=256-511'})
+            self.assertEqual(r.status_code, 206)
+            self.assertEqual(r.data, CONTENT[256:512])
+            self.assertEqual(r.headers['Content-Range'], f'bytes 256-511/{len(CONTENT)}')
+            r.close()
+
+        self.assertEqual(counter.count, 0, counter.statements)
+
+        #3. Los nombres con el hash del contenido se guardan en caché indefinidamente
+
+        r = self.client.get(self.upload(f'photo.{hashlib.sha256(CONTENT).hexdigest()[:8]}.png'))
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.cache_control.max_age, HASHED_FILES_MAX_AGE)
+        self.assertTrue(r.cache_control.immutable)
+        r.close()
+
+        r = self.client.get(self.upload('IMG-20231005.png'))
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.cache_control.max_age, FILES_MAX_AGE)
+        self.assertFalse(r.cache_control.immutable)
+        r.close()
+
+        #4. Las páginas se sobrescriben y nunca son inmutables
+
+        page = f'promo-{hashlib.md5(b"<p>old</p>").hexdigest()[:8]}.html'
+        page_url = self.upload(page, b'<p>old</p>', 'pages', 'text/html')
+
+        r = self.client.get(page_url)
+        self.assertEqual(r.data, b'<p>old</p>')
+        self.assertFalse(r.cache_control.immutable)
+        r.close()
+
+        self.upload(page, b'<p>new</p>', 'pages', 'text/html')
+
+        r = self.client.get(page_url)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data, b'<p>new</p>')
+        self.assertEqual(r.cache_control.max_age, FILES_MAX_AGE)
+        self.assertFalse(r.cache_control.immutable)
+        r.close()
+
+        #5. Eliminar el archivo invalida la caché
+
+        invalidations = get_file_cache_metrics()['invalidations']
+
+        r = self.client.delete(getUrl('files', 'gallery', 'photo.png'), headers={'Authorization': f"Bearer {self.local.refresh_token}"})
+        self.assertEqual(r.status_code, 204)
+        self.assertEqual(get_file_cache_metrics()['invalidations'], invalidations + 1)
+
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+# python -m unittest .\tests\test_query_accounting.py
+
+import datetime
+import json
+import unittest
+from unittest import mock
+from flask_testing import TestCase
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app import create_app, db
+from helpers.QueryAccounting import QUERY_COUNT_HEADER, QUERY_REPEATED_HEADER, QUERY_TIME_HEADER, record_queries
+from tests import config_test, getUrl, setParams
+from tests.configure_local_base import configure
+
+class TestQueryAccounting(TestCase):
+    def create_app(self):
+        app = create_app(config_test)
+        return app
+
+    def setUp(self):
+
+        db.create_all()
+        config_test.config(db = db)
+        self.admin_token = config_test.ADMIN_TOKEN
+
+    def tearDown(self):
+
+        db.session.remove()
+        db.drop_all()
+        config_test.drop(self.local.locals)
+
+    def configure_local(self):
+        self.local = configure(self.client, self.admin_token, self.assertEqual, set_smtp_settings=False, set_local_settings=False)
+
+    def post_bulk(self, bookings):
+        return self.client.post(getUrl('booking', 'bulk'), data=json.dumps({'bookings': bookings}), headers={'Authorization': f"Bearer {self.local.refresh_token}"}, content_type='application/json')
+
+    def booking(self, datetime_init, services_ids, worker_id):
+        return {
+            "client_name": "client test",
+            "client_tlf": "123456789",
+            "client_email": "client@test.com",
+            "datetime_init": datetime_init,
+            "services_ids": services_ids,
+            "worker_id": worker_id
+        }
+
+    def test_integration_query_accounting(self):
+
+        self.configure_local()
+
+        local_id = self.local.local['id']
+        work_group = self.local.work_groups[0]
+        date = (datetime.datetime.now() + datetime.timedelta(days=7)).strftime("%Y-%m-%d")
+
+        r = self.post_bulk([self.booking(f"{date} {hour}:00:00", [work_group['services'][0]['id']], worker['id']) for hour in (10, 12, 16) for worker in work_group['workers']])
+        self.assertEqual(r.status_code, 201)
+
+        #1. En modo debug la respuesta indica las consultas y su tiempo
+
+        self.app.debug = True
+
+        r = self.client.get(getUrl('service', 'local', local_id))
+        self.assertEqual(r.status_code, 200)
+        self.assertGreater(int(r.headers[QUERY_COUNT_HEADER]), 0)
+        self.assertGreaterEqual(float(r.headers[QUERY_TIME_HEADER]), 0)
+        self.assertNotIn(QUERY_REPEATED_HEADER, r.headers)
+
+        #2. Las consultas repetidas más del umbral se señalan (N+1)
+
+        db.session.expunge_all()
+
+        with mock.patch('helpers.QueryAccounting.QUERY_REPEAT_THRESHOLD', 1):
+            r = self.client.get(setParams(getUrl('booking', 'local', local_id), date=date))
+
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.headers[QUERY_REPEATED_HEADER], '1')
+
+        #3. Fuera de una petición
+
+        with record_queries() as stats:
+            for _ in range(3):
+                db.session.execute(text('SELECT 1'))
+
+        self.assertEqual(stats.count, 3)
+        self.assertEqual(stats.repeated(2), {'SELECT 1': 3})
+        self.assertEqual(stats.repeated(3), {})
+
+        #4. Una consulta que falla no deja su inicio pendiente y los bloques se anidan
+
+        with record_queries() as outer:
+            with self.assertRaises(OperationalError):
+                db.session.execute(text('SELECT * FROM missing_table'))
+
+            db.session.rollback()
+
+            with record_queries() as inner:
+                db.session.execute(text('SELECT 1'))
+
+        self.assertEqual(inner.count, 1)
+        self.assertEqual(outer.count, 1)
+        self.assertNotIn('query_start', db.session.connection().info)
+
+        #5. Sin debug no se añaden las cabeceras
+
+        self.app.debug = False
+
+        r = self.client.get(getUrl('service', 'local', local_id))
+        self.assertEqual(r.status_code, 200)
+        self.assertNotIn(QUERY_COUNT_HEADER, r.headers)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# python -m unittest .\tests\test_redis_pool.py
+
+import os
+import unittest
+from unittest import mock
+
+from prometheus_client.parser import text_string_to_metric_families
+
+from globals import REDIS_MAX_CONNECTIONS, REDIS_SOCKET_TIMEOUT
+from helpers.Database import create_redis_connection, delete_key_value_cache, get_key_value_cache, get_redis_pool, get_redis_pool_metrics, register_key_value_cache
+from helpers.Metrics import generate_metrics
+
+KEY = 'token_cache:test'
+
+class TestRedisPool(unittest.TestCase):
+
+    def setUp(self):
+        os.environ['REDIS_TEST_MODE'] = 'True'
+
+    def test_integration_redis_pool(self):
+
+        #1. Un solo pool y cliente por proceso, sin conectar hasta el primer comando
+
+        pool = get_redis_pool()
+        self.assertIs(get_redis_pool(), pool)
+        self.assertIsNone(create_redis_connection())
+
+        with mock.patch('helpers.Database.is_redis_test_mode', return_value=False):
+            client = create_redis_connection()
+            self.assertIs(client.connection_pool, pool)
+            self.assertIs(create_redis_connection(), client)
+
+        self.assertEqual(pool.max_connections, REDIS_MAX_CONNECTIONS)
+        self.assertEqual(pool.connection_kwargs['socket_timeout'], REDIS_SOCKET_TIMEOUT)
+        self.assertTrue(pool.connection_kwargs['retry_on_timeout'])
+        self.assertGreater(pool.connection_kwargs['health_check_interval'], 0)
+
+        metrics = get_redis_pool_metrics()
+        self.assertEqual(metrics['pid'], os.getpid())
+        self.assertEqual(metrics['in_use'], 0)
+
+        #2. El proceso hijo crea su propio pool
+
+        read, write = os.pipe()
+        pid = os.fork()
+
+        if pid == 0:
+            child = get_redis_pool()
+            os.write(write, b'1' if child is not pool and get_redis_pool_metrics()['forks'] == metrics['forks'] + 1 else b'0')
+            os._exit(0)
+
+        os.close(write)
+        os.waitpid(pid, 0)
+        self.assertEqual(os.read(read, 1), b'1')
+        os.close(read)
+
+        self.assertIs(get_redis_pool(), pool)
+
+        #3. Comandos simples, sin MULTI
+
+        redis_connection = mock.Mock()
+        redis_connection.get.return_value = b'value'
+
+        with mock.patch('helpers.Database.is_redis_test_mode', return_value=False):
+            register_key_value_cache(KEY, 'value', exp=10, redis_connection=redis_connection)
+            self.assertEqual(get_key_value_cache(KEY, redis_connection=redis_connection), b'value')
+            delete_key_value_cache(KEY, redis_connection=redis_connection)
+
+            pipeline = mock.Mock()
+            get_key_value_cache(KEY, pipeline=pipeline)
+
+        redis_connection.setex.assert_called_once_with(KEY, 10, 'value')
+        redis_connection.get.assert_called_once_with(KEY)
+        redis_connection.delete.assert_called_once_with(KEY)
+        redis_connection.pipeline.assert_not_called()
+
+        pipeline.get.assert_called_once_with(KEY)
+        pipeline.multi.assert_not_called()
+        pipeline.execute.assert_not_called()
+
+        #4. Estado del pool en las métricas
+
+        samples = {(sample.name, sample.labels.get('state')): sample.value for family in text_string_to_metric_families(generate_metrics()[0].decode()) for sample in family.samples if sample.labels.get('pid') == str(os.getpid())}
+
+        self.assertEqual(samples[('booking_api_redis_pool_max_connections', None)], REDIS_MAX_CONNECTIONS)
+        self.assertEqual(samples[('booking_api_redis_pool_connections', 'in_use')], 0)
+
+if __name__ == '__main__':
+    unittest.main()
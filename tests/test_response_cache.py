@@ -0,0 +1,106 @@
+# python -m unittest .\tests\test_response_cache.py
+
+import json
+import unittest
+from flask_testing import TestCase
+from app import create_app, db
+from helpers.QueryAccounting import record_queries
+from tests import config_test, getUrl
+from tests.configure_local_base import configure
+
+class TestResponseCache(TestCase):
+    def create_app(self):
+        app = create_app(config_test)
+        return app
+
+    def setUp(self):
+
+        db.create_all()
+        config_test.config(db = db)
+        self.admin_token = config_test.ADMIN_TOKEN
+
+    def tearDown(self):
+
+        db.session.remove()
+        db.drop_all()
+        config_test.drop(self.local.locals)
+
+    def configure_local(self):
+        self.local = configure(self.client, self.admin_token, self.assertEqual, set_smtp_settings=False, set_local_settings=False)
+
+    def get(self, *path, etag = None):
+        headers = {'If-None-Match': f'"{etag}"'} if etag else {}
+        return self.client.get(getUrl(*path), headers=headers)
+
+    def test_integration_response_cache(self):
+
+        self.configure_local()
+
+        local_id = self.local.local['id']
+        services = ('service', 'local', local_id)
+
+        #1. La primera respuesta se guarda con su ETag
+
+        r = self.get(*services)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json['total'], 9)
+        self.assertEqual(r.headers['Cache-Control'], 'public, max-age=0')
+
+        etag = r.get_etag()[0]
+        self.assertTrue(etag)
+
+        #2. Las siguientes no consultan la base de datos
+
+        with record_queries() as counter:
+            r = self.get(*services)
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(r.get_etag()[0], etag)
+            self.assertEqual(r.json['total'], 9)
+
+            r = self.get(*services, etag=etag)
+            self.assertEqual(r.status_code, 304)
+            self.assertEqual(r.get_etag()[0], etag)
+            self.assertEqual(r.data, b'')
+
+        self.assertEqual(counter.count, 0, counter.statements)
+
+        #3. Crear un servicio invalida la caché del local
+
+        service = {"name": "service test 4", "duration": 30, "price": 10, "work_group": self.local.work_groups[0]['id']}
+        r = self.client.post(getUrl('service'), data=json.dumps(service), headers={'Authorization': f"Bearer {self.local.refresh_token}"}, content_type='application/json')
+        self.assertEqual(r.status_code, 201)
+
+        r = self.get(*services, etag=etag)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json['total'], 10)
+        self.assertNotEqual(r.get_etag()[0], etag)
+
+        #4. Horario y datos del local
+
+        week = ('timetable', 'local', local_id, 'week')
+        etag = self.get(*week).get_etag()[0]
+        self.assertEqual(self.get(*week, etag=etag).status_code, 304)
+
+        r = self.client.put(getUrl('timetable'), data=json.dumps([{"opening_time": "09:00:00", "closing_time": "21:00:00", "weekday_short": "MO"}]), headers={'Authorization': f"Bearer {self.local.refresh_token}"}, content_type='application/json')
+        self.assertEqual(r.status_code, 200)
+
+        r = self.get(*week, etag=etag)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.json), 1)
+
+        etag = self.get('local', local_id).get_etag()[0]
+
+        r = self.client.patch(getUrl('local'), data=json.dumps({"name": "Local-Cache"}), headers={'Authorization': f"Bearer {self.local.access_token}"}, content_type='application/json')
+        self.assertEqual(r.status_code, 200)
+
+        r = self.get('local', local_id, etag=etag)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json['name'], 'Local-Cache')
+
+        #5. Los errores no se guardan
+
+        self.assertEqual(self.get('local', 'unknown').status_code, 404)
+        self.assertEqual(self.get('local', 'unknown').status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
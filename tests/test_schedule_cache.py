@@ -0,0 +1,122 @@
+# python -m unittest .\tests\test_schedule_cache.py
+
+import datetime
+import json
+import unittest
+from flask_testing import TestCase
+from app import create_app, db
+from globals import WEEK_DAYS
+from helpers.ScheduleCache import clear_local_schedules, get_schedule_cache_metrics
+from tests import config_test, getUrl
+from tests.configure_local_base import configure
+
+ENDPOINT = 'booking'
+
+class TestScheduleCache(TestCase):
+    def create_app(self):
+        app = create_app(config_test)
+        return app
+
+    def setUp(self):
+
+        db.create_all()
+        config_test.config(db = db)
+        self.admin_token = config_test.ADMIN_TOKEN
+
+    def tearDown(self):
+
+        db.session.remove()
+        db.drop_all()
+        config_test.drop(self.local.locals)
+
+    def configure_local(self):
+        self.local = configure(self.client, self.admin_token, self.assertEqual, set_smtp_settings=False, set_local_settings=False)
+
+    def post_booking(self, hour):
+        booking = {
+            "client_name": "Test",
+            "client_tlf": "123456789",
+            "client_email": "client@test.com",
+            "datetime_init": f"{self.date} {hour}:00",
+            "services_ids": [self.service['id']],
+            "worker_id": self.worker['id']
+        }
+        return self.client.post(getUrl(ENDPOINT, 'local', self.local.local['id']), data=json.dumps(booking), content_type='application/json')
+
+    def put_timetable(self, timetable):
+        return self.client.put(getUrl('timetable'), headers={'Authorization': f"Bearer {self.local.refresh_token}"}, data=json.dumps(timetable), content_type='application/json')
+
+    def post_close(self, close):
+        return self.client.post(getUrl('close'), data=json.dumps(close), headers={'Authorization': f"Bearer {self.local.refresh_token}"}, content_type='application/json')
+
+    def put_close(self, close_id, close):
+        return self.client.put(getUrl('close', close_id), data=json.dumps(close), headers={'Authorization': f"Bearer {self.local.refresh_token}"}, content_type='application/json')
+
+    def delete_close(self, close_id):
+        return self.client.delete(getUrl('close', close_id), headers={'Authorization': f"Bearer {self.local.refresh_token}"}, content_type='application/json')
+
+    def test_integration_schedule_cache(self):
+
+        self.configure_local()
+
+        self.service = self.local.work_groups[0]['services'][0]
+        self.worker = self.local.work_groups[0]['workers'][0]
+        day = datetime.datetime.now() + datetime.timedelta(days=7)
+        self.date = day.strftime("%Y-%m-%d")
+
+        clear_local_schedules()
+
+        #1. El local cierra de 15:00 a 16:00, el horario se guarda en caché
+
+        r = self.post_booking("15:15")
+        self.assertEqual(r.status_code, 409)
+
+        metrics = get_schedule_cache_metrics()
+
+        r = self.post_booking("10:00")
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(get_schedule_cache_metrics()['local_hits'], metrics['local_hits'] + 1)
+        self.assertEqual(get_schedule_cache_metrics()['misses'], metrics['misses'])
+
+        #2. Al cambiar el horario se invalida la caché
+
+        r = self.put_timetable([{"opening_time": "10:00:00", "closing_time": "20:00:00", "weekday_short": weekday} for weekday in WEEK_DAYS])
+        self.assertEqual(r.status_code, 200)
+
+        r = self.post_booking("15:15")
+        self.assertEqual(r.status_code, 201)
+
+        #3. Los cierres también invalidan la caché
+
+        r = self.post_close({"datetime_init": f"{self.date}T11:00:00", "datetime_end": f"{self.date}T13:00:00"})
+        self.assertEqual(r.status_code, 200)
+        close_id = r.json['id']
+
+        r = self.post_booking("12:00")
+        self.assertEqual(r.status_code, 409)
+
+        r = self.put_close(close_id, {"datetime_init": f"{self.date}T17:00:00", "datetime_end": f"{self.date}T19:00:00"})
+        self.assertEqual(r.status_code, 200)
+
+        r = self.post_booking("12:00")
+        self.assertEqual(r.status_code, 201)
+
+        r = self.post_booking("17:30")
+        self.assertEqual(r.status_code, 409)
+
+        r = self.delete_close(close_id)
+        self.assertEqual(r.status_code, 204)
+
+        r = self.post_booking("17:30")
+        self.assertEqual(r.status_code, 201)
+
+        #4. Eliminar el horario de un día
+
+        r = self.client.delete(getUrl('timetable', 'week', WEEK_DAYS[day.weekday()]), headers={'Authorization': f"Bearer {self.local.refresh_token}"})
+        self.assertEqual(r.status_code, 204)
+
+        r = self.post_booking("18:30")
+        self.assertEqual(r.status_code, 409)
+
+if __name__ == '__main__':
+    unittest.main()
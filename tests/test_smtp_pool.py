@@ -0,0 +1,124 @@
+# python -m unittest .\tests\test_smtp_pool.py
+
+import threading
+import time
+import unittest
+
+from helpers.SmtpPool import SmtpPool
+from helpers.error.EmailError.SmtpPoolExhaustedException import SmtpPoolExhaustedException
+
+try:
+    from aiosmtpd.controller import Controller
+    from aiosmtpd.smtp import AuthResult
+except ImportError:
+    Controller = None
+
+HOST = '127.0.0.1'
+PORT = 8025
+USER = 'user@test.com'
+PASSWORD = 'password'
+
+MESSAGE = 'Subject: Test\r\n\r\nBody'
+
+class Handler():
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((session.peer, envelope.rcpt_tos))
+        return '250 OK'
+
+def authenticator(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=auth_data.login == USER.encode() and auth_data.password == PASSWORD.encode())
+
+@unittest.skipIf(Controller is None, 'aiosmtpd is not installed')
+class TestSmtpPool(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = Handler()
+        self.start_server()
+
+    def tearDown(self):
+        self.pool.close()
+        self.controller.stop()
+
+    def start_server(self):
+        self.controller = Controller(self.handler, hostname=HOST, port=PORT, authenticator=authenticator, auth_require_tls=False)
+        self.controller.start()
+
+    def test_integration_smtp_pool(self):
+
+        self.pool = SmtpPool(HOST, PORT, USER, PASSWORD, starttls=False, max_connections=1, noop_interval=0)
+
+        #1. Los mensajes reutilizan la misma conexión autenticada
+
+        for i in range(5):
+            self.pool.sendmail(USER, f'client{i}@test.com', MESSAGE)
+
+        self.assertEqual(len(self.handler.messages), 5)
+        self.assertEqual(len(set(peer for peer, _ in self.handler.messages)), 1)
+        self.assertEqual(self.pool.metrics['misses'], 1)
+        self.assertEqual(self.pool.metrics['hits'], 4)
+        self.assertEqual(self.pool.metrics['sent'], 5)
+
+        #2. Una conexión cerrada por el servidor se descarta con NOOP y se reconecta
+
+        self.controller.stop()
+        self.start_server()
+
+        self.pool.sendmail(USER, 'client@test.com', MESSAGE)
+
+        self.assertEqual(len(self.handler.messages), 6)
+        self.assertEqual(self.pool.metrics['discarded'], 1)
+        self.assertEqual(self.pool.metrics['misses'], 2)
+
+        #3. Una conexión cerrada después del NOOP se reintenta con una nueva
+
+        self.pool.noop_interval = 60
+        self.controller.stop()
+        self.start_server()
+
+        self.pool.sendmail(USER, 'client@test.com', MESSAGE)
+
+        self.assertEqual(len(self.handler.messages), 7)
+        self.assertEqual(self.pool.metrics['reconnects'], 1)
+        self.assertEqual(self.pool.metrics['errors'], 0)
+
+        #4. Límite de conexiones simultáneas por cuenta
+
+        acquired = threading.Event()
+        release = threading.Event()
+
+        def hold_connection():
+            with self.pool.connection():
+                acquired.set()
+                release.wait()
+
+        thread = threading.Thread(target=hold_connection)
+        thread.start()
+        acquired.wait()
+
+        with self.assertRaises(SmtpPoolExhaustedException):
+            with self.pool.connection(timeout=0.1):
+                pass
+
+        release.set()
+        thread.join()
+
+        self.pool.sendmail(USER, 'client@test.com', MESSAGE)
+        self.assertEqual(len(self.handler.messages), 8)
+
+        #5. Servidor no disponible
+
+        pool = SmtpPool(HOST, PORT + 1, USER, PASSWORD, starttls=False)
+
+        with self.assertRaises(OSError):
+            pool.sendmail(USER, 'client@test.com', MESSAGE)
+
+        self.assertEqual(pool.metrics['reconnects'], 1)
+        self.assertEqual(pool.metrics['errors'], 1)
+        self.assertEqual(pool.metrics['sent'], 0)
+
+if __name__ == '__main__':
+    unittest.main()